@@ -0,0 +1,125 @@
+import collections
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable
+
+import pygame
+
+from Images import ImagesProvider
+
+TEXTURE_DIRECTORY = "texture"
+TEXTURE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+CACHE_EXTENSION = ".rgb"
+DEFAULT_CACHE_BYTES = 64 * 2 ** 20
+
+
+class SpriteDiskCache:
+    # scaled sprites are stored as raw RGB pixels, a file per texture and size named with the modification time
+    # of the texture, so changed textures are never served from the cache. Storing a sprite deletes the files of
+    # older versions of the texture, and the least recently used files when the cache outgrows `max_bytes`
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES):
+        self.__directory = directory
+        self.__max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+        # sizes of the files from the least to the most recently used one
+        entries = sorted((entry.stat().st_mtime_ns, entry.name, entry.stat().st_size)
+                         for entry in os.scandir(directory) if entry.name.endswith(CACHE_EXTENSION))
+        self.__sizes = collections.OrderedDict((name, size) for _, name, size in entries)
+        self.__bytes = sum(self.__sizes.values())
+
+    def load(self, path, width, height):
+        name = self.__file_name(path, width, height)
+        cache_path = os.path.join(self.__directory, name)
+
+        try:
+            with open(cache_path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        if len(data) != width * height * 3:
+            return None
+
+        # the modification time of a file is the time it was used last, also for the next runs
+        os.utime(cache_path)
+        if name in self.__sizes:
+            self.__sizes.move_to_end(name)
+
+        return pygame.image.frombuffer(data, (width, height), "RGB").convert()
+
+    def store(self, path, width, height, sprite):
+        name = self.__file_name(path, width, height)
+        cache_path = os.path.join(self.__directory, name)
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+        data = pygame.image.tobytes(sprite, "RGB")
+
+        version_prefix = name.rsplit("-", 1)[0] + "-"
+        for stale in [stale for stale in self.__sizes if stale.startswith(version_prefix) and stale != name]:
+            self.__remove(stale)
+
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, cache_path)
+
+        self.__bytes += len(data) - self.__sizes.pop(name, 0)
+        self.__sizes[name] = len(data)
+        while self.__bytes > self.__max_bytes and len(self.__sizes) > 1:
+            self.__remove(next(iter(self.__sizes)))
+
+    def __remove(self, name):
+        self.__bytes -= self.__sizes.pop(name)
+
+        try:
+            os.remove(os.path.join(self.__directory, name))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def __file_name(path, width, height):
+        texture = hashlib.sha1(os.path.normpath(path).encode("utf-8")).hexdigest()
+
+        return f"{texture}-{width}x{height}-{os.stat(path).st_mtime_ns}{CACHE_EXTENSION}"
+
+
+def find_textures(directory=TEXTURE_DIRECTORY) -> List[str]:
+    textures = []
+
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(TEXTURE_EXTENSIONS):
+                textures.append(os.path.join(root, name))
+
+    return textures
+
+
+def preload_assets(sprite_sizes: Iterable[int], cache: SpriteDiskCache = None, directory=TEXTURE_DIRECTORY,
+                   workers=None):
+    # has to be called after the display mode is set, since decoded images are converted to its pixel format
+    textures = find_textures(directory)
+    sprite_sizes = list(sprite_sizes)
+    missing = []
+
+    for path in textures:
+        for size in sprite_sizes:
+            sprite = cache.load(path, size, size) if cache is not None else None
+
+            if sprite is not None:
+                ImagesProvider.add_sprite(path, size, size, sprite)
+            else:
+                missing.append((path, size))
+
+    # only textures with sprites missing in the cache are decoded, all of them at once in worker threads
+    paths = sorted({path for path, _ in missing})
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        images = dict(zip(paths, executor.map(pygame.image.load, paths)))
+
+    for path, image in images.items():
+        ImagesProvider.add_image(path, image.convert_alpha())
+
+    for path, size in missing:
+        sprite = ImagesProvider.load_sprite(path, size, size)
+
+        if cache is not None:
+            cache.store(path, size, size, sprite)
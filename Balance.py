@@ -0,0 +1,315 @@
+import argparse
+import collections
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator
+
+import numpy as np
+
+from Event import Event
+from EventHandlers import RESTORE_HP_EVENT, APPLY_BLESSING_EVENT, REMOVE_EFFECT_EVENT, ADD_GOLD_EVENT, \
+    MAKE_ME_ANGRY_EVENT, ENEMY_INTERACTED_WITH_HERO_EVENT
+from Policies import ObservationBuilder, load_policy, OBSERVATION_SIZE
+from Replay import seed_everything
+from Service import LevelsProvider
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+DEFAULT_MAX_STEPS = 2000
+DEFAULT_CHUNK_SIZE = 32
+# time to clear a floor is kept as a histogram with bins of this many steps
+CLEAR_STEPS_BIN = 10
+INTERACTIONS = (ENEMY_INTERACTED_WITH_HERO_EVENT, ADD_GOLD_EVENT, RESTORE_HP_EVENT, APPLY_BLESSING_EVENT,
+                REMOVE_EFFECT_EVENT, MAKE_ME_ANGRY_EVENT)
+EFFECTS = ("Blessing", "Berserk", "Weakness", "Anger")
+
+
+class BalanceReport:
+    # every statistic is a fixed-size accumulator, so a report of a million games takes as much memory as a report
+    # of one game, and reports of separate workers are merged by addition
+    ARRAYS = ("entered", "deaths", "gold", "exp", "hero_levels", "clear_steps", "clear_steps_total", "interactions",
+              "effects")
+
+    def __init__(self, floors, max_steps=DEFAULT_MAX_STEPS):
+        self.floors = floors
+        self.max_steps = max_steps
+        self.games = 0
+        self.cleared = 0
+        self.timeouts = 0
+        self.steps = 0
+        # per floor: games which entered it and died on it, and sums of hero gold, experience and level on entry
+        self.entered = np.zeros(floors, dtype=np.int64)
+        self.deaths = np.zeros(floors, dtype=np.int64)
+        self.gold = np.zeros(floors, dtype=np.float64)
+        self.exp = np.zeros(floors, dtype=np.float64)
+        self.hero_levels = np.zeros(floors, dtype=np.float64)
+        self.clear_steps = np.zeros((floors, max_steps // CLEAR_STEPS_BIN + 1), dtype=np.int64)
+        self.clear_steps_total = np.zeros(floors, dtype=np.float64)
+        self.interactions = np.zeros((floors, len(INTERACTIONS)), dtype=np.int64)
+        self.effects = np.zeros((floors, len(EFFECTS)), dtype=np.int64)
+
+    def enter(self, floor, hero):
+        self.entered[floor] += 1
+        self.gold[floor] += hero.gold
+        self.exp[floor] += hero.exp
+        self.hero_levels[floor] += hero.level
+
+    def clear(self, floor, steps):
+        self.clear_steps[floor, min(steps // CLEAR_STEPS_BIN, self.clear_steps.shape[1] - 1)] += 1
+        self.clear_steps_total[floor] += steps
+
+    def merge(self, other: "BalanceReport"):
+        if (self.floors, self.max_steps) != (other.floors, other.max_steps):
+            raise ValueError("Only reports of the same levels and step limit can be merged.")
+
+        self.games += other.games
+        self.cleared += other.cleared
+        self.timeouts += other.timeouts
+        self.steps += other.steps
+        for name in self.ARRAYS:
+            getattr(self, name)[...] += getattr(other, name)
+
+        return self
+
+    def death_rates(self) -> np.ndarray:
+        return self.deaths / np.maximum(self.entered, 1)
+
+    def survival_rates(self) -> np.ndarray:
+        # share of the games entered a floor which did not die on it
+        return 1 - self.death_rates()
+
+    def clear_steps_percentile(self, floor, percentile):
+        histogram = self.clear_steps[floor]
+        total = histogram.sum()
+
+        if total == 0:
+            return float("nan")
+
+        index = int(np.searchsorted(np.cumsum(histogram), total * percentile / 100))
+
+        return (index + 1) * CLEAR_STEPS_BIN
+
+    def summary(self) -> dict:
+        entered = np.maximum(self.entered, 1)
+        cleared = self.clear_steps.sum(axis=1)
+
+        return {
+            "games": self.games,
+            "cleared": self.cleared,
+            "timeouts": self.timeouts,
+            "steps": self.steps,
+            "floors": [{
+                "floor": floor + 1,
+                "entered": int(self.entered[floor]),
+                "death_rate": float(self.death_rates()[floor]),
+                "cleared": int(cleared[floor]),
+                "mean_gold": float(self.gold[floor] / entered[floor]),
+                "mean_exp": float(self.exp[floor] / entered[floor]),
+                "mean_hero_level": float(self.hero_levels[floor] / entered[floor]),
+                "mean_clear_steps": float(self.clear_steps_total[floor] / max(cleared[floor], 1)),
+                "p50_clear_steps": self.clear_steps_percentile(floor, 50),
+                "p90_clear_steps": self.clear_steps_percentile(floor, 90),
+                "interactions": {name: float(self.interactions[floor, i] / entered[floor])
+                                 for i, name in enumerate(INTERACTIONS)},
+                "effects": {name: float(self.effects[floor, i] / entered[floor]) for i, name in enumerate(EFFECTS)},
+            } for floor in range(self.floors)]
+        }
+
+    def format(self) -> str:
+        summary = self.summary()
+        lines = [f"{summary['games']} games, {summary['cleared']} cleared, {summary['timeouts']} timed out, "
+                 f"{summary['steps']} steps",
+                 f"{'floor':>5}{'entered':>10}{'death':>8}{'gold':>10}{'exp':>10}{'level':>7}"
+                 f"{'steps':>8}{'p50':>6}{'p90':>6}  {'fights':>7}{'gold+':>7}{'effects':>8}"]
+
+        for floor in summary["floors"]:
+            lines.append(f"{floor['floor']:>5}{floor['entered']:>10}{floor['death_rate']:>8.1%}"
+                         f"{floor['mean_gold']:>10.1f}{floor['mean_exp']:>10.1f}{floor['mean_hero_level']:>7.2f}"
+                         f"{floor['mean_clear_steps']:>8.0f}{floor['p50_clear_steps']:>6.0f}"
+                         f"{floor['p90_clear_steps']:>6.0f}  "
+                         f"{floor['interactions'][ENEMY_INTERACTED_WITH_HERO_EVENT]:>7.2f}"
+                         f"{floor['interactions'][ADD_GOLD_EVENT]:>7.2f}{sum(floor['effects'].values()):>8.2f}")
+
+        return "\n".join(lines)
+
+
+class _InteractionCounter:
+    # subscribed to the engine next to the event handler, counts interactions on the current floor
+    def __init__(self, report: BalanceReport):
+        self.__report = report
+        self.__indexes = {name: i for i, name in enumerate(INTERACTIONS)}
+        self.floor = 0
+
+    def update(self, event):
+        if isinstance(event, Event) and event.name in self.__indexes:
+            self.__report.interactions[self.floor, self.__indexes[event.name]] += 1
+
+
+class BalanceSimulator:
+    # plays headless games one after another; every game is seeded, so the same seed plays the same game for
+    # the same levels and objects settings
+    def __init__(self, settings_file_path=SETTINGS_FILE_PATH, levels_file_path=LEVELS_FILE_PATH, policy="random",
+                 max_steps=DEFAULT_MAX_STEPS):
+        self.__settings_provider = SettingsProvider(settings_file_path)
+        self.__levels_file_path = levels_file_path
+        self.__policy = policy
+        self.__max_steps = max_steps
+        self.__observation_builder = ObservationBuilder()
+        self.__blank_observations = np.zeros((1, OBSERVATION_SIZE), dtype=np.float32)
+        # the end level is not a floor, reaching it means the dungeon is cleared
+        self.__floors = len(LevelsProvider.load_configs(levels_file_path))
+
+    @property
+    def floors(self):
+        return self.__floors
+
+    def create_report(self) -> BalanceReport:
+        return BalanceReport(self.__floors, self.__max_steps)
+
+    def play(self, seed, report: BalanceReport):
+        seed_everything(seed)
+        engine = create_engine(self.__settings_provider, self.__levels_file_path)
+        policy = load_policy(self.__policy, seed=seed)
+        counter = _InteractionCounter(report)
+        engine.subscribe(counter)
+
+        floor, floor_start, hero = engine.level, 0, engine.hero
+        report.games += 1
+        report.enter(floor, hero)
+
+        for step in range(1, self.__max_steps + 1):
+            if policy.uses_observations:
+                action = policy.act(self.__observation_builder.observe([engine]))[0]
+            else:
+                action = policy.act(self.__blank_observations)[0]
+            engine.move(int(action))
+
+            if engine.hero is not hero:
+                # an applied effect wraps the previous hero, a removed one unwraps it
+                if getattr(engine.hero, "base", None) is hero and type(engine.hero).__name__ in EFFECTS:
+                    report.effects[floor, EFFECTS.index(type(engine.hero).__name__)] += 1
+                hero = engine.hero
+
+            if not engine.game_process:
+                report.deaths[floor] += 1
+                break
+
+            if engine.level != floor:
+                report.clear(floor, step - floor_start)
+                floor, floor_start = engine.level, step
+
+                if floor >= self.__floors:
+                    report.cleared += 1
+                    break
+
+                counter.floor = floor
+                report.enter(floor, engine.hero)
+        else:
+            report.timeouts += 1
+
+        report.steps += step
+        policy.close()
+
+    def run(self, seeds) -> BalanceReport:
+        report = self.create_report()
+
+        for seed in seeds:
+            self.play(seed, report)
+
+        return report
+
+
+# worker processes keep simulators of the latest settings, so a chunk does not reload them
+_simulators = collections.OrderedDict()
+MAX_CACHED_SIMULATORS = 16
+
+
+def run_chunk(arguments, start, stop) -> BalanceReport:
+    # arguments are (settings file path, levels file path, policy, max steps)
+    if arguments in _simulators:
+        _simulators.move_to_end(arguments)
+    else:
+        _simulators[arguments] = BalanceSimulator(*arguments)
+        if len(_simulators) > MAX_CACHED_SIMULATORS:
+            _simulators.popitem(last=False)
+
+    return _simulators[arguments].run(range(start, stop))
+
+
+def simulate(games, seed=0, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, settings_file_path=SETTINGS_FILE_PATH,
+             levels_file_path=LEVELS_FILE_PATH, policy="random",
+             max_steps=DEFAULT_MAX_STEPS) -> Iterator[BalanceReport]:
+    # yields the accumulated report after every finished chunk of games; at most two chunks per worker are
+    # queued at once, so memory does not grow with the number of games
+    arguments = (settings_file_path, levels_file_path, policy, max_steps)
+    chunks = ((start, min(start + chunk_size, seed + games)) for start in range(seed, seed + games, chunk_size))
+
+    if workers == 0:
+        report = None
+
+        for start, stop in chunks:
+            chunk = run_chunk(arguments, start, stop)
+            report = chunk if report is None else report.merge(chunk)
+            yield report
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        report = None
+        pending = set()
+
+        for chunk in chunks:
+            pending.add(executor.submit(run_chunk, arguments, *chunk))
+
+            while len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = future.result() if report is None else report.merge(future.result())
+                    yield report
+
+        for future in pending:
+            report = future.result() if report is None else report.merge(future.result())
+            yield report
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Estimate the balance of levels and objects settings by playing "
+                                                 "many headless games.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the next games use next seeds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 plays in this process")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="games per worker task")
+    parser.add_argument("--policy", default="random", help="built-in policy name or 'module:attribute'")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS, help="moves before a game times out")
+    parser.add_argument("--settings", default=SETTINGS_FILE_PATH, help="objects settings file")
+    parser.add_argument("--levels", default=LEVELS_FILE_PATH, help="levels settings file")
+    parser.add_argument("--output", help="write the summary as JSON into this file")
+    parser.add_argument("--progress-interval", type=float, default=5., help="seconds between progress lines")
+
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    start = last_progress = time.perf_counter()
+    report = None
+
+    for report in simulate(arguments.games, arguments.seed, arguments.workers, arguments.chunk_size,
+                           arguments.settings, arguments.levels, arguments.policy, arguments.max_steps):
+        now = time.perf_counter()
+        if now - last_progress >= arguments.progress_interval:
+            print(f"{report.games}/{arguments.games} games, {report.games / (now - start):.1f} games/s", flush=True)
+            last_progress = now
+
+    print(report.format())
+    print(f"Finished in {time.perf_counter() - start:.1f} s.")
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report.summary(), file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
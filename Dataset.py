@@ -0,0 +1,185 @@
+import bisect
+import json
+import os
+import queue
+import threading
+from typing import List
+
+import numpy as np
+
+from Policies import OBSERVATION_SIZE
+from Threads import put_while_alive
+
+INDEX_FILE_NAME = "index.json"
+# every shard is a set of .npy files, one per field, with the same number of rows
+FIELDS = ("observations", "actions", "rewards", "dones")
+
+
+class TrajectoryWriter:
+    # transitions are buffered in preallocated chunks; full chunks are written into memory-mapped shards by
+    # a background thread, so stepping only waits when more than `max_pending_chunks` are not written yet
+    def __init__(self, directory, observation_size=OBSERVATION_SIZE, shard_size=2 ** 16, chunk_size=4096,
+                 max_pending_chunks=64):
+        if shard_size % chunk_size != 0:
+            raise ValueError("Shard size should be a multiple of the chunk size.")
+
+        self.__directory = directory
+        self.__observation_size = observation_size
+        self.__shard_size = shard_size
+        self.__chunk_size = chunk_size
+        self.__chunk = self.__create_chunk()
+        self.__chunk_rows = 0
+        self.__queue = queue.Queue(maxsize=max_pending_chunks)
+        self.__shards = []
+        self.__error = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__run, name="trajectory-writer", daemon=True)
+        self.__thread.start()
+
+    def append(self, observation, action, reward, done):
+        row = self.__chunk_rows
+        self.__chunk["observations"][row] = observation
+        self.__chunk["actions"][row] = action
+        self.__chunk["rewards"][row] = reward
+        self.__chunk["dones"][row] = done
+        self.__chunk_rows += 1
+
+        if self.__chunk_rows == self.__chunk_size:
+            self.__submit_chunk()
+
+    def close(self):
+        if self.__chunk_rows > 0:
+            self.__submit_chunk()
+
+        put_while_alive(self.__queue, None, self.__thread)
+        self.__thread.join()
+
+        if self.__error is not None:
+            raise self.__error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __create_chunk(self):
+        return {
+            "observations": np.zeros((self.__chunk_size, self.__observation_size), dtype=np.float32),
+            "actions": np.zeros(self.__chunk_size, dtype=np.uint8),
+            "rewards": np.zeros(self.__chunk_size, dtype=np.float32),
+            "dones": np.zeros(self.__chunk_size, dtype=bool),
+        }
+
+    def __submit_chunk(self):
+        try:
+            if not put_while_alive(self.__queue, (self.__chunk, self.__chunk_rows), self.__thread):
+                if self.__error is not None:
+                    raise self.__error
+                raise ValueError("The trajectory writer is closed.")
+        finally:
+            # rows which can not be written are dropped, so the next ones still fit into the chunk
+            self.__chunk = self.__create_chunk()
+            self.__chunk_rows = 0
+
+    def __run(self):
+        shard, shard_rows = None, 0
+
+        try:
+            while True:
+                item = self.__queue.get()
+
+                if item is None:
+                    break
+
+                chunk, rows = item
+                if shard is None:
+                    shard, shard_rows = self.__open_shard(), 0
+
+                for field in FIELDS:
+                    shard[field][shard_rows:shard_rows + rows] = chunk[field][:rows]
+                shard_rows += rows
+
+                if shard_rows == self.__shard_size:
+                    self.__close_shard(shard, shard_rows)
+                    shard = None
+
+            if shard is not None:
+                self.__close_shard(shard, shard_rows)
+        except Exception as error:
+            self.__error = error
+
+    def __open_shard(self):
+        name = f"shard-{len(self.__shards):05d}"
+        shapes = {"observations": (self.__shard_size, self.__observation_size)}
+        dtypes = {"observations": np.float32, "actions": np.uint8, "rewards": np.float32, "dones": bool}
+        shard = {"name": name}
+
+        for field in FIELDS:
+            shard[field] = np.lib.format.open_memmap(os.path.join(self.__directory, f"{name}.{field}.npy"), mode="w+",
+                                                     dtype=dtypes[field], shape=shapes.get(field, (self.__shard_size,)))
+
+        return shard
+
+    def __close_shard(self, shard, rows):
+        for field in FIELDS:
+            shard[field].flush()
+
+        # the last shard can be filled partially, so the index keeps the number of valid rows
+        self.__shards.append({"name": shard["name"], "rows": rows})
+        self.__write_index()
+
+    def __write_index(self):
+        index = {
+            "observation_size": self.__observation_size,
+            "rows": sum(shard["rows"] for shard in self.__shards),
+            "shards": self.__shards
+        }
+        path = os.path.join(self.__directory, INDEX_FILE_NAME)
+
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(index, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+class TrajectoryDataset:
+    # random access to the transitions; shards are memory-mapped on the first access and never read completely
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_FILE_NAME), "r") as file:
+            index = json.load(file)
+
+        self.__directory = directory
+        self.__shards: List[dict] = index["shards"]
+        self.__offsets = list(np.cumsum([0] + [shard["rows"] for shard in self.__shards]))
+        self.__arrays = dict()
+
+    def __len__(self):
+        return int(self.__offsets[-1])
+
+    def __getitem__(self, item):
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(f"Transition {item} is out of range.")
+
+        shard = bisect.bisect_right(self.__offsets, item) - 1
+        row = item - self.__offsets[shard]
+        arrays = self.__shard_arrays(shard)
+
+        return tuple(arrays[field][row] for field in FIELDS)
+
+    def sample(self, batch_size, random_generator: np.random.Generator = None):
+        random_generator = random_generator or np.random.default_rng()
+        transitions = [self[int(i)] for i in np.sort(random_generator.integers(0, len(self), batch_size))]
+
+        return tuple(np.stack(values) for values in zip(*transitions))
+
+    def __shard_arrays(self, shard):
+        if shard not in self.__arrays:
+            name = self.__shards[shard]["name"]
+            self.__arrays[shard] = {
+                field: np.load(os.path.join(self.__directory, f"{name}.{field}.npy"), mmap_mode="r") for field in FIELDS
+            }
+
+        return self.__arrays[shard]
@@ -0,0 +1,149 @@
+import weakref
+from typing import Dict, Optional
+
+import numpy as np
+
+from EventHandlers import RELOAD_GAME_EVENT, ADD_GOLD_EVENT
+from Logic import GameEngine, WorldObserver
+from Objects import Enemy, Ally
+from Service import Connectivity
+
+STAIRS = RELOAD_GAME_EVENT
+CHEST = ADD_GOLD_EVENT
+ENEMY = "enemy"
+
+UNREACHABLE = 2 ** 30
+
+
+def object_kind(obj) -> Optional[str]:
+    # allies are told apart by their action, so stairs and chests are kinds of their own
+    if isinstance(obj, Enemy):
+        return ENEMY
+    if isinstance(obj, Ally):
+        return obj.action
+
+    return None
+
+
+class DistanceField:
+    # multi-source BFS distances over the floor; every cell also remembers which source is the nearest one,
+    # so removing a source only invalidates the cells it owned
+    NO_OWNER = -1
+
+    def __init__(self, floor: np.ndarray, sources):
+        self.__floor = floor
+        self.__sources = dict()
+        # the arrays have a border of unreachable cells, so neighbours of every cell are plain shifted views
+        self.__padded_distances = np.full((floor.shape[0] + 2, floor.shape[1] + 2), UNREACHABLE, dtype=np.int32)
+        self.__padded_owners = np.full(self.__padded_distances.shape, self.NO_OWNER, dtype=np.int32)
+        self.__distances = self.__padded_distances[1:-1, 1:-1]
+        self.__owners = self.__padded_owners[1:-1, 1:-1]
+
+        for index, obj in enumerate(sources):
+            x, y = obj.position
+            self.__sources[obj] = index
+
+            if floor[y, x]:
+                self.__distances[y, x] = 0
+                self.__owners[y, x] = index
+
+        self.__relax(self.__floor.copy())
+
+    @property
+    def distances(self) -> np.ndarray:
+        return self.__distances
+
+    def distance(self, position) -> int:
+        return int(self.__distances[position[1], position[0]])
+
+    def remove_source(self, obj):
+        index = self.__sources.pop(obj, None)
+
+        if index is None:
+            return
+
+        region = self.__owners == index
+        self.__distances[region] = UNREACHABLE
+        self.__owners[region] = self.NO_OWNER
+        self.__relax(region)
+
+    def __relax(self, region: np.ndarray):
+        ys, xs = np.nonzero(region)
+
+        if len(ys) == 0:
+            return
+
+        # only the bounding box of the region (plus its border which seeds the distances) is recalculated
+        top, bottom = max(ys.min() - 1, 0), min(ys.max() + 2, region.shape[0])
+        left, right = max(xs.min() - 1, 0), min(xs.max() + 2, region.shape[1])
+        distances = self.__distances[top:bottom, left:right]
+        owners = self.__owners[top:bottom, left:right]
+        region = region[top:bottom, left:right] & self.__floor[top:bottom, left:right]
+        # shifted views of the padded arrays: the cells above, below, to the left and to the right
+        neighbours = [(self.__padded_distances[top + dy:bottom + dy, left + dx:right + dx],
+                       self.__padded_owners[top + dy:bottom + dy, left + dx:right + dx])
+                      for dx, dy in ((1, 0), (1, 2), (0, 1), (2, 1))]
+
+        while True:
+            best_distances, best_owners = distances, owners
+
+            for neighbour_distances, neighbour_owners in neighbours:
+                better = neighbour_distances + 1 < best_distances
+                best_distances = np.where(better, neighbour_distances + 1, best_distances)
+                best_owners = np.where(better, neighbour_owners, best_owners)
+
+            improved = region & (best_distances < distances)
+
+            if not improved.any():
+                break
+
+            distances[improved] = best_distances[improved]
+            owners[improved] = best_owners[improved]
+
+
+class DistanceFields(WorldObserver):
+    # fields are calculated lazily once per level and kind, then kept up to date when objects are deleted
+    def __init__(self, engine: GameEngine):
+        # the engine keeps its observers alive, a proxy lets caches of fields be keyed weakly by the engine
+        self.__engine = weakref.proxy(engine)
+        self.__floor = None
+        self.__fields: Dict[str, DistanceField] = dict()
+
+        engine.attach_observer(self)
+
+    def map_loaded(self, engine):
+        self.__floor = None
+        self.__fields.clear()
+
+    def objects_changed(self, engine):
+        self.__fields.clear()
+
+    def objects_moved(self, engine):
+        # only enemies move, the other fields stay valid
+        self.__fields.pop(ENEMY, None)
+
+    def object_deleted(self, engine, obj):
+        field = self.__fields.get(object_kind(obj))
+
+        if field is not None:
+            field.remove_source(obj)
+
+    def field(self, kind) -> DistanceField:
+        if kind not in self.__fields:
+            sources = [obj for obj in self.__engine.get_objects() if object_kind(obj) == kind]
+            self.__fields[kind] = DistanceField(self.floor, sources)
+
+        return self.__fields[kind]
+
+    def distance(self, kind, position) -> int:
+        return self.field(kind).distance(position)
+
+    @property
+    def floor(self) -> np.ndarray:
+        if self.__floor is None:
+            self.__floor = ~Connectivity.wall_mask(self.__engine.map)
+
+        return self.__floor
+
+    def detach(self):
+        self.__engine.detach_observer(self)
@@ -0,0 +1,195 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from Logic import GameEngine, WorldObserver, Action
+from Objects import Enemy
+from Service import Connectivity
+
+DEFAULT_AGGRO_RADIUS = 5
+DEFAULT_PATROL_RADIUS = 3
+SHIFTS = np.array(Action.SHIFTS, dtype=np.int32)
+
+
+class EnemyStore:
+    # struct of arrays of all enemies on a level; Enemy objects bound to the store are views of their rows
+    ARRAYS = ("positions", "homes", "hp", "strength", "xp", "alive", "directions")
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.__resize(capacity)
+
+    def add(self, enemy: Enemy) -> int:
+        index = self.add_row()
+        self.positions[index] = enemy.position
+        self.homes[index] = enemy.position
+        self.hp[index] = enemy.hp
+        self.strength[index] = enemy.strength
+        self.xp[index] = enemy.xp
+        self.alive[index] = True
+        self.directions[index] = 0
+        enemy.bind(self, index)
+
+        return index
+
+    def rebuild(self, enemies: Sequence[Enemy]):
+        # enemies which are already views of the store keep their rows, the others are read from their attributes
+        previous = {name: getattr(self, name)[:self.count].copy() for name in self.ARRAYS}
+        rows = [enemy._index if enemy._store is self else None for enemy in enemies]
+        self.clear()
+
+        for enemy, row in zip(enemies, rows):
+            if row is None:
+                self.add(enemy)
+                continue
+
+            index = self.add_row()
+            for name, array in previous.items():
+                getattr(self, name)[index] = array[row]
+            enemy.bind(self, index)
+
+    def add_row(self) -> int:
+        if self.count == len(self.alive):
+            self.__resize(2 * len(self.alive))
+
+        self.count += 1
+
+        return self.count - 1
+
+    def remove(self, index):
+        self.alive[index] = False
+
+    def clear(self):
+        self.count = 0
+        self.alive[:] = False
+
+    def position(self, index) -> Tuple[int, int]:
+        x, y = self.positions[index]
+
+        return int(x), int(y)
+
+    def __resize(self, capacity):
+        count = self.count
+        arrays = {
+            "positions": np.zeros((capacity, 2), dtype=np.int32),
+            "homes": np.zeros((capacity, 2), dtype=np.int32),
+            "hp": np.zeros(capacity, dtype=np.int32),
+            "strength": np.zeros(capacity, dtype=np.int32),
+            "xp": np.zeros(capacity, dtype=np.int32),
+            "alive": np.zeros(capacity, dtype=bool),
+            "directions": np.zeros(capacity, dtype=np.int8),
+        }
+
+        # views read their rows through the store on every access, so the arrays can be replaced
+        for name, array in arrays.items():
+            if count > 0:
+                array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+
+
+class EnemyMovement(WorldObserver):
+    # enemies patrol around the cell they were generated on and chase the nearest hero within the aggro radius;
+    # all enemies of the level make their step at once. An enemy stepping onto a hero starts a fight.
+    def __init__(self, engine: GameEngine, aggro_radius=DEFAULT_AGGRO_RADIUS, patrol_radius=DEFAULT_PATROL_RADIUS,
+                 tick_on_turn=True, seed=None):
+        self.__engine = engine
+        self.__aggro_radius = aggro_radius
+        self.__patrol_radius = patrol_radius
+        self.__tick_on_turn = tick_on_turn
+        self.__random = np.random.default_rng(seed)
+        self.__store = EnemyStore()
+        self.__walls = None
+        # cells of the other objects, enemies never step onto them
+        self.__blocked = None
+
+        engine.attach_observer(self)
+        if engine.map is not None:
+            self.map_loaded(engine)
+            self.objects_changed(engine)
+
+    @property
+    def store(self) -> EnemyStore:
+        return self.__store
+
+    def map_loaded(self, engine):
+        self.__walls = Connectivity.wall_mask(engine.map)
+        self.__blocked = np.zeros_like(self.__walls)
+
+    def objects_changed(self, engine):
+        self.__store.rebuild([obj for obj in engine.get_objects() if isinstance(obj, Enemy)])
+
+        if self.__walls is None:
+            return
+
+        self.__blocked = np.zeros_like(self.__walls)
+        for obj in engine.get_objects():
+            if not isinstance(obj, Enemy):
+                self.__blocked[obj.position[1], obj.position[0]] = True
+
+    def object_deleted(self, engine, obj):
+        if isinstance(obj, Enemy):
+            if obj._store is self.__store:
+                self.__store.remove(obj._index)
+        elif self.__blocked is not None:
+            self.__blocked[obj.position[1], obj.position[0]] = False
+
+    def turn_passed(self, engine):
+        if self.__tick_on_turn and engine.game_process:
+            self.tick([engine.hero.position])
+            engine.interact()
+
+    def tick(self, hero_positions: Sequence[Sequence[int]]):
+        store = self.__store
+        moving = np.flatnonzero(store.alive[:store.count])
+
+        if len(moving) == 0 or len(hero_positions) == 0:
+            return
+
+        positions = store.positions[moving]
+        heroes = np.asarray(hero_positions, dtype=np.int32).reshape(-1, 2)
+
+        # the nearest hero by manhattan distance is chased when it is close enough
+        distances = np.abs(positions[:, None, :] - heroes[None, :, :]).sum(axis=2)
+        nearest = distances.argmin(axis=1)
+        chasing = distances[np.arange(len(moving)), nearest] <= self.__aggro_radius
+        delta = heroes[nearest] - positions
+        along_x = np.abs(delta[:, 0]) >= np.abs(delta[:, 1])
+        preferred = np.stack([np.where(along_x, np.sign(delta[:, 0]), 0),
+                              np.where(along_x, 0, np.sign(delta[:, 1]))], axis=1)
+        alternative = np.stack([np.where(along_x, 0, np.sign(delta[:, 0])),
+                                np.where(along_x, np.sign(delta[:, 1]), 0)], axis=1)
+
+        patrol = SHIFTS[store.directions[moving]]
+        steps = np.where(chasing[:, None], preferred, patrol)
+
+        targets = positions + steps
+        free = self.__free(targets)
+        # a chasing enemy blocked on the preferred axis tries the other one
+        retry = chasing & ~free & alternative.any(axis=1)
+        targets[retry] = positions[retry] + alternative[retry]
+        free[retry] = self.__free(targets[retry])
+
+        # a patrolling enemy turns when it hits an obstacle or the border of its patrol area
+        homes = store.homes[moving]
+        turning = ~chasing & (~free | (np.abs(targets - homes).max(axis=1) > self.__patrol_radius))
+        store.directions[moving[turning]] = self.__random.integers(0, len(Action.ALL), turning.sum())
+        free &= ~turning
+
+        # enemies do not step onto cells of other enemies, the first one wins a cell wanted by several
+        occupied = np.zeros_like(self.__walls)
+        occupied[positions[:, 1], positions[:, 0]] = True
+        free &= ~occupied[targets[:, 1], targets[:, 0]]
+        cells = targets[:, 1] * self.__walls.shape[1] + targets[:, 0]
+        candidates = np.flatnonzero(free)
+        _, first = np.unique(cells[candidates], return_index=True)
+        movers = candidates[first]
+
+        if len(movers) > 0:
+            store.positions[moving[movers]] = targets[movers]
+            self.__engine.objects_moved()
+
+    def detach(self):
+        self.__engine.detach_observer(self)
+
+    def __free(self, targets):
+        return ~self.__walls[targets[:, 1], targets[:, 0]] & ~self.__blocked[targets[:, 1], targets[:, 0]]
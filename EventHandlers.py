@@ -1,10 +1,12 @@
 import random
+import time
 from abc import ABC, abstractmethod
 from typing import Type
 
 from Event import Event, EventPayload
 from Logic import GameEngine
-from Objects import Blessing, Berserk, Weakness, Anger, Ally, Enemy
+from Metrics import EVENTS, LEVEL_LOADS, LEVEL_LOAD_SECONDS, OBJECTS_PER_LEVEL
+from Objects import Blessing, Berserk, Weakness, Anger, Ally, Enemy, release_objects
 from Service import LevelsProvider
 
 RELOAD_GAME_EVENT = "reload_game"
@@ -41,6 +43,21 @@ class GameEventHandler(ABC):
             raise ValueError(f"Cannot find argument of type {arg_type}.")
 
 
+def generate_level(levels_provider: LevelsProvider, index):
+    # levels after the last one repeat the last level
+    levels = levels_provider.get_levels()
+    level = levels[min(index, len(levels) - 1)]
+
+    start = time.perf_counter()
+    _map = level.level_map.get_map()
+    _objects = level.level_objects.get_objects(_map)
+    LEVEL_LOAD_SECONDS.observe(time.perf_counter() - start)
+    LEVEL_LOADS.inc()
+    OBJECTS_PER_LEVEL.observe(len(_objects))
+
+    return _map, _objects
+
+
 class ReloadGameEventHandler(GameEventHandler):
     def __init__(self, levels_provider: LevelsProvider):
         self.__levels_provider = levels_provider
@@ -48,14 +65,11 @@ class ReloadGameEventHandler(GameEventHandler):
     def action(self, engine: GameEngine, payload: Ally.InteractedWithHeroEventPayload):
         engine.level += 1
         payload.hero.reset_position()
+        # the objects of the left level are reused for the next one
+        release_objects(engine.get_objects())
         engine.delete_objects()
 
-        levels = self.__levels_provider.get_levels()
-        level_max = len(levels) - 1
-        level = levels[min(engine.level, level_max)]
-
-        _map = level.level_map.get_map()
-        _objects = level.level_objects.get_objects(_map)
+        _map, _objects = generate_level(self.__levels_provider, engine.level)
 
         engine.load_map(_map)
         engine.add_objects(_objects)
@@ -157,9 +171,14 @@ class EventHandler:
 
         self.__engine.subscribe(self)
 
+    def register(self, event_name, event_handler: GameEventHandler):
+        # replaces the handler of the event, e.g. the engines of many heroes handle the stairs differently
+        self.__event_handlers[event_name] = event_handler
+
     def update(self, event):
         if isinstance(event, Event):
             if event.name in self.__event_handlers:
+                EVENTS.inc(event.name)
                 self.__event_handlers[event.name](self.__engine, event.payload)
             else:
                 raise MissingEventHandlerError(f"Cannot find event handler for {event.name}.")
@@ -0,0 +1,188 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+from typing import Iterator
+
+from Event import Event
+from Logic import GameEngine, WorldObserver
+from Metrics import REGISTRY
+from Objects import Effect, Enemy
+from Threads import put_while_alive
+
+FILE_PATTERN = "events-{:05d}.jsonl.gz"
+DEFAULT_MAX_FILE_BYTES = 8 * 2 ** 20
+DEFAULT_MAX_PENDING = 2 ** 16
+# records taken from the queue at once by the writer thread
+BATCH_SIZE = 1024
+
+LOGGED_EVENTS = REGISTRY.counter("kitd_event_log_records_total", "Gameplay events written to the event log.")
+DROPPED_EVENTS = REGISTRY.counter("kitd_event_log_dropped_total",
+                                  "Gameplay events dropped because the event log writer fell behind.")
+
+
+class EventLogWriter:
+    # records are queued and written by a background thread into gzipped JSON-lines files, a new file is started
+    # when the current one reaches `max_file_bytes`; when more than `max_pending` records are not written yet
+    # the new ones are dropped, so the game never waits for the disk
+    def __init__(self, directory, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_pending=DEFAULT_MAX_PENDING,
+                 compress_level=6):
+        self.__directory = directory
+        self.__max_file_bytes = max_file_bytes
+        self.__compress_level = compress_level
+        self.__queue = queue.Queue(maxsize=max_pending)
+        self.__files = 0
+        self.__error = None
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__run, name="event-log-writer", daemon=True)
+        self.__thread.start()
+
+    def write(self, record: dict):
+        try:
+            self.__queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED_EVENTS.inc()
+
+    def close(self):
+        put_while_alive(self.__queue, None, self.__thread)
+        self.__thread.join()
+
+        if self.__error is not None:
+            raise self.__error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __run(self):
+        raw, file = None, None
+
+        try:
+            while True:
+                batch = [self.__queue.get()]
+                while batch[-1] is not None and len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self.__queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                closing = batch[-1] is None
+                records = batch[:-1] if closing else batch
+
+                for record in records:
+                    if file is None:
+                        raw, file = self.__open_file()
+                    file.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+
+                    # the compressed size lags behind by the buffer of the compressor, which is enough for rotation
+                    if raw.tell() >= self.__max_file_bytes:
+                        file.close()
+                        raw.close()
+                        raw, file = None, None
+                LOGGED_EVENTS.inc(amount=len(records))
+
+                if closing:
+                    break
+        except Exception as error:
+            self.__error = error
+        finally:
+            if file is not None:
+                file.close()
+                raw.close()
+
+    def __open_file(self):
+        raw = open(os.path.join(self.__directory, FILE_PATTERN.format(self.__files)), "wb")
+        self.__files += 1
+
+        return raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.__compress_level)
+
+
+def read_events(directory) -> Iterator[dict]:
+    for path in sorted(glob.glob(os.path.join(directory, FILE_PATTERN.replace("{:05d}", "*")))):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+
+class EventRecorder(WorldObserver):
+    # turns the game events of an engine into records of the event log. Events are collected during a turn and
+    # written when it has passed, so the records show their results: damage taken, gold and experience changes
+    # and effects applied or removed, along with the messages of the turn
+    def __init__(self, engine: GameEngine, writer: EventLogWriter, game=0):
+        self.__engine = engine
+        self.__writer = writer
+        self.__game = game
+        self.__tick = 0
+        self.__events = []
+        self.__messages = []
+        self.__hero = self.__hero_state()
+
+        engine.subscribe(self)
+        engine.attach_observer(self)
+
+    def detach(self):
+        self.__engine.unsubscribe(self)
+        self.__engine.detach_observer(self)
+
+    def update(self, message):
+        if isinstance(message, Event):
+            event = {"event": message.name}
+            if isinstance(message.payload, Enemy.InteractedWithHeroEventPayload):
+                event["damage"] = message.payload.damage
+                event["enemy_xp"] = message.payload.enemy.xp
+            self.__events.append(event)
+        elif isinstance(message, str):
+            self.__messages.append(message)
+
+    def turn_passed(self, engine):
+        self.__tick += 1
+        if not self.__events:
+            self.__messages.clear()
+            return
+
+        before, after = self.__hero, self.__hero_state()
+        changes = {
+            "hp": after["hp"] - before["hp"],
+            "gold": after["gold"] - before["gold"],
+            "xp": after["exp"] - before["exp"],
+        }
+        # effects are layers around the hero, only the outermost ones are applied or removed
+        kept = 0
+        while kept < min(len(before["effects"]), len(after["effects"])) and \
+                before["effects"][kept] == after["effects"][kept]:
+            kept += 1
+        added, removed = after["effects"][kept:], before["effects"][kept:]
+
+        for event in self.__events:
+            record = {"game": self.__game, "tick": self.__tick, "level": engine.level, **event, **changes,
+                      "game_over": not engine.game_process, "hero": after, "messages": self.__messages}
+            if added:
+                record["effect"] = added[-1]
+            if removed:
+                record["effect_removed"] = removed[-1]
+            self.__writer.write(record)
+
+        self.__hero = after
+        self.__events = []
+        self.__messages = []
+
+    def __hero_state(self) -> dict:
+        hero = self.__engine.hero
+        effects = []
+        layer = hero
+        while isinstance(layer, Effect):
+            effects.append(type(layer).__name__)
+            layer = layer.base
+        effects.reverse()
+        stats = hero.stats
+
+        return {"hp": hero.hp, "max_hp": hero.max_hp, "level": hero.level, "exp": hero.exp, "gold": hero.gold,
+                "strength": stats.strength, "endurance": stats.endurance, "intelligence": stats.intelligence,
+                "luck": stats.luck, "effects": effects}
@@ -0,0 +1,176 @@
+import weakref
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from Logic import GameEngine, WorldObserver
+from Service import Connectivity
+
+DEFAULT_RADIUS = 6
+# transformations (xx, xy, yx, yy) of the first octant into all eight of them
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+
+def shadowcast(opaque: Sequence[Sequence[bool]], origin, radius) -> np.ndarray:
+    # recursive shadowcasting: every octant is scanned row by row, opaque cells narrow the visible slopes of the
+    # next rows. Returns sorted flat indexes of the visible cells, the walls which block the view are visible too
+    height, width = len(opaque), len(opaque[0])
+    origin_x, origin_y = origin
+    visible = {origin_y * width + origin_x}
+
+    def cast(row, start, end, xx, xy, yx, yy):
+        if start < end:
+            return
+
+        new_start = start
+        for distance in range(row, radius + 1):
+            blocked = False
+            dy = -distance
+
+            for dx in range(-distance, 1):
+                left_slope, right_slope = (dx - 0.5) / (dy + 0.5), (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+
+                x, y = origin_x + dx * xx + dy * xy, origin_y + dx * yx + dy * yy
+                inside = 0 <= x < width and 0 <= y < height
+                if inside and dx * dx + dy * dy <= radius * radius:
+                    visible.add(y * width + x)
+                wall = not inside or opaque[y][x]
+
+                if blocked:
+                    if wall:
+                        new_start = right_slope
+                    else:
+                        blocked = False
+                        start = new_start
+                elif wall and distance < radius:
+                    blocked = True
+                    cast(distance + 1, start, left_slope, xx, xy, yx, yy)
+                    new_start = right_slope
+
+            if blocked:
+                break
+
+    for octant in OCTANTS:
+        cast(1, 1., 0., *octant)
+
+    return np.array(sorted(visible), dtype=np.intp)
+
+
+class VisibilityCache:
+    # the map does not change during a level, so the visible cells of every (cell, radius) are calculated once
+    # and shared by all heroes on the level
+    def __init__(self, game_map):
+        self.map = game_map
+        self.opaque = Connectivity.wall_mask(game_map)
+        self.__opaque_rows = self.opaque.tolist()
+        self.__cells: Dict[Tuple[int, int, int], np.ndarray] = dict()
+
+    def visible_cells(self, position, radius) -> np.ndarray:
+        key = (position[0], position[1], radius)
+        cells = self.__cells.get(key)
+
+        if cells is None:
+            cells = self.__cells[key] = shadowcast(self.__opaque_rows, position, radius)
+
+        return cells
+
+
+class FieldOfView(WorldObserver):
+    # cells seen by the hero of the engine: the visible ones from the current position and the explored ones which
+    # were seen at least once on the level. After a move only the cells of the previous and the new view are updated
+    __caches = weakref.WeakKeyDictionary()
+
+    def __init__(self, engine: GameEngine, radius=DEFAULT_RADIUS):
+        self.__engine = engine
+        self.__radius = radius
+        self.__cache = None
+        self.__visible = None
+        self.__explored = None
+        self.__visible_cells = np.zeros(0, dtype=np.intp)
+        self.__position = None
+
+        engine.attach_observer(self)
+
+    @property
+    def radius(self):
+        return self.__radius
+
+    @property
+    def visible(self) -> np.ndarray:
+        self.__update()
+
+        return self.__visible
+
+    @property
+    def explored(self) -> np.ndarray:
+        self.__update()
+
+        return self.__explored
+
+    def map_loaded(self, engine):
+        # a new level starts unexplored
+        self.__cache = None
+
+    def turn_passed(self, engine):
+        self.__update()
+
+    def observation_mask(self) -> np.ndarray:
+        # visible cells in a square window around the hero, cells outside of the map are not visible
+        size = 2 * self.__radius + 1
+        mask = np.zeros((size, size), dtype=np.float32)
+        visible = self.visible
+
+        if visible is None:
+            return mask
+
+        x, y = self.__position
+        height, width = visible.shape
+        top, left = max(y - self.__radius, 0), max(x - self.__radius, 0)
+        bottom, right = min(y + self.__radius + 1, height), min(x + self.__radius + 1, width)
+        mask[top - y + self.__radius:bottom - y + self.__radius, left - x + self.__radius:right - x + self.__radius] = \
+            visible[top:bottom, left:right]
+
+        return mask
+
+    def detach(self):
+        self.__engine.detach_observer(self)
+
+    def __update(self):
+        engine = self.__engine
+
+        if engine.map is None or engine.hero is None:
+            return
+
+        if self.__cache is None or self.__cache.map is not engine.map:
+            self.__cache = self.__get_cache(engine)
+            self.__visible = np.zeros(self.__cache.opaque.shape, dtype=bool)
+            self.__explored = np.zeros(self.__cache.opaque.shape, dtype=bool)
+            self.__visible_cells = np.zeros(0, dtype=np.intp)
+            self.__position = None
+
+        position = tuple(engine.hero.position)
+
+        if position == self.__position:
+            return
+
+        cells = self.__cache.visible_cells(position, self.__radius)
+        self.__visible.flat[self.__visible_cells] = False
+        self.__visible.flat[cells] = True
+        self.__explored.flat[cells] = True
+        self.__visible_cells = cells
+        self.__position = position
+
+    @classmethod
+    def __get_cache(cls, engine) -> VisibilityCache:
+        level = engine.shared_level
+        cache = cls.__caches.get(level)
+
+        if cache is None or cache.map is not engine.map:
+            cache = cls.__caches[level] = VisibilityCache(engine.map)
+
+        return cache
@@ -1,13 +1,25 @@
 import os
 
-import pygame
+from Metrics import IMAGE_CACHE_HITS, IMAGE_CACHE_MISSES
 
 
 class Fixture:
+    __shared = dict()
+
     def __init__(self, fixture_path, fixture_type=None):
         self.__fixture_type = fixture_type
         self.__fixture_path = fixture_path
 
+    @classmethod
+    def shared(cls, fixture_path, fixture_type=None) -> "Fixture":
+        # fixtures never change, so all objects with the same texture use one instance
+        key = (fixture_path, fixture_type)
+
+        if key not in cls.__shared:
+            cls.__shared[key] = cls(fixture_path, fixture_type)
+
+        return cls.__shared[key]
+
     def sprite(self, width, height):
         return ImagesProvider.load_sprite(self.__fixture_path, width, height)
 
@@ -15,6 +27,10 @@ class Fixture:
     def fixture_type(self):
         return self.__fixture_type
 
+    @property
+    def path(self):
+        return self.__fixture_path
+
 
 class FixtureType:
     WALL = "wall"
@@ -24,39 +40,67 @@ class FixtureType:
 
 
 class SpecialFixtures:
-    WALL = Fixture(os.path.join("texture", "wall.png"), FixtureType.WALL)
-    FLOOR_1 = Fixture(os.path.join("texture", "Ground_1.png"), FixtureType.FLOOR_1)
-    FLOOR_2 = Fixture(os.path.join("texture", "Ground_2.png"), FixtureType.FLOOR_2)
-    FLOOR_3 = Fixture(os.path.join("texture", "Ground_3.png"), FixtureType.FLOOR_3)
+    WALL = Fixture.shared(os.path.join("texture", "wall.png"), FixtureType.WALL)
+    FLOOR_1 = Fixture.shared(os.path.join("texture", "Ground_1.png"), FixtureType.FLOOR_1)
+    FLOOR_2 = Fixture.shared(os.path.join("texture", "Ground_2.png"), FixtureType.FLOOR_2)
+    FLOOR_3 = Fixture.shared(os.path.join("texture", "Ground_3.png"), FixtureType.FLOOR_3)
+    ALL = (WALL, FLOOR_1, FLOOR_2, FLOOR_3)
 
 
 class ImagesProvider:
     _images_cache = dict()
     _sprites_cache = dict()
+    # optional persistent cache of scaled sprites with load(path, width, height) and store(..., sprite)
+    disk_cache = None
 
     @classmethod
     def load_sprite(cls, path, width, height):
         key = f"{path}-{width}-{height}"
 
         if key not in cls._sprites_cache:
-            image = cls.load_image(path)
-            sprite = cls.create_sprite(image, width, height)
+            sprite = cls.disk_cache.load(path, width, height) if cls.disk_cache is not None else None
+
+            if sprite is not None:
+                IMAGE_CACHE_HITS.inc("sprites_disk")
+            else:
+                IMAGE_CACHE_MISSES.inc("sprites")
+                image = cls.load_image(path)
+                sprite = cls.create_sprite(image, width, height)
+
+                if cls.disk_cache is not None:
+                    cls.disk_cache.store(path, width, height, sprite)
 
             cls._sprites_cache[key] = sprite
 
             return sprite
 
+        IMAGE_CACHE_HITS.inc("sprites")
         return cls._sprites_cache[key]
 
     @classmethod
     def load_image(cls, path):
         if path not in cls._images_cache:
+            IMAGE_CACHE_MISSES.inc("images")
+            # pygame is imported on the first decoded texture, so headless games never load it
+            import pygame
             cls._images_cache[path] = pygame.image.load(path).convert_alpha()
+        else:
+            IMAGE_CACHE_HITS.inc("images")
 
         return cls._images_cache[path]
 
+    @classmethod
+    def add_image(cls, path, image):
+        cls._images_cache[path] = image
+
+    @classmethod
+    def add_sprite(cls, path, width, height, sprite):
+        cls._sprites_cache[f"{path}-{width}-{height}"] = sprite
+
     @staticmethod
     def create_sprite(image, width, height):
+        import pygame
+
         icon = pygame.transform.scale(image, (width, height))
         sprite = pygame.Surface((width, height), pygame.HWSURFACE)
         sprite.blit(icon, (0, 0))
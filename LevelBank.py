@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import List
+
+import numpy as np
+
+from Images import Fixture, SpecialFixtures
+from Objects import Enemy, ENEMY_POOL, ALLY_POOL
+from Replay import seed_everything
+from Service import LevelsProvider, Level, MapFactory, EndMap, OBJECT_TEXTURE, ALLY_TEXTURE, ENEMY_TEXTURE
+from Settings import SettingsProvider, ObjectStatistic
+from Simulation import SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+# file layout: magic, length of the header, JSON header, records of every level of levels.yml one after another;
+# the records start at a multiple of RECORDS_ALIGNMENT, so the file can be mapped as an array of records
+MAGIC = b"KITDBNK\0"
+VERSION = 1
+PREFIX = struct.Struct("<8sI")
+RECORDS_ALIGNMENT = 64
+DEFAULT_RECORDS = 100000
+DEFAULT_MAX_OBJECTS = 128
+DEFAULT_CHUNK_SIZE = 1024
+OBJECT_DTYPE = np.dtype([("prototype", np.uint16), ("x", np.uint8), ("y", np.uint8)])
+
+
+class LevelBankFormatError(Exception):
+    pass
+
+
+def record_dtype(map_shape, max_objects) -> np.dtype:
+    # tiles are indexes of SpecialFixtures.ALL, objects are indexes of prototypes with their positions
+    return np.dtype([("tiles", np.uint8, tuple(map_shape)), ("count", np.uint16),
+                     ("objects", OBJECT_DTYPE, (max_objects,))])
+
+
+def describe_prototypes(settings_provider: SettingsProvider) -> List[list]:
+    # every kind of object the levels can contain, in the order of the settings
+    prototypes = [["ally", os.path.join(OBJECT_TEXTURE, prop.sprite), prop.action]
+                  for prop in settings_provider.get_objects()]
+    prototypes += [["ally", os.path.join(ALLY_TEXTURE, prop.sprite), prop.action]
+                   for prop in settings_provider.get_ally()]
+    prototypes += [["enemy", os.path.join(ENEMY_TEXTURE, prop.sprite), prop.experience,
+                    [prop.statistic.strength, prop.statistic.endurance, prop.statistic.intelligence,
+                     prop.statistic.luck]] for prop in settings_provider.get_enemies()]
+
+    return prototypes
+
+
+def generate_records(bank_path, entry, start, stop, seed, settings_file_path, levels_file_path):
+    # runs in a worker process and writes the records of one chunk straight into the mapped file
+    bank = LevelBank(bank_path, writable=True)
+    settings_provider = SettingsProvider(settings_file_path)
+    map_factory, config = LevelsProvider.load_configs(levels_file_path)[entry]
+    map_factory.register_settings_provider(settings_provider)
+    tiles = {id(fixture): index for index, fixture in enumerate(SpecialFixtures.ALL)}
+    # allies are told apart by their sprite and action, enemies by their sprite and experience
+    prototypes = {tuple(description[:3]): index
+                  for index, description in enumerate(describe_prototypes(settings_provider))}
+
+    records = bank.records(entry)
+    seed_everything(seed)
+
+    for index in range(start, stop):
+        level = map_factory.from_config(dict(config or {}))
+        _map = level.level_map.get_map()
+        _objects = level.level_objects.get_objects(_map)
+
+        if (len(_map), len(_map[0])) != bank.map_shape:
+            raise LevelBankFormatError(f"Level {entry} has a map of {len(_map)}x{len(_map[0])} cells, "
+                                       f"the bank stores maps of {bank.map_shape[0]}x{bank.map_shape[1]} cells.")
+        if len(_objects) > bank.max_objects:
+            raise LevelBankFormatError(f"Level {entry} has {len(_objects)} objects, "
+                                       f"the bank stores at most {bank.max_objects}.")
+
+        records["tiles"][index] = [[tiles[id(cell)] for cell in row] for row in _map]
+        records["count"][index] = len(_objects)
+        objects = records["objects"][index, :len(_objects)]
+        objects["prototype"] = [prototypes[("enemy", obj.fixture.path, obj.xp) if isinstance(obj, Enemy)
+                                           else ("ally", obj.fixture.path, obj.action)] for obj in _objects]
+        objects["x"] = [obj.position[0] for obj in _objects]
+        objects["y"] = [obj.position[1] for obj in _objects]
+
+    bank.flush()
+
+    return stop - start
+
+
+class LevelBank:
+    # pre-generated levels of every entry of a levels file, mapped into memory; a level is taken by its index,
+    # so a game gets a new level without generating anything
+    def __init__(self, path, writable=False):
+        with open(path, "rb") as file:
+            magic, header_length = PREFIX.unpack(file.read(PREFIX.size))
+            if magic != MAGIC:
+                raise LevelBankFormatError(f"File {path} is not a level bank.")
+            header = json.loads(file.read(header_length))
+
+        if header["version"] != VERSION:
+            raise LevelBankFormatError(f"Unsupported level bank version {header['version']}.")
+
+        self.path = path
+        self.levels_file_path = header["levels_file_path"]
+        self.map_shape = tuple(header["map_shape"])
+        self.max_objects = header["max_objects"]
+        self.records_per_entry = header["records_per_entry"]
+        self.entries = header["entries"]
+        self.__prototypes = header["prototypes"]
+        self.__records = np.memmap(path, dtype=record_dtype(self.map_shape, self.max_objects),
+                                   mode="r+" if writable else "r", offset=header["records_offset"],
+                                   shape=(self.entries, self.records_per_entry))
+        self.__tiles = np.array(SpecialFixtures.ALL, dtype=object)
+        self.__fixtures = None
+        self.__stats = None
+
+    @classmethod
+    def create(cls, path, settings_provider: SettingsProvider, levels_file_path=LEVELS_FILE_PATH,
+               records_per_entry=DEFAULT_RECORDS, max_objects=DEFAULT_MAX_OBJECTS) -> "LevelBank":
+        # allocates the file, the records are written by generate_records
+        entries = len(LevelsProvider.load_configs(levels_file_path))
+        map_shape = (MapFactory.MAP_HEIGHT, MapFactory.MAP_WIDTH)
+        header = {"version": VERSION, "levels_file_path": levels_file_path, "map_shape": map_shape,
+                  "max_objects": max_objects, "records_per_entry": records_per_entry, "entries": entries,
+                  "prototypes": describe_prototypes(settings_provider)}
+        header_length = len(json.dumps({**header, "records_offset": 0})) + 32
+        header["records_offset"] = -(-(PREFIX.size + header_length) // RECORDS_ALIGNMENT) * RECORDS_ALIGNMENT
+        encoded = json.dumps(header).encode("utf-8").ljust(header_length)
+        size = record_dtype(map_shape, max_objects).itemsize * entries * records_per_entry
+
+        with open(path, "wb") as file:
+            file.write(PREFIX.pack(MAGIC, header_length))
+            file.write(encoded)
+            file.truncate(header["records_offset"] + size)
+
+        return cls(path)
+
+    def records(self, entry) -> np.ndarray:
+        return self.__records[entry]
+
+    def flush(self):
+        self.__records.flush()
+
+    def sample(self, entry, random_generator=np.random) -> int:
+        return int(random_generator.randint(self.records_per_entry))
+
+    def level_map(self, entry, index):
+        return self.__tiles[self.__records[entry, index]["tiles"]].tolist()
+
+    def level_objects(self, entry, index) -> list:
+        record = self.__records[entry, index]
+        objects = record["objects"][:record["count"]]
+        self.__load_prototypes()
+
+        created = []
+        for prototype, x, y in zip(objects["prototype"].tolist(), objects["x"].tolist(), objects["y"].tolist()):
+            description = self.__prototypes[prototype]
+            if description[0] == "enemy":
+                created.append(ENEMY_POOL.acquire(self.__fixtures[prototype], self.__stats[prototype], description[2],
+                                                  (x, y)))
+            else:
+                created.append(ALLY_POOL.acquire(self.__fixtures[prototype], description[2], (x, y)))
+
+        return created
+
+    def levels_provider(self) -> "BankLevelsProvider":
+        return BankLevelsProvider(self)
+
+    def __load_prototypes(self):
+        # fixtures and stats are shared by all objects of a kind, as they are when levels are generated
+        if self.__fixtures is None:
+            self.__fixtures = [Fixture.shared(description[1]) for description in self.__prototypes]
+            self.__stats = [ObjectStatistic(*description[3]) if description[0] == "enemy" else None
+                            for description in self.__prototypes]
+
+
+class BankLevelsProvider:
+    # replaces LevelsProvider: every level of a game is a random record of the bank, chosen when it is reached
+    class Map:
+        def __init__(self, bank: LevelBank, entry):
+            self.__bank = bank
+            self.__entry = entry
+            self.index = None
+
+        def get_map(self):
+            if self.index is None:
+                self.index = self.__bank.sample(self.__entry)
+
+            return self.__bank.level_map(self.__entry, self.index)
+
+    class Objects:
+        def __init__(self, bank: LevelBank, entry, level_map: "BankLevelsProvider.Map"):
+            self.__bank = bank
+            self.__entry = entry
+            self.__level_map = level_map
+
+        def get_objects(self, _map):
+            return self.__bank.level_objects(self.__entry, self.__level_map.index)
+
+    def __init__(self, bank: LevelBank):
+        self.__levels = []
+
+        for entry in range(bank.entries):
+            level_map = self.Map(bank, entry)
+            self.__levels.append(Level(level_map, self.Objects(bank, entry, level_map)))
+        self.__levels.append(Level(EndMap.Map(), EndMap.Objects()))
+
+    def get_levels(self) -> List[Level]:
+        return self.__levels
+
+
+def build(path, settings_file_path=SETTINGS_FILE_PATH, levels_file_path=LEVELS_FILE_PATH,
+          records_per_entry=DEFAULT_RECORDS, max_objects=DEFAULT_MAX_OBJECTS, seed=0, workers=None,
+          chunk_size=DEFAULT_CHUNK_SIZE, callback=None) -> LevelBank:
+    # chunks of every entry are generated by a process pool, each with its own seed, so the bank does not
+    # depend on the number of workers
+    bank = LevelBank.create(path, SettingsProvider(settings_file_path), levels_file_path, records_per_entry,
+                            max_objects)
+    tasks = [(path, entry, start, min(start + chunk_size, records_per_entry),
+              int(np.random.SeedSequence([seed, entry, start]).generate_state(1)[0]), settings_file_path,
+              levels_file_path)
+             for entry in range(bank.entries) for start in range(0, records_per_entry, chunk_size)]
+
+    if workers == 0:
+        for task in tasks:
+            done = generate_records(*task)
+            if callback is not None:
+                callback(done)
+
+        return LevelBank(path)
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as executor:
+        # only a few chunks are submitted ahead, so millions of records do not make millions of futures
+        limit = 2 * workers
+        pending = set()
+        tasks = iter(tasks)
+
+        for task in tasks:
+            pending.add(executor.submit(generate_records, *task))
+
+            if len(pending) >= limit:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if callback is not None:
+                        callback(future.result())
+
+        for future in pending:
+            if callback is not None:
+                callback(future.result())
+
+    return LevelBank(path)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Pre-generate levels into a memory-mapped level bank.")
+    parser.add_argument("output", help="path of the level bank file")
+    parser.add_argument("--records", type=int, default=DEFAULT_RECORDS, help="levels generated for every entry")
+    parser.add_argument("--max-objects", type=int, default=DEFAULT_MAX_OBJECTS)
+    parser.add_argument("--workers", type=int, default=None, help="0 generates in this process")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--settings", default=SETTINGS_FILE_PATH)
+    parser.add_argument("--levels", default=LEVELS_FILE_PATH)
+
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    total = arguments.records * len(LevelsProvider.load_configs(arguments.levels))
+    done = 0
+    start = time.perf_counter()
+
+    def report(count):
+        nonlocal done
+        done += count
+        print(f"\r{done}/{total} levels, {done / (time.perf_counter() - start):.0f} levels/s", end="", flush=True)
+
+    build(arguments.output, arguments.settings, arguments.levels, arguments.records, arguments.max_objects,
+          arguments.seed, arguments.workers, arguments.chunk_size, report)
+    print()
+
+
+if __name__ == "__main__":
+    main()
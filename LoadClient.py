@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+from Logic import Action
+from Server import DEFAULT_HOST, DEFAULT_PORT
+
+
+async def play(host, port, path, moves, latencies, seed):
+    # one thin client: opens a session, sends random moves one by one and measures every round trip
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    generator = random.Random(seed)
+
+    async def request(message):
+        start = time.perf_counter()
+        writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+
+        if "error" in response:
+            raise RuntimeError(response["error"])
+
+        return response
+
+    try:
+        session = (await request({"op": "open"}))["session"]
+        for _ in range(moves):
+            delta = (await request({"op": "move", "session": session, "action": generator.choice(Action.ALL)}))["delta"]
+            if delta.get("alive") is False:
+                await request({"op": "close", "session": session})
+                session = (await request({"op": "open"}))["session"]
+        await request({"op": "close", "session": session})
+    finally:
+        writer.close()
+
+
+async def generate_load(arguments):
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*[play(arguments.host, arguments.port, arguments.unix, arguments.moves, latencies,
+                                          arguments.seed + client) for client in range(arguments.clients)],
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [result for result in results if isinstance(result, Exception)]
+    latencies = np.array(latencies) * 1000
+
+    print(f"clients: {arguments.clients}, failed: {len(failures)}, requests: {len(latencies)}, "
+          f"elapsed: {elapsed:.2f} s, throughput: {len(latencies) / elapsed:.0f} requests/s")
+    if len(latencies) > 0:
+        print(f"latency, ms: p50 {np.percentile(latencies, 50):.2f}, p90 {np.percentile(latencies, 90):.2f}, "
+              f"p99 {np.percentile(latencies, 99):.2f}, max {latencies.max():.2f}")
+    for failure in failures[:5]:
+        print(f"failure: {failure!r}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the session server with many concurrent clients.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a unix socket instead of TCP")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--moves", type=int, default=200, help="moves made by every client")
+    parser.add_argument("--seed", type=int, default=0)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(generate_load(parse_arguments()))
@@ -1,18 +1,60 @@
 from Images import FixtureType
+from Metrics import STEPS
 
 
-class GameEngine:
+class Action:
+    RIGHT = 0
+    LEFT = 1
+    UP = 2
+    DOWN = 3
+
+    ALL = (RIGHT, LEFT, UP, DOWN)
+    # shifts of the hero position for every action, in the order of ALL
+    SHIFTS = ((1, 0), (-1, 0), (0, -1), (0, 1))
+
+
+class WorldObserver:
+    # receives changes of the level state, unlike subscribers which receive messages and game events
+    def map_loaded(self, engine):
+        pass
+
+    def objects_changed(self, engine):
+        pass
+
+    def object_deleted(self, engine, obj):
+        pass
+
+    def objects_moved(self, engine):
+        pass
+
+    def turn_passed(self, engine):
+        # the hero of the engine has made a move, even into a wall
+        pass
+
+
+class SharedLevel:
+    # the map and the objects of a level; engines of many heroes can play on the same one
     def __init__(self):
-        self.__objects = []
-        self.__map = None
+        self.map = None
+        self.objects = []
+        self.engines = []
+
+
+class GameEngine:
+    def __init__(self, shared_level: SharedLevel = None):
+        self.__shared_level = shared_level or SharedLevel()
+        self.__shared_level.engines.append(self)
         self.__hero = None
         self.__level = -1
         self.__working = True
         self.__subscribers = set()
+        self.__observers = []
         self.__score = 0.
         self.__game_process = True
         self.__show_help = False
         self.__sprite_size = None
+        # incremented on every change of the world, so observers can tell whether anything has to be redrawn
+        self.__revision = 0
 
     def subscribe(self, obj):
         self.__subscribers.add(obj)
@@ -25,6 +67,17 @@ class GameEngine:
         for i in self.__subscribers:
             i.update(message)
 
+    def attach_observer(self, observer: WorldObserver):
+        self.__observers.append(observer)
+
+    def detach_observer(self, observer: WorldObserver):
+        if observer in self.__observers:
+            self.__observers.remove(observer)
+
+    @property
+    def revision(self):
+        return self.__revision
+
     @property
     def level(self):
         return self.__level
@@ -32,6 +85,7 @@ class GameEngine:
     @level.setter
     def level(self, value):
         self.__level = value
+        self.__revision += 1
 
     @property
     def score(self):
@@ -40,6 +94,7 @@ class GameEngine:
     @score.setter
     def score(self, value):
         self.__score = value
+        self.__revision += 1
 
     @property
     def working(self):
@@ -56,6 +111,7 @@ class GameEngine:
     @game_process.setter
     def game_process(self, value):
         self.__game_process = value
+        self.__revision += 1
 
     @property
     def show_help(self):
@@ -64,6 +120,7 @@ class GameEngine:
     @show_help.setter
     def show_help(self, value):
         self.__show_help = value
+        self.__revision += 1
 
     @property
     def sprite_size(self):
@@ -81,66 +138,94 @@ class GameEngine:
     @hero.setter
     def hero(self, hero):
         self.__hero = hero
+        self.__revision += 1
 
     def interact(self):
-        for obj in self.__objects:
+        for obj in self.__shared_level.objects:
             if list(obj.position) == self.hero.position:
                 self.delete_object(obj)
                 obj.interact(self, self.hero)
 
     # MOVEMENT
     def move_up(self):
-        self.__score -= 0.02
-        if self.__map[self.hero.position[1] - 1][self.hero.position[0]].fixture_type == FixtureType.WALL:
-            return
-        self.hero.position[1] -= 1
-        self.interact()
+        self.__move(0, -1)
 
     def move_down(self):
-        self.__score -= 0.02
-        if self.__map[self.hero.position[1] + 1][self.hero.position[0]].fixture_type == FixtureType.WALL:
-            return
-        self.hero.position[1] += 1
-        self.interact()
+        self.__move(0, 1)
 
     def move_left(self):
-        self.__score -= 0.02
-        if self.__map[self.hero.position[1]][self.hero.position[0] - 1].fixture_type == FixtureType.WALL:
-            return
-        self.hero.position[0] -= 1
-        self.interact()
+        self.__move(-1, 0)
 
     def move_right(self):
+        self.__move(1, 0)
+
+    def __move(self, shift_x, shift_y):
+        STEPS.inc()
+        self.__revision += 1
         self.__score -= 0.02
-        if self.__map[self.hero.position[1]][self.hero.position[0] + 1].fixture_type == FixtureType.WALL:
-            return
-        self.hero.position[0] += 1
-        self.interact()
+        if self.map[self.hero.position[1] + shift_y][self.hero.position[0] + shift_x].fixture_type != FixtureType.WALL:
+            self.hero.position[0] += shift_x
+            self.hero.position[1] += shift_y
+            self.interact()
+
+        for observer in self.__observers:
+            observer.turn_passed(self)
+
+    def move(self, action):
+        if action not in Action.ALL:
+            raise ValueError(f"Unknown action '{action}'.")
+
+        self.__move(*Action.SHIFTS[action])
 
     # MAP
     @property
     def map(self):
-        return self.__map
+        return self.__shared_level.map
+
+    @property
+    def shared_level(self) -> SharedLevel:
+        return self.__shared_level
 
     def load_map(self, game_map):
-        self.__map = game_map
+        self.__shared_level.map = game_map
+        self.__level_changed(lambda observer, engine: observer.map_loaded(engine))
 
     # OBJECTS
     def get_objects(self):
-        return self.__objects
+        return self.__shared_level.objects
 
     def add_object(self, obj):
-        self.__objects.append(obj)
+        self.__shared_level.objects.append(obj)
+        self.__objects_changed()
 
     def add_objects(self, objects):
-        self.__objects.extend(objects)
+        self.__shared_level.objects.extend(objects)
+        self.__objects_changed()
 
     def delete_object(self, obj):
-        self.__objects.remove(obj)
+        self.__shared_level.objects.remove(obj)
+        self.__level_changed(lambda observer, engine: observer.object_deleted(engine, obj))
 
     def delete_objects(self):
-        self.__objects.clear()
+        self.__shared_level.objects.clear()
+        self.__objects_changed()
+
+    def objects_moved(self):
+        # objects changed their positions, e.g. enemies patrolling the level
+        self.__level_changed(lambda observer, engine: observer.objects_moved(engine))
+
+    def __objects_changed(self):
+        self.__level_changed(lambda observer, engine: observer.objects_changed(engine))
+
+    def __level_changed(self, notify):
+        # every engine on the shared level sees the change as a change of its own world
+        for engine in self.__shared_level.engines:
+            engine.__revision += 1
+
+            for observer in engine.__observers:
+                notify(observer, engine)
 
     def check_game_is_over(self):
         self.__game_process = self.__hero.hp > 0
+        self.__revision += 1
         return not self.__game_process
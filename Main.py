@@ -1,87 +1,232 @@
+import argparse
 import os
+import time
 
-import numpy as np
+import pygame
 
-import EventHandlers
-from Event import Event
-from EventHandlers import EventHandler
-from Logic import GameEngine
-from Objects import Hero, Ally
-from ScreenEngine import *
-from Service import LevelsProvider
-from Settings import SettingsProvider, ObjectStatistic
+from FieldOfView import FieldOfView
+from Logic import Action
+from Profiler import FrameProfiler
+from ScreenEngine import create_drawer
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+from Snapshots import EngineSnapshot, MessageLog, SimulationThread, SnapshotView
+
+# policies, recording, datasets and metrics export are imported only by the modes which use them
 
 
 class KnightInTheDungeonGame:
     SCREEN_DIM = (800, 600)
     KEYBOARD_CONTROL = True
     DEFAULT_SPRITE_SIZE = 60
-    SETTINGS_FILE_PATH = "objects.yml"
-    LEVELS_FILE_PATH = "levels.yml"
-    HERO_FIXTURE_PATH = os.path.join("texture", "Hero.png")
+    SETTINGS_FILE_PATH = SETTINGS_FILE_PATH
+    LEVELS_FILE_PATH = LEVELS_FILE_PATH
+
+    PROFILER_CSV_PATH = "frame_profile.csv"
+    QUICK_SAVE_PATH = "quicksave.kitds"
+    ASSET_CACHE_DIRECTORY = os.path.join(".cache", "sprites")
+    # sprite sizes of the game surface and the mini map
+    PRELOADED_SPRITE_SIZES = (DEFAULT_SPRITE_SIZE, 8)
+    # frames per second of the renderer when the simulation runs on its own thread
+    RENDER_FRAME_RATE = 60
+
+    def __init__(self, policy: "Policy" = None, profile=False, metrics_exporter: "MetricsExporter" = None,
+                 record_directory=None, trajectory_writer: "TrajectoryWriter" = None, tick_rate=None,
+                 event_log: "EventLogWriter" = None, frame_skip=1, render_fps=None, capture: "FrameCapture" = None,
+                 capture_every=1):
+        self.__policy = policy
+        # in autoplay the game makes `frame_skip` steps per drawn frame, or with `render_fps` as many steps as fit
+        # between frames drawn at that rate; the info window is subscribed to the engine, so it gets every message
+        if frame_skip < 1:
+            raise ValueError("Frame skip should be at least 1.")
+        self.__frame_skip = frame_skip
+        self.__render_interval = 1 / render_fps if render_fps else None
+        self.__next_render = 0.
+        # with a tick rate the game logic runs on its own thread, 0 runs it as fast as possible
+        self.__tick_rate = tick_rate
+        self.__simulation = None
+        self.__field_of_view = None
+        self.__message_log = None
+        self.__trajectory_writer = trajectory_writer
+        self.__event_log = event_log
+        # every `capture_every`-th game is captured, starting with the first one
+        self.__frame_capture = capture
+        self.__capture_every = capture_every
+        self.__games = 0
+        self.__observation = None
+        self.__metrics_exporter = metrics_exporter
+        self.__record_directory = record_directory
+        self.__recorder = None
+        self.__observation_builder = None
+        self.__pending_actions = None
+        # with profile=False timings are collected only while the overlay is shown
+        self.__profile = profile
+        self.__profiler = FrameProfiler(enabled=profile)
 
     def __enter__(self):
-        pygame.init()
+        if self.__metrics_exporter is not None:
+            self.__metrics_exporter.start()
+
+        # only the modules which are used by the game are initialized
+        pygame.display.init()
+        pygame.font.init()
         pygame.display.set_caption("MyRPG")
 
         self.__display = pygame.display.set_mode(self.SCREEN_DIM)
+        self.__load_assets()
         self.__settings_provider = SettingsProvider(self.SETTINGS_FILE_PATH)
         self.__start_game(self.DEFAULT_SPRITE_SIZE)
 
         return self
 
+    def __load_assets(self):
+        from Assets import SpriteDiskCache, preload_assets
+        from Images import ImagesProvider
+
+        ImagesProvider.disk_cache = SpriteDiskCache(self.ASSET_CACHE_DIRECTORY)
+        preload_assets(self.PRELOADED_SPRITE_SIZES, ImagesProvider.disk_cache)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__save_recording()
+        if self.__trajectory_writer is not None:
+            self.__trajectory_writer.close()
+        if self.__event_log is not None:
+            self.__event_log.close()
+        if self.__frame_capture is not None:
+            self.__frame_capture.close()
+        if self.__profile:
+            self.__profiler.export_csv(self.PROFILER_CSV_PATH)
+        if self.__policy is not None:
+            self.__policy.close()
+        if self.__metrics_exporter is not None:
+            self.__metrics_exporter.stop()
         pygame.display.quit()
         pygame.quit()
 
     def __start_game(self, sprite_size):
-        self.__levels_provider = LevelsProvider(self.LEVELS_FILE_PATH, self.__settings_provider)
-        self.__hero = self.__create_hero()
-        self.__engine = GameEngine()
-        self.__engine.sprite_size = sprite_size
-
-        # initialize map and statistic for the beginning of the game
-        self.__event_handler = EventHandler(self.__engine, self.__levels_provider)
-        self.__event_handler.update(
-            Event(EventHandlers.RELOAD_GAME_EVENT, Ally.InteractedWithHeroEventPayload(self.__hero)))
-
-        self.__drawer = self.__create_drawer(sprite_size)
-        self.__drawer.connect_engine(self.__engine)
-
-    def __create_hero(self):
-        hero_icon = Fixture(self.HERO_FIXTURE_PATH)
-        hero_statistic = ObjectStatistic(strength=20, endurance=20, intelligence=5, luck=5)
-        hero = Hero(hero_statistic, hero_icon)
-
-        return hero
-
-    @staticmethod
-    def __create_drawer(sprite_size):
-        screen_handler = ScreenHandle((0, 0))
-        game_over_window = GameOverWindow((500, 200), pygame.SRCALPHA, (0, 0), screen_handler)
-        help_window = HelpWindow((700, 500), pygame.SRCALPHA, (150, 140), game_over_window)
-        info_window = InfoWindow((160, 480), (50, 50), help_window)
-        progress_bar = ProgressBar((640, 120), (640, 0), info_window)
-        mini_map_surface = GameSurface((160, 120), pygame.SRCALPHA, 8, (0, 480), progress_bar)
-        game_surface = GameSurface((640, 480), pygame.SRCALPHA, sprite_size, (640, 480), mini_map_surface)
-
-        return game_surface
-
-    def run(self):
-        while self.__engine.working:
-            if self.KEYBOARD_CONTROL:
-                self.__handle_keyboard_events()
+        if self.__record_directory is not None:
+            import secrets
+            from Replay import EpisodeRecorder, seed_everything
+
+            self.__save_recording()
+
+            seed = secrets.randbits(63)
+            seed_everything(seed)
+            self.__engine = create_engine(self.__settings_provider, self.LEVELS_FILE_PATH, sprite_size)
+            self.__recorder = EpisodeRecorder(self.__engine, seed, self.LEVELS_FILE_PATH)
+        else:
+            self.__engine = create_engine(self.__settings_provider, self.LEVELS_FILE_PATH, sprite_size)
+        self.__pending_actions = None
+        self.__engine_started(sprite_size)
+
+    def __engine_started(self, sprite_size):
+        self.__field_of_view = FieldOfView(self.__engine)
+        game = self.__games
+        self.__games += 1
+        if self.__event_log is not None:
+            from EventLog import EventRecorder
+            EventRecorder(self.__engine, self.__event_log, game)
+        if self.__frame_capture is not None:
+            if game % self.__capture_every == 0:
+                self.__frame_capture.start_episode(f"game-{game:05d}")
             else:
-                self.__handle_autoplay_events()
+                self.__frame_capture.end_episode()
+
+        if self.__tick_rate is None:
+            self.__drawer, self.__profiler_overlay = create_drawer(sprite_size)
+            self.__drawer.connect_engine(self.__engine)
+            self.__drawer.connect_profiler(self.__profiler)
+            self.__drawer.connect_field_of_view(self.__field_of_view)
+        else:
+            # the drawer shows snapshots, the messages reach it through them
+            self.__message_log = MessageLog()
+            self.__engine.subscribe(self.__message_log)
+
+    def __save_recording(self):
+        if self.__recorder is not None and self.__recorder.recording.actions:
+            os.makedirs(self.__record_directory, exist_ok=True)
+            self.__recorder.save(os.path.join(self.__record_directory, f"episode-{self.__recorder.recording.seed}.kitdr"))
+
+        self.__recorder = None
+
+    def __move(self, action):
+        if self.__recorder is not None:
+            self.__recorder.move(action)
+        else:
+            self.__engine.move(action)
+
+    def run(self, max_frames=None):
+        if self.__tick_rate is not None:
+            self.__run_threaded(max_frames)
+            return
+
+        frames = 0
+
+        while self.__engine.working and (max_frames is None or frames < max_frames):
+            frames += 1
+            self.__profiler.begin_frame()
+            with self.__profiler.stage("events"):
+                if self.KEYBOARD_CONTROL:
+                    self.__handle_keyboard_events()
+                else:
+                    self.__handle_autoplay_events()
             self.__update_screen()
+            self.__profiler.end_frame()
+
+    def __run_threaded(self, max_frames):
+        # the simulation thread steps the game and publishes snapshots, this thread handles the window events and
+        # draws the latest snapshot; keys which change the game are handled on the simulation thread
+        view = SnapshotView()
+        self.__drawer, self.__profiler_overlay = create_drawer(self.__engine.sprite_size)
+        self.__drawer.connect_engine(view)
+        self.__drawer.connect_profiler(self.__profiler)
+        self.__drawer.connect_field_of_view(view)
+        step = None if self.KEYBOARD_CONTROL else self.__autoplay_step
+        self.__simulation = SimulationThread(step, self.__capture, self.__tick_rate)
+        clock = pygame.time.Clock()
+        frames = 0
+
+        self.__simulation.start()
+        try:
+            while self.__engine.working and (max_frames is None or frames < max_frames):
+                frames += 1
+                self.__profiler.begin_frame()
+                with self.__profiler.stage("events"):
+                    for event in pygame.event.get():
+                        self.__handle_quit_event(event)
+                        self.__handle_profiler_event(event)
+                        if self.KEYBOARD_CONTROL:
+                            self.__simulation.submit(lambda game_event=event: self.__handle_game_event(game_event))
+
+                if self.__simulation.error is not None:
+                    raise self.__simulation.error
+
+                snapshot = self.__simulation.latest
+                if snapshot is not None:
+                    view.show(snapshot)
+                    self.__drawer.set_sprite_size(snapshot.sprite_size)
+                    self.__update_screen()
+                self.__profiler.end_frame()
+                clock.tick(self.RENDER_FRAME_RATE)
+        finally:
+            self.__simulation.stop()
+            self.__simulation = None
+
+    def __capture(self, revision, previous):
+        return EngineSnapshot.capture(self.__engine, revision, self.__field_of_view, self.__message_log, previous)
 
     def __handle_keyboard_events(self):
         for event in pygame.event.get():
             self.__handle_quit_event(event)
-            self.__handle_show_help_event(event)
-            self.__handle_resize_event(event)
-            self.__handle_restart_game_event(event)
-            self.__handle_move_event(event)
+            self.__handle_profiler_event(event)
+            self.__handle_game_event(event)
+
+    def __handle_game_event(self, event):
+        self.__handle_show_help_event(event)
+        self.__handle_resize_event(event)
+        self.__handle_restart_game_event(event)
+        self.__handle_save_event(event)
+        self.__handle_move_event(event)
 
     def __handle_quit_event(self, event):
         if event.type == pygame.QUIT:
@@ -89,6 +234,14 @@ class KnightInTheDungeonGame:
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
             self.__engine.working = False
 
+    def __handle_profiler_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3:
+                self.__profiler_overlay.shown = not self.__profiler_overlay.shown
+                self.__profiler.enabled = self.__profile or self.__profiler_overlay.shown
+            elif event.key == pygame.K_F4:
+                self.__profiler.export_csv(self.PROFILER_CSV_PATH)
+
     def __handle_show_help_event(self, event):
         if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
             self.__engine.show_help = not self.__engine.show_help
@@ -104,7 +257,9 @@ class KnightInTheDungeonGame:
 
     def __change_sprite_size(self, sprite_size):
         if 1 <= sprite_size <= 80:
-            self.__drawer.set_sprite_size(sprite_size)
+            # with the simulation thread the renderer takes the size from the snapshots
+            if self.__tick_rate is None:
+                self.__drawer.set_sprite_size(sprite_size)
             self.__engine.sprite_size = sprite_size
 
     def __handle_restart_game_event(self, event):
@@ -112,44 +267,140 @@ class KnightInTheDungeonGame:
             if event.key == pygame.K_r or (event.key == pygame.K_RETURN and not self.__engine.game_process):
                 self.__start_game(self.__engine.sprite_size)
 
+    def __handle_save_event(self, event):
+        # F5 saves the game, F9 loads the last saved one; recording continues only in new games
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_F5, pygame.K_F9):
+            from SaveGame import save_game, load_game
+
+            if event.key == pygame.K_F5:
+                save_game(self.__engine, self.QUICK_SAVE_PATH, self.LEVELS_FILE_PATH)
+            elif os.path.exists(self.QUICK_SAVE_PATH):
+                sprite_size = self.__engine.sprite_size
+                self.__save_recording()
+                self.__engine = load_game(self.QUICK_SAVE_PATH, self.__settings_provider)
+                self.__engine.sprite_size = sprite_size
+                self.__engine_started(sprite_size)
+
     def __handle_move_event(self, event):
         if event.type == pygame.KEYDOWN and self.__engine.game_process:
             if event.key == pygame.K_UP:
-                self.__engine.move_up()
+                self.__move(Action.UP)
             elif event.key == pygame.K_DOWN:
-                self.__engine.move_down()
+                self.__move(Action.DOWN)
             elif event.key == pygame.K_LEFT:
-                self.__engine.move_left()
+                self.__move(Action.LEFT)
             elif event.key == pygame.K_RIGHT:
-                self.__engine.move_right()
+                self.__move(Action.RIGHT)
 
     def __handle_autoplay_events(self):
         for event in pygame.event.get():
             self.__handle_quit_event(event)
+            self.__handle_profiler_event(event)
+
+        if self.__render_interval is None:
+            for _ in range(self.__frame_skip):
+                self.__autoplay_step()
+        else:
+            self.__autoplay_step()
+            while time.perf_counter() < self.__next_render and self.__engine.working:
+                self.__autoplay_step()
+            self.__next_render = time.perf_counter() + self.__render_interval
 
+    def __autoplay_step(self):
         if self.__engine.game_process:
-            actions = [
-                self.__engine.move_right,
-                self.__engine.move_left,
-                self.__engine.move_up,
-                self.__engine.move_down,
-            ]
-            answer = np.random.randint(0, 100, 4)
+            if self.__pending_actions is None:
+                self.__pending_actions = self.__submit_observation()
+
             prev_score = self.__engine.score
-            actions[np.argmax(answer)]()
-            pygame.surfarray.array3d(self.__display)
+            observation = self.__observation
+            action = int(self.__pending_actions.result()[0])
+            self.__move(action)
             reward = self.__engine.score - prev_score
             print(reward)
+
+            if self.__trajectory_writer is not None:
+                self.__trajectory_writer.append(observation[0], action, reward, not self.__engine.game_process)
+
+            # the next action is evaluated while the screen is being updated
+            self.__pending_actions = self.__submit_observation() if self.__engine.game_process else None
         else:
             self.__start_game(self.__engine.sprite_size)
 
+    def __submit_observation(self):
+        if self.__observation_builder is None:
+            from Policies import RandomPolicy, ObservationBuilder
+
+            self.__policy = self.__policy or RandomPolicy()
+            self.__observation_builder = ObservationBuilder()
+
+        self.__observation = self.__observation_builder.observe([self.__engine])
+
+        return self.__policy.submit(self.__observation)
+
     def __update_screen(self):
-        self.__display.blit(self.__drawer, (0, 0))
         self.__drawer.draw(self.__display)
-        pygame.display.update()
+        with self.__profiler.stage("display.update"):
+            pygame.display.update()
+        if self.__frame_capture is not None:
+            with self.__profiler.stage("capture"):
+                self.__frame_capture.capture(self.__display)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Knight in the dungeon.")
+    parser.add_argument("--autoplay", action="store_true", help="let the policy play instead of the keyboard")
+    parser.add_argument("--policy", default="random",
+                        help="built-in policy name or 'module:attribute' of a policy class or factory")
+    parser.add_argument("--threaded-policy", action="store_true", help="evaluate the policy in a worker thread")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"collect frame timings from the start and export them to "
+                             f"{KnightInTheDungeonGame.PROFILER_CSV_PATH} on exit (F3 shows them, F4 exports)")
+    parser.add_argument("--metrics", help="periodically write runtime metrics to this file")
+    parser.add_argument("--metrics-format", choices=["prometheus", "json"], default="prometheus")
+    parser.add_argument("--metrics-interval", type=float, default=10., help="seconds between metrics dumps")
+    parser.add_argument("--record", metavar="DIRECTORY", help="record every episode into this directory")
+    parser.add_argument("--dataset", metavar="DIRECTORY", help="write autoplay transitions into this directory")
+    parser.add_argument("--tick-rate", type=float,
+                        help="run the game logic on its own thread with this many ticks per second (0 is as fast as "
+                             "possible) while the screen is drawn at its own rate")
+    frame_rate = parser.add_mutually_exclusive_group()
+    frame_rate.add_argument("--frame-skip", type=int, default=1, metavar="K",
+                            help="make K autoplay steps per drawn frame")
+    frame_rate.add_argument("--render-fps", type=float,
+                            help="draw autoplay at this frame rate and step the game as fast as possible in between")
+    parser.add_argument("--capture", metavar="DIRECTORY", help="capture the frames of games into this directory")
+    parser.add_argument("--capture-every", type=int, default=1, metavar="N", help="capture every N-th game")
+    parser.add_argument("--capture-format", choices=["png", "raw"], default="png")
+    parser.add_argument("--capture-block", action="store_true",
+                        help="wait for the encoder instead of dropping frames when it falls behind")
+    parser.add_argument("--event-log", metavar="DIRECTORY", help="write gameplay events into this directory")
+
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    with KnightInTheDungeonGame() as game:
+    arguments = parse_arguments()
+    KnightInTheDungeonGame.KEYBOARD_CONTROL = not arguments.autoplay
+
+    policy, exporter, trajectory_writer, event_log, capture = None, None, None, None, None
+    if arguments.autoplay:
+        from Policies import load_policy
+        policy = load_policy(arguments.policy, arguments.threaded_policy)
+    if arguments.metrics:
+        from Metrics import MetricsExporter, REGISTRY
+        exporter = MetricsExporter(REGISTRY, arguments.metrics, arguments.metrics_interval, arguments.metrics_format)
+    if arguments.dataset:
+        from Dataset import TrajectoryWriter
+        trajectory_writer = TrajectoryWriter(arguments.dataset)
+    if arguments.event_log:
+        from EventLog import EventLogWriter
+        event_log = EventLogWriter(arguments.event_log)
+    if arguments.capture:
+        from VideoCapture import FrameCapture
+        capture = FrameCapture(arguments.capture, arguments.capture_format, block=arguments.capture_block)
+
+    with KnightInTheDungeonGame(policy, arguments.profile, exporter, arguments.record, trajectory_writer,
+                                arguments.tick_rate, event_log, arguments.frame_skip, arguments.render_fps, capture,
+                                arguments.capture_every) as game:
         game.run()
         exit(0)
@@ -0,0 +1,174 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+# metrics are updated without locks: the game loop is the only writer and the exporter thread only reads
+# the values, so a dump may be a few increments behind but never blocks the game
+
+
+class Counter:
+    def __init__(self, name, description, label: Optional[str] = None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.__values = {} if label is not None else {None: 0}
+
+    def inc(self, label_value=None, amount=1):
+        try:
+            self.__values[label_value] += amount
+        except KeyError:
+            self.__values[label_value] = amount
+
+    def value(self, label_value=None):
+        return self.__values.get(label_value, 0)
+
+    def samples(self):
+        return list(self.__values.items())
+
+    def to_prometheus(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+
+        for label_value, value in sorted(self.samples(), key=lambda sample: str(sample[0])):
+            labels = f'{{{self.label}="{label_value}"}}' if self.label is not None else ""
+            lines.append(f"{self.name}{labels} {value}")
+
+        return lines
+
+    def to_json(self):
+        if self.label is None:
+            return self.value()
+
+        return {str(label_value): value for label_value, value in self.samples()}
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.__counts = [0] * (len(self.buckets) + 1)
+        self.__sum = 0.
+
+    def observe(self, value):
+        self.__counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.__sum += value
+
+    @property
+    def count(self):
+        return sum(self.__counts)
+
+    @property
+    def sum(self):
+        return self.__sum
+
+    def cumulative_counts(self):
+        counts, total = [], 0
+
+        for count in self.__counts:
+            total += count
+            counts.append(total)
+
+        return counts
+
+    def to_prometheus(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        counts = self.cumulative_counts()
+
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{self.name}_sum {self.__sum}")
+        lines.append(f"{self.name}_count {counts[-1]}")
+
+        return lines
+
+    def to_json(self):
+        return {"buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.cumulative_counts())),
+                "sum": self.__sum, "count": self.count}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.__metrics = dict()
+
+    def counter(self, name, description, label=None) -> Counter:
+        return self.__register(Counter(name, description, label))
+
+    def histogram(self, name, description, buckets) -> Histogram:
+        return self.__register(Histogram(name, description, buckets))
+
+    def get(self, name):
+        return self.__metrics[name]
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        for metric in self.__metrics.values():
+            lines.extend(metric.to_prometheus())
+
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps({name: metric.to_json() for name, metric in self.__metrics.items()}, sort_keys=True)
+
+    def __register(self, metric):
+        if metric.name in self.__metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+
+        self.__metrics[metric.name] = metric
+
+        return metric
+
+
+class MetricsExporter:
+    PROMETHEUS = "prometheus"
+    JSON = "json"
+
+    def __init__(self, registry: MetricsRegistry, path, interval=10., output_format=PROMETHEUS):
+        if output_format not in (self.PROMETHEUS, self.JSON):
+            raise ValueError(f"Unknown metrics format '{output_format}'.")
+
+        self.__registry = registry
+        self.__path = path
+        self.__interval = interval
+        self.__format = output_format
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="metrics-exporter", daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__thread.join()
+        self.dump()
+
+    def dump(self):
+        text = self.__registry.to_prometheus() if self.__format == self.PROMETHEUS else self.__registry.to_json()
+
+        # the file is replaced atomically, so the scraper never reads a partially written dump
+        temporary_path = f"{self.__path}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(text)
+        os.replace(temporary_path, self.__path)
+
+    def __run(self):
+        while not self.__stopped.wait(self.__interval):
+            self.dump()
+
+
+REGISTRY = MetricsRegistry()
+
+STEPS = REGISTRY.counter("kitd_steps_total", "Hero moves made by all engines.")
+EVENTS = REGISTRY.counter("kitd_events_total", "Game events dispatched by type.", "event")
+LEVEL_LOADS = REGISTRY.counter("kitd_level_loads_total", "Levels loaded into engines.")
+LEVEL_LOAD_SECONDS = REGISTRY.histogram("kitd_level_load_seconds", "Time to build the map and objects of a level.",
+                                        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+MAP_GENERATION_SECONDS = REGISTRY.histogram("kitd_map_generation_seconds", "Time to generate a random map.",
+                                            (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01))
+IMAGE_CACHE_HITS = REGISTRY.counter("kitd_image_cache_hits_total", "ImagesProvider cache hits.", "cache")
+IMAGE_CACHE_MISSES = REGISTRY.counter("kitd_image_cache_misses_total", "ImagesProvider cache misses.", "cache")
+OBJECTS_PER_LEVEL = REGISTRY.histogram("kitd_objects_per_level", "Objects placed on a loaded level.",
+                                       (0, 5, 10, 25, 50, 100, 200))
@@ -0,0 +1,128 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+import EventHandlers
+from Event import EventPayload
+from Enemies import EnemyMovement
+from EventHandlers import EventHandler, GameEventHandler, generate_level
+from Logic import GameEngine, SharedLevel
+from Objects import Hero, Ally, release_objects
+from Service import LevelsProvider
+
+
+class DescendEventHandler(GameEventHandler):
+    # on a shared level the stairs do not reload the level, the hero waits for the others below
+    def __init__(self, multi_hero_engine: "MultiHeroEngine"):
+        self.__multi_hero_engine = multi_hero_engine
+
+    def action(self, engine: GameEngine, payload: EventPayload):
+        self.__multi_hero_engine.descend(engine)
+
+
+class MultiHeroEngine:
+    # many heroes on one level: every hero has its own engine with its own stats, effects, score, messages and
+    # event handlers, while the map and the objects are shared, so a level is generated once for all of them.
+    # An object is used by the first hero who steps on it; heroes are moved in the order of their indexes.
+    # A hero who reaches the stairs leaves the level, the next one is loaded when nobody is left on the current one.
+    def __init__(self, levels_provider: LevelsProvider, heroes: Sequence[Hero], moving_enemies=False):
+        self.__levels_provider = levels_provider
+        self.__shared_level = SharedLevel()
+        self.__engines: List[GameEngine] = []
+        self.__indexes = dict()
+        self.__descended = np.zeros(len(heroes), dtype=bool)
+        self.__stairs: List[Ally] = []
+        self.__level = -1
+
+        for hero in heroes:
+            engine = GameEngine(self.__shared_level)
+            engine.hero = hero
+            EventHandler(engine, levels_provider).register(EventHandlers.RELOAD_GAME_EVENT, DescendEventHandler(self))
+            self.__indexes[id(engine)] = len(self.__engines)
+            self.__engines.append(engine)
+
+        # enemies make one step per tick for all heroes, not one step per hero
+        self.__enemy_movement = EnemyMovement(self.__engines[0], tick_on_turn=False,
+                                              seed=np.random.randint(2 ** 31)) if moving_enemies else None
+        self.__load_next_level()
+
+    @property
+    def engines(self) -> List[GameEngine]:
+        return self.__engines
+
+    @property
+    def level(self):
+        return self.__level
+
+    @property
+    def alive(self) -> np.ndarray:
+        return np.array([engine.game_process for engine in self.__engines], dtype=bool)
+
+    @property
+    def active(self) -> np.ndarray:
+        # heroes which are still on the current level
+        return self.alive & ~self.__descended
+
+    @property
+    def finished(self):
+        return not self.alive.any()
+
+    @property
+    def scores(self) -> np.ndarray:
+        return np.array([engine.score for engine in self.__engines], dtype=np.float64)
+
+    def descend(self, engine: GameEngine):
+        self.__descended[self.__indexes[id(engine)]] = True
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray]:
+        # moves every hero still on the level, returns rewards and whether the game of the hero is over
+        rewards = np.zeros(len(self.__engines), dtype=np.float32)
+
+        for index in np.flatnonzero(self.active):
+            engine = self.__engines[index]
+            score = engine.score
+            engine.move(int(actions[index]))
+            rewards[index] = engine.score - score
+            # the stairs are used by every hero, so they are put back for the heroes who move next
+            self.__restore_stairs()
+
+        if self.__enemy_movement is not None:
+            active = np.flatnonzero(self.active)
+            self.__enemy_movement.tick([self.__engines[index].hero.position for index in active])
+
+            # enemies which stepped onto heroes fight them
+            for index in active:
+                score = self.__engines[index].score
+                self.__engines[index].interact()
+                rewards[index] += self.__engines[index].score - score
+
+        if not self.active.any() and self.__descended.any():
+            self.__load_next_level()
+
+        return rewards, ~self.alive
+
+    def __restore_stairs(self):
+        objects = self.__shared_level.objects
+        missing_stairs = [stairs for stairs in self.__stairs if stairs not in objects]
+
+        if missing_stairs:
+            self.__engines[0].add_objects(missing_stairs)
+
+    def __load_next_level(self):
+        self.__level += 1
+        _map, _objects = generate_level(self.__levels_provider, self.__level)
+        self.__stairs = [obj for obj in _objects
+                         if isinstance(obj, Ally) and obj.action == EventHandlers.RELOAD_GAME_EVENT]
+
+        # objects and the map are shared, so loading them through one engine loads them for all
+        release_objects(self.__shared_level.objects)
+        self.__engines[0].delete_objects()
+        self.__engines[0].load_map(_map)
+        self.__engines[0].add_objects(_objects)
+
+        for engine in self.__engines:
+            if engine.game_process:
+                engine.level = self.__level
+                engine.hero.reset_position()
+                engine.hero = engine.hero
+        self.__descended[:] = False
@@ -49,6 +49,10 @@ class Ally(AbstractObject, Interactive):
 
         self._action = action
 
+    @property
+    def action(self):
+        return self._action
+
     def interact(self, engine, hero):
         engine.notify(Event(self._action, Ally.InteractedWithHeroEventPayload(hero)))
 
@@ -209,6 +213,15 @@ class Effect(Hero):
         self._stats = base.stats.copy()
         self.apply_effect()
 
+    @classmethod
+    def restore(cls, base, stats):
+        # recreates a saved effect, its stats already include the effect, so it is not applied again
+        effect = cls.__new__(cls)
+        effect._base = base
+        effect._stats = stats
+
+        return effect
+
     @property
     def base(self):
         return self._base
@@ -362,16 +375,67 @@ class Enemy(Creature, Interactive):
             return self.__enemy
 
     def __init__(self, fixture, stats, xp, position):
-        self.xp = xp
+        self._store = None
+        self._index = None
+        self._xp = xp
 
         super().__init__(fixture, stats, position)
 
+    def bind(self, store, index):
+        # the enemy becomes a view into the store: its position, hp, strength and xp are kept in the store arrays
+        self._store = store
+        self._index = index
+
+    @property
+    def position(self):
+        return self._position if self._store is None else self._store.position(self._index)
+
+    @position.setter
+    def position(self, value):
+        if self._store is None:
+            self._position = value
+        else:
+            self._store.positions[self._index] = value
+
+    @property
+    def hp(self):
+        return self._hp if self._store is None else int(self._store.hp[self._index])
+
+    @hp.setter
+    def hp(self, value):
+        if self._store is None:
+            self._hp = value
+        else:
+            self._store.hp[self._index] = value
+
+    @property
+    def strength(self):
+        return self._stats.strength if self._store is None else int(self._store.strength[self._index])
+
+    @strength.setter
+    def strength(self, value):
+        if self._store is None:
+            self._stats.strength = value
+        else:
+            self._store.strength[self._index] = value
+
+    @property
+    def xp(self):
+        return self._xp if self._store is None else int(self._store.xp[self._index])
+
+    @xp.setter
+    def xp(self, value):
+        if self._store is None:
+            self._xp = value
+        else:
+            self._store.xp[self._index] = value
+
     def interact(self, engine, hero):
         # min damage is 50% of the strength of enemy
-        min_damage = int(0.5 * self.stats.strength)
+        min_damage = int(0.5 * self.strength)
 
         # max damage is 100% of the strength of enemy
-        max_damage = self.stats.strength
+        max_damage = self.strength
 
         damage = random.randint(min_damage, max_damage)
 
@@ -411,3 +475,39 @@ class Anger(Effect):
         self._stats.luck -= 5
         self._stats.intelligence -= 5
         self.update_health_points()
+
+
+class ObjectPool:
+    # objects of the levels which were left are initialized again for the next levels instead of being allocated;
+    # an object may be released only when nothing uses it anymore
+    def __init__(self, object_type, capacity=4096):
+        self.__object_type = object_type
+        self.__capacity = capacity
+        # keyed by id, so an object released twice is still handed out once
+        self.__free = dict()
+
+    def __len__(self):
+        return len(self.__free)
+
+    def acquire(self, *args):
+        if self.__free:
+            _, obj = self.__free.popitem()
+            obj.__init__(*args)
+
+            return obj
+
+        return self.__object_type(*args)
+
+    def release(self, objects):
+        for obj in objects:
+            if type(obj) is self.__object_type and len(self.__free) < self.__capacity:
+                self.__free[id(obj)] = obj
+
+
+ENEMY_POOL = ObjectPool(Enemy)
+ALLY_POOL = ObjectPool(Ally)
+
+
+def release_objects(objects):
+    ENEMY_POOL.release(objects)
+    ALLY_POOL.release(objects)
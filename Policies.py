@@ -0,0 +1,179 @@
+import importlib
+import weakref
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Sequence, Callable
+
+import numpy as np
+
+from DistanceFields import DistanceFields, STAIRS, CHEST, ENEMY, UNREACHABLE
+from Logic import GameEngine, Action
+
+# observation layout: a row of float32 values per engine
+HERO_X = 0
+HERO_Y = 1
+HP_RATIO = 2
+FLOOR = 3
+HERO_LEVEL = 4
+GOLD = 5
+SCORE = 6
+# distances to the nearest target of a kind from every neighbour cell of the hero, in the order of Action.ALL
+STAIRS_DISTANCES = slice(7, 11)
+CHEST_DISTANCES = slice(11, 15)
+ENEMY_DISTANCES = slice(15, 19)
+OBSERVATION_SIZE = 19
+
+
+class ObservationBuilder:
+    __kinds = ((STAIRS, STAIRS_DISTANCES), (CHEST, CHEST_DISTANCES), (ENEMY, ENEMY_DISTANCES))
+
+    def __init__(self):
+        self.__fields = weakref.WeakKeyDictionary()
+
+    def observe(self, engines: Sequence[GameEngine]) -> np.ndarray:
+        observations = np.zeros((len(engines), OBSERVATION_SIZE), dtype=np.float32)
+
+        for row, engine in zip(observations, engines):
+            hero = engine.hero
+            x, y = hero.position
+            row[HERO_X] = x
+            row[HERO_Y] = y
+            row[HP_RATIO] = 0 if hero.max_hp == 0 else hero.hp / hero.max_hp
+            row[FLOOR] = engine.level
+            row[HERO_LEVEL] = hero.level
+            row[GOLD] = hero.gold
+            row[SCORE] = engine.score
+
+            fields = self.__get_fields(engine)
+            for kind, columns in self.__kinds:
+                distances = fields.field(kind).distances
+                row[columns] = [distances[y + dy, x + dx] for dx, dy in Action.SHIFTS]
+
+        return observations
+
+    def __get_fields(self, engine) -> DistanceFields:
+        # fields do not depend on the hero, so engines of many heroes on the same level share them
+        level = engine.shared_level
+
+        if level not in self.__fields:
+            self.__fields[level] = DistanceFields(engine)
+
+        return self.__fields[level]
+
+
+class Policy(ABC):
+    # takes observations of many engines at once and returns an action for every one of them;
+    # policies which look only at the number of observations let the callers skip building them
+    uses_observations = True
+
+    @abstractmethod
+    def act(self, observations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def submit(self, observations: np.ndarray) -> Future:
+        future = Future()
+        future.set_result(self.act(observations))
+
+        return future
+
+    def close(self):
+        pass
+
+
+class RandomPolicy(Policy):
+    # policies use their own random generators, so they never shift the random state of the game itself
+    uses_observations = False
+
+    def __init__(self, seed=None):
+        self.__random = np.random.default_rng(seed)
+
+    def act(self, observations):
+        answer = self.__random.integers(0, 100, (len(observations), len(Action.ALL)))
+
+        return np.argmax(answer, axis=1)
+
+
+class ScriptedPolicy(Policy):
+    # repeats the same sequence of actions for every engine
+    uses_observations = False
+
+    def __init__(self, actions: Sequence[int]):
+        self.__actions = np.asarray(actions, dtype=np.int64)
+        self.__step = 0
+
+    def act(self, observations):
+        action = self.__actions[self.__step % len(self.__actions)]
+        self.__step += 1
+
+        return np.full(len(observations), action, dtype=np.int64)
+
+
+class GreedyPolicy(Policy):
+    # walks to the nearest target of the first columns, falling back to random moves with epsilon probability
+    def __init__(self, columns=STAIRS_DISTANCES, epsilon=0.1, seed=None):
+        self.__columns = columns
+        self.__epsilon = epsilon
+        self.__random = np.random.default_rng(seed)
+
+    def act(self, observations):
+        distances = observations[:, self.__columns]
+        # random noise breaks the ties between equally good directions
+        scores = distances + self.__random.random(distances.shape)
+        actions = np.argmin(scores, axis=1)
+
+        explore = self.__random.random(len(observations)) < self.__epsilon
+        explore |= (distances >= UNREACHABLE).all(axis=1)
+        actions[explore] = self.__random.integers(0, len(Action.ALL), explore.sum())
+
+        return actions
+
+
+class ModelPolicy(Policy):
+    # wraps any callable which maps an observations batch to action scores or action indexes
+    def __init__(self, model: Callable[[np.ndarray], np.ndarray]):
+        self.__model = model
+
+    def act(self, observations):
+        output = np.asarray(self.__model(observations))
+
+        return np.argmax(output, axis=1) if output.ndim == 2 else output.astype(np.int64)
+
+
+class ThreadedPolicy(Policy):
+    # evaluates the wrapped policy in a worker thread, so inference overlaps with stepping and rendering
+    def __init__(self, policy: Policy, workers=1):
+        self.__policy = policy
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="policy")
+
+    def act(self, observations):
+        return self.submit(observations).result()
+
+    def submit(self, observations):
+        return self.__executor.submit(self.__policy.act, observations)
+
+    def close(self):
+        self.__executor.shutdown(wait=True)
+        self.__policy.close()
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+}
+
+
+def load_policy(spec: str, threaded=False, seed=None) -> Policy:
+    # spec is either a name of the built-in policy or a 'module:attribute' path of a policy class or factory;
+    # the seed is passed to the built-in policies only
+    if spec in POLICIES:
+        policy = POLICIES[spec](seed=seed)
+    elif ":" in spec:
+        module_name, attribute = spec.split(":", 1)
+        policy = getattr(importlib.import_module(module_name), attribute)()
+    else:
+        raise ValueError(f"Unknown policy '{spec}': use one of {', '.join(POLICIES)} or 'module:attribute'.")
+
+    if not isinstance(policy, Policy):
+        policy = ModelPolicy(policy)
+
+    return ThreadedPolicy(policy) if threaded else policy
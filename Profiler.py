@@ -0,0 +1,104 @@
+import csv
+import time
+from contextlib import nullcontext
+from typing import List
+
+import numpy as np
+
+FRAME = "frame"
+PERCENTILES = (50, 90, 99)
+
+
+class FrameProfiler:
+    # keeps per-stage timings of the last `capacity` frames in a ring buffer; while disabled, stage() returns
+    # a shared no-op context manager, so instrumented code costs one method call per stage
+    __null_stage = nullcontext()
+
+    def __init__(self, capacity=600, enabled=False):
+        self.enabled = enabled
+        self.__capacity = capacity
+        self.__stages = {FRAME: 0}
+        self.__timings = np.zeros((capacity, 1))
+        self.__frames = 0
+        self.__frame_start = None
+
+    @property
+    def stages(self) -> List[str]:
+        return list(self.__stages)
+
+    @property
+    def frames(self) -> int:
+        return min(self.__frames, self.__capacity)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.__timings[self.__frames % self.__capacity] = 0
+            self.__frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.enabled and self.__frame_start is not None:
+            self.__timings[self.__frames % self.__capacity, 0] = time.perf_counter() - self.__frame_start
+            self.__frames += 1
+            self.__frame_start = None
+
+    def stage(self, name):
+        if not self.enabled or self.__frame_start is None:
+            return self.__null_stage
+
+        return _Stage(self, self.__stage_index(name))
+
+    def record(self, index, elapsed):
+        self.__timings[self.__frames % self.__capacity, index] += elapsed
+
+    def summary(self) -> dict:
+        # milliseconds per stage over the frames kept in the buffer
+        timings = self.__timings[:self.frames] * 1000
+        result = dict()
+
+        for name, index in self.__stages.items():
+            column = timings[:, index] if len(timings) > 0 else np.zeros(1)
+            result[name] = {
+                "mean": float(column.mean()),
+                "max": float(column.max()),
+                **{f"p{p}": float(value) for p, value in zip(PERCENTILES, np.percentile(column, PERCENTILES))}
+            }
+
+        return result
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["stage", "frames", "mean_ms", *[f"p{p}_ms" for p in PERCENTILES], "max_ms"])
+
+            for name, stats in self.summary().items():
+                writer.writerow([name, self.frames, f"{stats['mean']:.4f}",
+                                 *[f"{stats[f'p{p}']:.4f}" for p in PERCENTILES], f"{stats['max']:.4f}"])
+
+    def reset(self):
+        self.__timings[:] = 0
+        self.__frames = 0
+
+    def __stage_index(self, name):
+        if name not in self.__stages:
+            self.__stages[name] = len(self.__stages)
+            self.__timings = np.hstack([self.__timings, np.zeros((self.__capacity, 1))])
+
+        return self.__stages[name]
+
+
+class _Stage:
+    __slots__ = ("__profiler", "__index", "__start")
+
+    def __init__(self, profiler: FrameProfiler, index):
+        self.__profiler = profiler
+        self.__index = index
+        self.__start = 0.
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__profiler.record(self.__index, time.perf_counter() - self.__start)
+
+
+NULL_PROFILER = FrameProfiler(capacity=1)
@@ -0,0 +1,217 @@
+import argparse
+import random
+import struct
+from typing import List
+
+import numpy as np
+
+from Logic import GameEngine
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+# file layout: header, levels file path, actions (one byte per move), checkpoints
+MAGIC = b"KITDRPL\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHQIIIH")
+# step, score, floor, hero level, hp, max hp, exp, gold, strength, endurance, intelligence, luck
+CHECKPOINT = struct.Struct("<Id10i")
+CHECKPOINT_FIELDS = ("score", "floor", "hero_level", "hp", "max_hp", "exp", "gold", "strength", "endurance",
+                     "intelligence", "luck")
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+
+class ReplayFormatError(Exception):
+    pass
+
+
+class ReplayMismatchError(Exception):
+    pass
+
+
+def seed_everything(seed):
+    # the game draws random numbers from both generators: maps from numpy, objects and effects from random
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+
+def take_checkpoint(engine: GameEngine, step) -> tuple:
+    hero = engine.hero
+
+    return (step, engine.score, engine.level, hero.level, hero.hp, hero.max_hp, hero.exp, hero.gold,
+            hero.stats.strength, hero.stats.endurance, hero.stats.intelligence, hero.stats.luck)
+
+
+class Recording:
+    def __init__(self, seed, levels_file_path=LEVELS_FILE_PATH, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+                 actions=b"", checkpoints=None):
+        self.seed = seed
+        self.levels_file_path = levels_file_path
+        self.checkpoint_interval = checkpoint_interval
+        self.actions = bytearray(actions)
+        self.checkpoints: List[tuple] = checkpoints or []
+
+    def save(self, path):
+        levels_file_path = self.levels_file_path.encode("utf-8")
+
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.seed, self.checkpoint_interval, len(self.actions),
+                                   len(self.checkpoints), len(levels_file_path)))
+            file.write(levels_file_path)
+            file.write(self.actions)
+            for checkpoint in self.checkpoints:
+                file.write(CHECKPOINT.pack(*checkpoint))
+
+    @classmethod
+    def load(cls, path) -> "Recording":
+        with open(path, "rb") as file:
+            data = file.read()
+
+        if len(data) < HEADER.size:
+            raise ReplayFormatError(f"File {path} is too short to be a replay.")
+
+        magic, version, seed, checkpoint_interval, actions_count, checkpoints_count, path_length = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayFormatError(f"File {path} is not a replay.")
+        if version != VERSION:
+            raise ReplayFormatError(f"Unsupported replay version {version}.")
+
+        offset = HEADER.size
+        levels_file_path = data[offset:offset + path_length].decode("utf-8")
+        offset += path_length
+        actions = data[offset:offset + actions_count]
+        offset += actions_count
+        checkpoints = [CHECKPOINT.unpack_from(data, offset + i * CHECKPOINT.size) for i in range(checkpoints_count)]
+
+        return cls(seed, levels_file_path, checkpoint_interval, actions, checkpoints)
+
+
+class EpisodeRecorder:
+    # the engine has to be created right after seed_everything(seed), so the recording can recreate it
+    def __init__(self, engine: GameEngine, seed, levels_file_path=LEVELS_FILE_PATH,
+                 checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.__engine = engine
+        self.__recording = Recording(seed, levels_file_path, checkpoint_interval)
+
+    @property
+    def recording(self) -> Recording:
+        return self.__recording
+
+    def move(self, action):
+        self.__engine.move(action)
+        self.__recording.actions.append(action)
+
+        if len(self.__recording.actions) % self.__recording.checkpoint_interval == 0:
+            self.__recording.checkpoints.append(take_checkpoint(self.__engine, len(self.__recording.actions)))
+
+    def save(self, path):
+        actions_count = len(self.__recording.actions)
+
+        if not self.__recording.checkpoints or self.__recording.checkpoints[-1][0] != actions_count:
+            self.__recording.checkpoints.append(take_checkpoint(self.__engine, actions_count))
+
+        self.__recording.save(path)
+
+
+class Replayer:
+    def __init__(self, recording: Recording, settings_provider: SettingsProvider):
+        self.__recording = recording
+        self.__settings_provider = settings_provider
+        self.__checkpoints = {checkpoint[0]: checkpoint for checkpoint in recording.checkpoints}
+        self.__engine = None
+        self.__step = 0
+
+    @property
+    def engine(self) -> GameEngine:
+        return self.__engine
+
+    @property
+    def finished(self):
+        return self.__step >= len(self.__recording.actions)
+
+    def reset(self) -> GameEngine:
+        seed_everything(self.__recording.seed)
+        self.__engine = create_engine(self.__settings_provider, self.__recording.levels_file_path)
+        self.__step = 0
+        self.__verify()
+
+        return self.__engine
+
+    def step(self):
+        self.__engine.move(self.__recording.actions[self.__step])
+        self.__step += 1
+        self.__verify()
+
+    def run(self) -> GameEngine:
+        self.reset()
+
+        while not self.finished:
+            self.step()
+
+        return self.__engine
+
+    def __verify(self):
+        expected = self.__checkpoints.get(self.__step)
+
+        if expected is None:
+            return
+
+        actual = take_checkpoint(self.__engine, self.__step)
+        for name, expected_value, actual_value in zip(CHECKPOINT_FIELDS, expected[1:], actual[1:]):
+            if expected_value != actual_value:
+                raise ReplayMismatchError(f"Step {self.__step}: {name} is {actual_value}, "
+                                          f"recorded {expected_value}.")
+
+
+def render(replayer: Replayer, speed, sprite_size=60):
+    import pygame
+    from ScreenEngine import create_drawer
+
+    pygame.init()
+    try:
+        display = pygame.display.set_mode((800, 600))
+        pygame.display.set_caption("MyRPG replay")
+        clock = pygame.time.Clock()
+        engine = replayer.reset()
+        engine.sprite_size = sprite_size
+        drawer, _ = create_drawer(sprite_size)
+        drawer.connect_engine(engine)
+
+        while not replayer.finished and engine.working:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    engine.working = False
+
+            replayer.step()
+            drawer.draw(display)
+            pygame.display.update()
+            clock.tick(speed)
+    finally:
+        pygame.display.quit()
+        pygame.quit()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Replay a recorded episode and verify its checkpoints.")
+    parser.add_argument("path", help="recorded episode")
+    parser.add_argument("--render", action="store_true", help="draw the replay instead of running it headless")
+    parser.add_argument("--speed", type=float, default=30., help="moves per second of the rendered replay")
+
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    recording = Recording.load(arguments.path)
+    replayer = Replayer(recording, SettingsProvider(SETTINGS_FILE_PATH))
+
+    if arguments.render:
+        render(replayer, arguments.speed)
+    else:
+        engine = replayer.run()
+        print(f"Replayed {len(recording.actions)} moves: floor {engine.level + 1}, score {engine.score:.4f}, "
+              f"{len(recording.checkpoints)} checkpoints matched.")
+
+
+if __name__ == "__main__":
+    main()
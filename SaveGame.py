@@ -0,0 +1,245 @@
+import random
+import struct
+from typing import List
+
+import numpy as np
+
+from EventHandlers import EventHandler
+from Images import Fixture
+from Logic import GameEngine
+from Objects import Hero, Effect, Ally, Enemy, Blessing, Berserk, Weakness, Anger
+from Service import LevelsProvider
+from Settings import SettingsProvider, ObjectStatistic
+from Simulation import LEVELS_FILE_PATH
+
+# file layout: header, game, strings, fixtures, tiles (one byte per cell), objects, hero, effects from the innermost
+# to the outermost one, state of the python and of the numpy random generators
+MAGIC = b"KITDSAV\0"
+VERSION = 1
+HEADER = struct.Struct("<8sH")
+# score, floor, game process, levels file path, strings, fixtures, map height, map width, objects, effects
+GAME = struct.Struct("<di?HHHHHIH")
+STRING_LENGTH = struct.Struct("<H")
+# path, type (both are indexes of strings, the type is -1 when the fixture has none)
+FIXTURE = struct.Struct("<Hh")
+KIND = struct.Struct("<B")
+# x, y, fixture, action
+ALLY = struct.Struct("<HHHH")
+# x, y, fixture, hp, max hp, xp, strength, endurance, intelligence, luck
+ENEMY = struct.Struct("<HHHiiiiiii")
+# x, y, fixture, hp, max hp, level, exp, previous level exp, next level exp, gold, strength, endurance,
+# intelligence, luck
+HERO = struct.Struct("<HHHiiiiiiiiiii")
+# effect type, strength, endurance, intelligence, luck
+EFFECT = struct.Struct("<Biiii")
+# state of the Mersenne Twister of the random module: key, position, whether a gaussian is cached and its value
+PYTHON_RANDOM = struct.Struct("<624II?d")
+# the same for the legacy numpy generator
+NUMPY_RANDOM = struct.Struct("<624II?d")
+
+ALLY_KIND = 0
+ENEMY_KIND = 1
+EFFECTS = (Blessing, Berserk, Weakness, Anger)
+
+
+class SaveFormatError(Exception):
+    pass
+
+
+class _Tables:
+    # strings and fixtures are stored once and referenced by their indexes
+    def __init__(self):
+        self.strings: List[str] = []
+        self.fixtures: List[Fixture] = []
+        self.__string_indexes = dict()
+        self.__fixture_indexes = dict()
+
+    def string(self, value) -> int:
+        if value not in self.__string_indexes:
+            self.__string_indexes[value] = len(self.strings)
+            self.strings.append(value)
+
+        return self.__string_indexes[value]
+
+    def fixture(self, fixture: Fixture) -> int:
+        key = (fixture.path, fixture.fixture_type)
+
+        if key not in self.__fixture_indexes:
+            self.__fixture_indexes[key] = len(self.fixtures)
+            self.fixtures.append(fixture)
+            self.string(fixture.path)
+            if fixture.fixture_type is not None:
+                self.string(fixture.fixture_type)
+
+        return self.__fixture_indexes[key]
+
+
+def dumps(engine: GameEngine, levels_file_path=LEVELS_FILE_PATH) -> bytes:
+    tables = _Tables()
+    levels_file_path_index = tables.string(levels_file_path)
+    game_map = engine.map
+    height, width = len(game_map), len(game_map[0])
+    tiles = np.array([[tables.fixture(cell) for cell in row] for row in game_map], dtype=np.int64)
+
+    if len(tables.fixtures) > 256:
+        raise SaveFormatError(f"The map has {len(tables.fixtures)} kinds of tiles, at most 256 can be saved.")
+
+    objects = []
+    for obj in engine.get_objects():
+        x, y = obj.position
+        if isinstance(obj, Enemy):
+            objects.append(KIND.pack(ENEMY_KIND) + ENEMY.pack(
+                x, y, tables.fixture(obj.fixture), obj.hp, obj.max_hp, obj.xp, obj.strength, obj.stats.endurance,
+                obj.stats.intelligence, obj.stats.luck))
+        else:
+            objects.append(KIND.pack(ALLY_KIND) + ALLY.pack(x, y, tables.fixture(obj.fixture),
+                                                            tables.string(obj.action)))
+
+    effects = []
+    hero = engine.hero
+    while isinstance(hero, Effect):
+        effects.append(EFFECT.pack(EFFECTS.index(type(hero)), *_stats_tuple(hero.stats)))
+        hero = hero.base
+    effects.reverse()
+    x, y = hero.position
+    hero_record = HERO.pack(x, y, tables.fixture(hero.fixture), hero.hp, hero.max_hp, hero.level, hero.exp,
+                            hero.prev_level_exp, hero.next_level_exp, hero.gold, *_stats_tuple(hero.stats))
+
+    strings = b"".join(STRING_LENGTH.pack(len(encoded)) + encoded
+                       for encoded in (string.encode("utf-8") for string in tables.strings))
+    fixtures = b"".join(FIXTURE.pack(tables.string(fixture.path),
+                                     -1 if fixture.fixture_type is None else tables.string(fixture.fixture_type))
+                        for fixture in tables.fixtures)
+
+    _, python_key, python_gauss = random.getstate()
+    _, numpy_key, numpy_position, numpy_has_gauss, numpy_gauss = np.random.get_state()
+
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION),
+        GAME.pack(engine.score, engine.level, engine.game_process, levels_file_path_index, len(tables.strings),
+                  len(tables.fixtures), height, width, len(objects), len(effects)),
+        strings,
+        fixtures,
+        tiles.astype(np.uint8).tobytes(),
+        *objects,
+        hero_record,
+        *effects,
+        PYTHON_RANDOM.pack(*python_key, python_gauss is not None, python_gauss or 0.),
+        NUMPY_RANDOM.pack(*numpy_key, numpy_position, bool(numpy_has_gauss), numpy_gauss),
+    ])
+
+
+def loads(data: bytes, settings_provider: SettingsProvider, levels_file_path=None) -> GameEngine:
+    # the game continues on a new engine with new levels, which are generated by the restored random generators;
+    # the levels file path of the saved game is used unless another one is given
+    if len(data) < HEADER.size + GAME.size:
+        raise SaveFormatError("The data is too short to be a saved game.")
+
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveFormatError("The data is not a saved game.")
+    if version != VERSION:
+        raise SaveFormatError(f"Unsupported saved game version {version}.")
+
+    try:
+        return _load(data, settings_provider, levels_file_path)
+    except (struct.error, IndexError, ValueError) as error:
+        raise SaveFormatError(f"The saved game is corrupted: {error}.") from error
+
+
+def save_game(engine: GameEngine, path, levels_file_path=LEVELS_FILE_PATH):
+    with open(path, "wb") as file:
+        file.write(dumps(engine, levels_file_path))
+
+
+def load_game(path, settings_provider: SettingsProvider, levels_file_path=None) -> GameEngine:
+    with open(path, "rb") as file:
+        return loads(file.read(), settings_provider, levels_file_path)
+
+
+def _stats_tuple(stats: ObjectStatistic):
+    return stats.strength, stats.endurance, stats.intelligence, stats.luck
+
+
+def _load(data, settings_provider, levels_file_path):
+    offset = HEADER.size
+    score, floor, game_process, levels_file_path_index, strings_count, fixtures_count, height, width, \
+        objects_count, effects_count = GAME.unpack_from(data, offset)
+    offset += GAME.size
+
+    strings = []
+    for _ in range(strings_count):
+        (length,) = STRING_LENGTH.unpack_from(data, offset)
+        offset += STRING_LENGTH.size
+        strings.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+
+    # the tiles of generated maps are shared fixtures, so the restored map uses the same instances
+    fixtures = []
+    for index in range(fixtures_count):
+        path_index, type_index = FIXTURE.unpack_from(data, offset + index * FIXTURE.size)
+        fixtures.append(Fixture.shared(strings[path_index], None if type_index < 0 else strings[type_index]))
+    offset += fixtures_count * FIXTURE.size
+
+    tiles = np.frombuffer(data, dtype=np.uint8, count=height * width, offset=offset).reshape(height, width)
+    offset += height * width
+    game_map = np.array(fixtures, dtype=object)[tiles].tolist()
+
+    objects = []
+    # enemies of one kind share their stats, as they do when generated
+    enemy_stats = dict()
+    for _ in range(objects_count):
+        (kind,) = KIND.unpack_from(data, offset)
+        offset += KIND.size
+
+        if kind == ALLY_KIND:
+            x, y, fixture, action = ALLY.unpack_from(data, offset)
+            offset += ALLY.size
+            objects.append(Ally(fixtures[fixture], strings[action], (x, y)))
+        elif kind == ENEMY_KIND:
+            x, y, fixture, hp, max_hp, xp, *stats = ENEMY.unpack_from(data, offset)
+            offset += ENEMY.size
+            stats = enemy_stats.setdefault(tuple(stats), ObjectStatistic(*stats))
+            enemy = Enemy(fixtures[fixture], stats, xp, (x, y))
+            enemy.hp = hp
+            enemy.max_hp = max_hp
+            objects.append(enemy)
+        else:
+            raise ValueError(f"unknown object kind {kind}")
+
+    x, y, fixture, hp, max_hp, level, exp, prev_level_exp, next_level_exp, gold, *stats = \
+        HERO.unpack_from(data, offset)
+    offset += HERO.size
+    hero = Hero(ObjectStatistic(*stats), fixtures[fixture])
+    hero.position = [x, y]
+    hero.max_hp = max_hp
+    hero.hp = hp
+    hero.level = level
+    hero.exp = exp
+    hero.prev_level_exp = prev_level_exp
+    hero.next_level_exp = next_level_exp
+    hero.gold = gold
+
+    for _ in range(effects_count):
+        effect_type, *stats = EFFECT.unpack_from(data, offset)
+        offset += EFFECT.size
+        hero = EFFECTS[effect_type].restore(hero, ObjectStatistic(*stats))
+
+    *python_key, python_has_gauss, python_gauss = PYTHON_RANDOM.unpack_from(data, offset)
+    offset += PYTHON_RANDOM.size
+    *numpy_key, numpy_position, numpy_has_gauss, numpy_gauss = NUMPY_RANDOM.unpack_from(data, offset)
+
+    engine = GameEngine()
+    EventHandler(engine, LevelsProvider(levels_file_path or strings[levels_file_path_index], settings_provider))
+    engine.level = floor
+    engine.load_map(game_map)
+    engine.add_objects(objects)
+    engine.hero = hero
+    engine.score = score
+    engine.game_process = game_process
+
+    random.setstate((3, tuple(python_key), python_gauss if python_has_gauss else None))
+    np.random.set_state(("MT19937", np.array(numpy_key[:624], dtype=np.uint32), numpy_position,
+                         int(numpy_has_gauss), numpy_gauss))
+
+    return engine
@@ -1,41 +1,99 @@
 import collections
+import re
+from typing import Tuple
 
+import numpy as np
 import pygame
 
+from FieldOfView import FieldOfView
 from Images import Fixture
+from Profiler import FrameProfiler, NULL_PROFILER
 from Settings import Colors
 
 
 class ScreenHandle(pygame.Surface):
+    # every handle is a layer of the screen: layers are composited in the order of the chain, a layer is
+    # rendered into its own surface only when its state key changes and hidden layers are skipped completely
+    __never_rendered = object()
+
     def __init__(self, *args, **kwargs):
         self.background_color = Colors.WOODEN
         self.engine = None
+        self.profiler = NULL_PROFILER
+        self.field_of_view = None
+        # name of the profiler stage which measures drawing of this handle
+        self.stage_name = re.sub(r"(?<!^)(?=[A-Z])", "_", type(self).__name__).lower()
+        self.position = (0, 0)
+        self.__rendered_key = self.__never_rendered
         if len(args) > 1:
             self.successor = args[-1]
             self.next_coord = args[-2]
+            self.successor.position = self.next_coord
             args = args[:-2]
         else:
             self.successor = None
             self.next_coord = (0, 0)
         super().__init__(*args, **kwargs)
 
+    @property
+    def visible(self):
+        width, height = self.get_size()
+
+        return width > 0 and height > 0
+
+    def state_key(self):
+        # everything the rendered layer depends on; the layer is dirty when the key differs from the last one
+        return None
+
+    def render(self):
+        pass
+
+    def invalidate(self):
+        self.__rendered_key = self.__never_rendered
+
     def draw(self, canvas):
+        if self.visible:
+            key = self.state_key()
+
+            if key != self.__rendered_key:
+                with self.profiler.stage(self.stage_name):
+                    self.render()
+                self.__rendered_key = key
+
+            with self.profiler.stage("compositing"):
+                canvas.blit(self, self.position)
+
         if self.successor is not None:
-            canvas.blit(self.successor, self.next_coord)
             self.successor.draw(canvas)
 
     def connect_engine(self, engine):
         self.engine = engine
+        self.invalidate()
 
         if self.successor is not None:
             self.successor.connect_engine(engine)
 
+    def connect_profiler(self, profiler: FrameProfiler):
+        self.profiler = profiler
+
+        if self.successor is not None:
+            self.successor.connect_profiler(profiler)
+
+    def connect_field_of_view(self, field_of_view: FieldOfView):
+        # without a field of view the whole level is shown
+        self.field_of_view = field_of_view
+        self.invalidate()
+
+        if self.successor is not None:
+            self.successor.connect_field_of_view(field_of_view)
+
 
 class GameSurface(ScreenHandle):
     def __init__(self, *args, **kwargs):
         self.__left_corner_x = 0
         self.__left_corner_y = 0
         self.__sprite_size = 1
+        self.__fog = None
 
         if len(args) > 2:
             self.__sprite_size = args[-3]
@@ -52,6 +110,9 @@ class GameSurface(ScreenHandle):
 
         self.__sprite_size = value
 
+    def state_key(self):
+        return self.engine.revision, self.__sprite_size
+
     def draw_hero(self):
         self.engine.hero.draw(self)
 
@@ -100,42 +161,76 @@ class GameSurface(ScreenHandle):
 
     def draw_map(self):
         if self.engine.map:
-            for i in range(len(self.engine.map[0]) - self.__left_corner_x):
-                for j in range(len(self.engine.map) - self.__left_corner_y):
-                    cell = self.engine.map[self.__left_corner_y + j][self.__left_corner_x + i]
-                    sprite = cell.sprite(self.__sprite_size, self.__sprite_size)
-                    self.blit(sprite, (i * self.__sprite_size, j * self.__sprite_size))
+            # only the cells which fit into the surface are drawn
+            columns = min(len(self.engine.map[0]) - self.__left_corner_x, -(-self.get_width() // self.__sprite_size))
+            rows = min(len(self.engine.map) - self.__left_corner_y, -(-self.get_height() // self.__sprite_size))
+
+            if self.field_of_view is None:
+                for i in range(columns):
+                    for j in range(rows):
+                        self.draw_cell(i, j)
+                return
+
+            # cells which were never seen stay black, the explored ones which are not visible now are shaded
+            self.fill(Colors.BLACK)
+            visible = self.field_of_view.visible
+            explored = self.field_of_view.explored
+            for j, i in zip(*np.nonzero(explored[self.__left_corner_y:self.__left_corner_y + rows,
+                                                 self.__left_corner_x:self.__left_corner_x + columns])):
+                self.draw_cell(i, j)
+                if not visible[self.__left_corner_y + j, self.__left_corner_x + i]:
+                    self.blit(self.__get_fog(), (i * self.__sprite_size, j * self.__sprite_size))
         else:
             self.fill(Colors.WHITE)
 
+    def draw_cell(self, i, j):
+        cell = self.engine.map[self.__left_corner_y + j][self.__left_corner_x + i]
+        sprite = cell.sprite(self.__sprite_size, self.__sprite_size)
+        self.blit(sprite, (i * self.__sprite_size, j * self.__sprite_size))
+
     def draw_objects(self):
+        visible = None if self.field_of_view is None else self.field_of_view.visible
+
         for obj in self.engine.get_objects():
-            obj.draw(self)
+            if visible is None or visible[obj.position[1], obj.position[0]]:
+                obj.draw(self)
 
     def draw_object(self, fixture: Fixture, coord):
         self.blit(fixture.sprite(self.__sprite_size, self.__sprite_size),
                   ((coord[0] - self.__left_corner_x) * self.__sprite_size,
                    (coord[1] - self.__left_corner_y) * self.__sprite_size))
 
-    def draw(self, canvas):
-        self.recalculate_map_position()
-        self.fill(self.background_color)
-        self.draw_map()
-        self.draw_objects()
-        self.draw_hero()
+    def __get_fog(self):
+        if self.__fog is None or self.__fog.get_width() != self.__sprite_size:
+            self.__fog = pygame.Surface((self.__sprite_size, self.__sprite_size), pygame.SRCALPHA)
+            self.__fog.fill((0, 0, 0, 160))
+
+        return self.__fog
 
-        super().draw(canvas)
+    def render(self):
+        with self.profiler.stage(f"{self.stage_name}.recalculate_map_position"):
+            self.recalculate_map_position()
+        with self.profiler.stage(f"{self.stage_name}.draw_map"):
+            self.fill(self.background_color)
+            self.draw_map()
+        with self.profiler.stage(f"{self.stage_name}.draw_objects"):
+            self.draw_objects()
+            self.draw_hero()
 
 
 class ProgressBar(ScreenHandle):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.__font = None
 
     def connect_engine(self, engine):
         super().connect_engine(engine)
 
-    def draw(self, canvas):
+    def state_key(self):
+        return self.engine.revision
+
+    def render(self):
         self.fill(self.background_color)
         pygame.draw.rect(self, Colors.BLACK, (50, 30, 200, 30), 2)
         pygame.draw.rect(self, Colors.BLACK, (50, 70, 200, 30), 2)
@@ -148,7 +243,9 @@ class ProgressBar(ScreenHandle):
         pygame.draw.rect(self, Colors.RED, (50, 30, 200 * hp_percentage, 30))
         pygame.draw.rect(self, Colors.GREEN, (50, 70, 200 * exp_percentage, 30))
 
-        font = pygame.font.SysFont("comicsansms", 20)
+        if self.__font is None:
+            self.__font = pygame.font.SysFont("comicsansms", 20)
+        font = self.__font
         self.blit(font.render(f'Hero at {self.engine.hero.position}', True, Colors.BLACK),
                   (250, 0))
 
@@ -191,8 +288,6 @@ class ProgressBar(ScreenHandle):
         self.blit(font.render(f'{self.engine.score:.4f}', True, Colors.BLACK),
                   (550, 70))
 
-        super().draw(canvas)
-
 
 class InfoWindow(ScreenHandle):
 
@@ -201,21 +296,26 @@ class InfoWindow(ScreenHandle):
         self.len = 25
         clear = []
         self.data = collections.deque(clear, maxlen=self.len)
+        self.__messages = 0
+        self.__font = None
 
     def update(self, value):
         if isinstance(value, str):
             self.data.append(f"> {str(value)}")
+            self.__messages += 1
 
-    def draw(self, canvas):
+    def state_key(self):
+        return self.__messages
+
+    def render(self):
         self.fill(self.background_color)
 
-        font = pygame.font.SysFont("comicsansms", 18)
+        if self.__font is None:
+            self.__font = pygame.font.SysFont("comicsansms", 18)
         for i, text in enumerate(self.data):
-            self.blit(font.render(text, True, Colors.BLACK),
+            self.blit(self.__font.render(text, True, Colors.BLACK),
                       (5, 20 + 18 * i))
 
-        super().draw(canvas)
-
     def connect_engine(self, engine):
         engine.subscribe(self)
         super().connect_engine(engine)
@@ -236,29 +336,28 @@ class HelpWindow(ScreenHandle):
         self.data.append([" W ", "Zoom +"])
         self.data.append([" S ", "Zoom -"])
         self.data.append([" R ", "Restart Game"])
+        self.data.append([" F5", "Save Game"])
+        self.data.append([" F9", "Load Game"])
 
     def connect_engine(self, engine):
         super().connect_engine(engine)
 
-    def draw(self, canvas):
-        alpha = 0
-        show_help = self.engine.show_help and self.engine.game_process
+    @property
+    def visible(self):
+        return self.engine.show_help and self.engine.game_process
 
-        if show_help:
-            alpha = 128
-        self.fill((0, 0, 0, alpha))
+    def render(self):
+        # the content never changes, so it is rendered once and only composited afterwards
+        self.fill((0, 0, 0, 128))
         font1 = pygame.font.SysFont("courier", 24)
         font2 = pygame.font.SysFont("serif", 24)
-        if show_help:
-            pygame.draw.lines(self, (255, 0, 0, 255), True, [
-                (0, 0), (700, 0), (700, 500), (0, 500)], 5)
-            for i, text in enumerate(self.data):
-                self.blit(font1.render(text[0], True, (128, 128, 255)),
-                          (50, 50 + 30 * i))
-                self.blit(font2.render(text[1], True, (128, 128, 255)),
-                          (150, 50 + 30 * i))
-
-        super().draw(canvas)
+        pygame.draw.lines(self, (255, 0, 0, 255), True, [
+            (0, 0), (700, 0), (700, 500), (0, 500)], 5)
+        for i, text in enumerate(self.data):
+            self.blit(font1.render(text[0], True, (128, 128, 255)),
+                      (50, 50 + 30 * i))
+            self.blit(font2.render(text[1], True, (128, 128, 255)),
+                      (150, 50 + 30 * i))
 
 
 class GameOverWindow(ScreenHandle):
@@ -268,19 +367,70 @@ class GameOverWindow(ScreenHandle):
     def connect_engine(self, engine):
         super().connect_engine(engine)
 
-    def draw(self, canvas):
-        alpha = 0
-        if not self.engine.game_process:
-            alpha = 128
-        self.fill((0, 0, 0, alpha))
+    @property
+    def visible(self):
+        return not self.engine.game_process
+
+    def render(self):
+        self.fill((0, 0, 0, 128))
         font1 = pygame.font.SysFont("courier", 35)
         font1.set_bold(True)
         font2 = pygame.font.SysFont("courier", 24)
         font2.set_bold(True)
-        if not self.engine.game_process:
-            pygame.draw.lines(self, (255, 0, 0, 255), True, [
-                (0, 0), (500, 0), (500, 200), (0, 200)], 5)
-            self.blit(font1.render("Game Over", True, (255, 0, 0)), (145, 50))
-            self.blit(font2.render("Press R to start a new game.", True, (255, 0, 0)), (30, 100))
+        pygame.draw.lines(self, (255, 0, 0, 255), True, [
+            (0, 0), (500, 0), (500, 200), (0, 200)], 5)
+        self.blit(font1.render("Game Over", True, (255, 0, 0)), (145, 50))
+        self.blit(font2.render("Press R to start a new game.", True, (255, 0, 0)), (30, 100))
 
-        super().draw(canvas)
+
+class ProfilerOverlay(ScreenHandle):
+    REFRESH_FRAMES = 30
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__shown = False
+        self.__frames = 0
+        self.__font = None
+
+    @property
+    def shown(self):
+        return self.__shown
+
+    @shown.setter
+    def shown(self, value):
+        self.__shown = value
+        self.invalidate()
+
+    @property
+    def visible(self):
+        return self.shown and self.profiler.enabled
+
+    def state_key(self):
+        # percentiles are not recalculated on every frame, so the overlay itself stays cheap
+        self.__frames += 1
+
+        return self.__frames // self.REFRESH_FRAMES
+
+    def render(self):
+        self.fill((0, 0, 0, 192))
+        if self.__font is None:
+            self.__font = pygame.font.SysFont("courier", 12)
+        self.blit(self.__font.render(f"{'stage':<34}{'mean':>7}{'p99':>7}", True, Colors.WHITE), (5, 5))
+
+        for i, (name, stats) in enumerate(self.profiler.summary().items()):
+            self.blit(self.__font.render(f"{name[-34:]:<34}{stats['mean']:>7.2f}{stats['p99']:>7.2f}", True,
+                                         Colors.GREEN), (5, 20 + 14 * i))
+
+
+def create_drawer(sprite_size) -> Tuple[GameSurface, ProfilerOverlay]:
+    screen_handler = ScreenHandle((0, 0))
+    profiler_overlay = ProfilerOverlay((340, 300), pygame.SRCALPHA, (0, 0), screen_handler)
+    game_over_window = GameOverWindow((500, 200), pygame.SRCALPHA, (0, 0), profiler_overlay)
+    help_window = HelpWindow((700, 500), pygame.SRCALPHA, (150, 140), game_over_window)
+    info_window = InfoWindow((160, 480), (50, 50), help_window)
+    progress_bar = ProgressBar((640, 120), (640, 0), info_window)
+    mini_map_surface = GameSurface((160, 120), pygame.SRCALPHA, 8, (0, 480), progress_bar)
+    game_surface = GameSurface((640, 480), pygame.SRCALPHA, sprite_size, (640, 480), mini_map_surface)
+    mini_map_surface.stage_name = "mini_map"
+
+    return game_surface, profiler_overlay
@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import json
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from DistanceFields import object_kind
+from Logic import GameEngine, Action
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_IDLE_TIMEOUT = 300.
+DEFAULT_MAX_PENDING = 256
+
+
+def snapshot(engine: GameEngine) -> dict:
+    hero = engine.hero
+
+    return {
+        "position": list(hero.position),
+        "hp": hero.hp,
+        "max_hp": hero.max_hp,
+        "level": hero.level,
+        "exp": hero.exp,
+        "gold": hero.gold,
+        "floor": engine.level,
+        "score": round(engine.score, 4),
+        "alive": engine.game_process,
+        "objects": [[obj.position[0], obj.position[1], object_kind(obj)] for obj in engine.get_objects()],
+    }
+
+
+class Session:
+    # a game of one client; the state sent last is kept, so every move returns only the values which changed
+    def __init__(self, session_id, engine: GameEngine):
+        self.id = session_id
+        self.engine = engine
+        self.last_active = time.monotonic()
+        self.messages = []
+        self.__state = snapshot(engine)
+
+        engine.subscribe(self)
+
+    @property
+    def state(self) -> dict:
+        return self.__state
+
+    def update(self, message):
+        # the engine sends game events to the subscribers too, the client needs only the text messages
+        if isinstance(message, str):
+            self.messages.append(message)
+
+    def move(self, action) -> dict:
+        if self.engine.game_process:
+            self.engine.move(action)
+
+        state = snapshot(self.engine)
+        delta = {key: value for key, value in state.items() if self.__state[key] != value}
+        if self.messages:
+            delta["messages"] = self.messages
+            self.messages = []
+        self.__state = state
+
+        return delta
+
+
+class GameServer:
+    # hosts many games for thin clients over JSON lines, one request and one response per line:
+    #   {"op": "open"} -> {"session": id, "state": {...}}
+    #   {"op": "move", "session": id, "action": 0-3} -> {"session": id, "delta": {...}}
+    #   {"op": "close", "session": id} -> {"session": id, "closed": true}
+    # errors are returned as {"error": message}. Game logic runs in a single worker thread, so the event loop only
+    # parses and writes lines and the engines, which share global generators of levels, never run concurrently.
+    # A connection handles its requests one by one and the number of requests waiting for the worker is bounded,
+    # so a client sending faster than the server plays is slowed down by its own socket buffers.
+    def __init__(self, settings_provider: SettingsProvider, levels_file_path=LEVELS_FILE_PATH,
+                 max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_pending=DEFAULT_MAX_PENDING,
+                 moving_enemies=False):
+        self.__settings_provider = settings_provider
+        self.__levels_file_path = levels_file_path
+        self.__max_sessions = max_sessions
+        self.__idle_timeout = idle_timeout
+        self.__moving_enemies = moving_enemies
+        self.__sessions: Dict[str, Session] = dict()
+        self.__opening = 0
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="game-logic")
+        self.__pending = asyncio.Semaphore(max_pending)
+        self.__server: Optional[asyncio.AbstractServer] = None
+        self.__eviction_task: Optional[asyncio.Task] = None
+
+    @property
+    def sessions(self) -> Dict[str, Session]:
+        return self.__sessions
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None) -> asyncio.AbstractServer:
+        # a unix socket is used when its path is given
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__handle_connection, path)
+        else:
+            self.__server = await asyncio.start_server(self.__handle_connection, host, port)
+        self.__eviction_task = asyncio.create_task(self.__evict_periodically())
+
+        return self.__server
+
+    async def close(self):
+        if self.__eviction_task is not None:
+            self.__eviction_task.cancel()
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+        self.__sessions.clear()
+        self.__executor.shutdown(wait=False)
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op")
+
+        if op == "open":
+            return await self.__open()
+
+        # requests are decoded JSON, so every field can be of any JSON type
+        session_id = request.get("session")
+        session = self.__sessions.get(session_id) if isinstance(session_id, str) else None
+        if session is None:
+            return {"error": f"Unknown session '{session_id}'."}
+        session.last_active = time.monotonic()
+
+        if op == "move":
+            action = request.get("action")
+            # bools are ints too, and floats equal to an action are not valid indexes of the actions
+            if type(action) is not int or action not in Action.ALL:
+                return {"error": f"Unknown action '{action}'."}
+
+            return {"session": session.id, "delta": await self.__run(session.move, action)}
+        if op == "close":
+            self.__sessions.pop(session.id, None)
+
+            return {"session": session.id, "closed": True}
+
+        return {"error": f"Unknown operation '{op}'."}
+
+    def evict_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        idle = [session_id for session_id, session in self.__sessions.items()
+                if now - session.last_active > self.__idle_timeout]
+
+        for session_id in idle:
+            del self.__sessions[session_id]
+
+        return len(idle)
+
+    async def __open(self):
+        # sessions being created count against the limit too, so a burst of requests cannot exceed it
+        if len(self.__sessions) + self.__opening >= self.__max_sessions:
+            return {"error": "Too many sessions."}
+
+        self.__opening += 1
+        try:
+            engine = await self.__run(create_engine, self.__settings_provider, self.__levels_file_path, None,
+                                      self.__moving_enemies)
+        finally:
+            self.__opening -= 1
+
+        session = Session(secrets.token_hex(8), engine)
+        self.__sessions[session.id] = session
+
+        return {"session": session.id, "state": session.state}
+
+    async def __run(self, function, *args):
+        async with self.__pending:
+            return await asyncio.get_running_loop().run_in_executor(self.__executor, function, *args)
+
+    async def __handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"error": "Malformed request."}
+                else:
+                    response = await self.handle(request) if isinstance(request, dict) \
+                        else {"error": "Malformed request."}
+
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def __evict_periodically(self):
+        while True:
+            await asyncio.sleep(max(self.__idle_timeout / 4, 0.1))
+            self.evict_idle()
+
+
+async def serve(arguments):
+    server = GameServer(SettingsProvider(arguments.settings), arguments.levels, arguments.max_sessions,
+                        arguments.idle_timeout, arguments.max_pending, arguments.moving_enemies)
+    await server.start(arguments.host, arguments.port, arguments.unix)
+    print(f"Serving on {arguments.unix or f'{arguments.host}:{arguments.port}'}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Host many dungeon sessions for thin clients.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a unix socket instead of TCP")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="seconds after which a session without requests is closed")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="requests waiting for the game logic before connections stop being read")
+    parser.add_argument("--moving-enemies", action="store_true")
+    parser.add_argument("--settings", default=SETTINGS_FILE_PATH)
+    parser.add_argument("--levels", default=LEVELS_FILE_PATH)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_arguments()))
+    except KeyboardInterrupt:
+        pass
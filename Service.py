@@ -1,16 +1,60 @@
 import os
 import random
+import time
 from typing import Type, List, Tuple
 
+import numpy as np
 import yaml
 
 import Objects
 from Images import FixtureType, SpecialFixtures, Fixture
+from Metrics import MAP_GENERATION_SECONDS
 from Settings import SettingsProvider
 
 OBJECT_TEXTURE = os.path.join("texture", "objects")
 ENEMY_TEXTURE = os.path.join("texture", "enemies")
 ALLY_TEXTURE = os.path.join("texture", "ally")
+HERO_POSITION = (1, 1)
+
+
+class Connectivity:
+    UNLABELED = -1
+
+    @staticmethod
+    def wall_mask(_map) -> np.ndarray:
+        return np.array([[cell.fixture_type == FixtureType.WALL for cell in row] for row in _map], dtype=bool)
+
+    @classmethod
+    def label_components(cls, floor: np.ndarray) -> np.ndarray:
+        # every floor cell starts with its own flat index as a label, then labels are propagated to the
+        # 4-neighbours and compressed with pointer jumping until each component holds its smallest index
+        height, width = floor.shape
+        background = height * width
+        labels = np.where(floor, np.arange(background).reshape(height, width), background)
+
+        while True:
+            padded = np.pad(labels, 1, constant_values=background)
+            merged = np.minimum.reduce([labels, padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2],
+                                        padded[1:-1, 2:]])
+            merged = np.where(floor, merged, background)
+            merged = np.append(merged.ravel(), background)[merged]
+
+            if np.array_equal(merged, labels):
+                break
+
+            labels = merged
+
+        return np.where(floor, labels, cls.UNLABELED)
+
+    @classmethod
+    def reachable_mask(cls, floor: np.ndarray, start=HERO_POSITION) -> np.ndarray:
+        labels = cls.label_components(floor)
+        start_label = labels[start[1], start[0]]
+
+        if start_label == cls.UNLABELED:
+            return np.zeros_like(floor)
+
+        return labels == start_label
 
 
 class Level:
@@ -30,14 +74,31 @@ class Level:
 class MapFactory:
     MAP_WIDTH = 41
     MAP_HEIGHT = 41
+    TILES = [
+        SpecialFixtures.WALL,
+        SpecialFixtures.FLOOR_1,
+        SpecialFixtures.FLOOR_2,
+        SpecialFixtures.FLOOR_3,
+        SpecialFixtures.FLOOR_1,
+        SpecialFixtures.FLOOR_2,
+        SpecialFixtures.FLOOR_3,
+        SpecialFixtures.FLOOR_1,
+        SpecialFixtures.FLOOR_2
+    ]
+
+    # when enabled, generated maps never contain regions unreachable from the hero position and objects are
+    # placed only into the component of the hero
+    CONNECTIVITY_CHECK = True
+    MIN_REACHABLE_RATIO = 0.9
+    MAX_GENERATION_ATTEMPTS = 10
 
     __settings_provider: SettingsProvider = None
+    _reachable_cache = (None, None)
 
     @classmethod
-    def from_yaml(cls, loader, node) -> Level:
-        _config = loader.construct_mapping(node, deep=True)
+    def from_config(cls, config) -> Level:
         _map = cls.create_map()
-        _obj = cls.create_objects(_config)
+        _obj = cls.create_objects(config)
 
         return Level(_map, _obj)
 
@@ -57,31 +118,51 @@ class MapFactory:
 
     @classmethod
     def generate_map(cls):
-        _map = [[0 for _ in range(cls.MAP_WIDTH)] for _ in range(cls.MAP_HEIGHT)]
-
-        for i in range(cls.MAP_WIDTH):
-            for j in range(cls.MAP_HEIGHT):
-                if i == 0 or j == 0 or i == cls.MAP_HEIGHT - 1 or j == cls.MAP_WIDTH - 1:
-                    _map[j][i] = SpecialFixtures.WALL
-                elif i == 1 and j == 1:
-                    _map[j][i] = SpecialFixtures.FLOOR_1
-                else:
-                    _map[j][i] = [
-                        SpecialFixtures.WALL,
-                        SpecialFixtures.FLOOR_1,
-                        SpecialFixtures.FLOOR_2,
-                        SpecialFixtures.FLOOR_3,
-                        SpecialFixtures.FLOOR_1,
-                        SpecialFixtures.FLOOR_2,
-                        SpecialFixtures.FLOOR_3,
-                        SpecialFixtures.FLOOR_1,
-                        SpecialFixtures.FLOOR_2
-                    ][random.randint(0, 8)]
+        start = time.perf_counter()
+        tiles = cls.generate_tiles()
+
+        if cls.CONNECTIVITY_CHECK:
+            reachable = Connectivity.reachable_mask(tiles != 0)
+
+            for _ in range(cls.MAX_GENERATION_ATTEMPTS - 1):
+                if reachable.sum() >= cls.MIN_REACHABLE_RATIO * (tiles != 0).sum():
+                    break
+                tiles = cls.generate_tiles()
+                reachable = Connectivity.reachable_mask(tiles != 0)
+
+            # floor cells which cannot be reached from the hero position are turned into walls
+            tiles = np.where(reachable, tiles, 0)
+
+        _map = cls.tiles_to_map(tiles)
+        MAP_GENERATION_SECONDS.observe(time.perf_counter() - start)
 
         return _map
 
+    @classmethod
+    def generate_tiles(cls) -> np.ndarray:
+        # tiles are indexes in the TILES list, 0 is always a wall
+        tiles = np.random.randint(0, len(cls.TILES), (cls.MAP_HEIGHT, cls.MAP_WIDTH))
+        tiles[[0, -1], :] = 0
+        tiles[:, [0, -1]] = 0
+        tiles[HERO_POSITION[1], HERO_POSITION[0]] = 1
+
+        return tiles
+
+    @classmethod
+    def tiles_to_map(cls, tiles: np.ndarray):
+        return np.array(cls.TILES, dtype=object)[tiles].tolist()
+
     @classmethod
     def calculate_object_coordinates(cls, _map, _objects) -> Tuple[int, int]:
+        if cls.CONNECTIVITY_CHECK:
+            cells = cls._reachable_cells(_map)
+
+            while True:
+                coord = random.choice(cells)
+
+                if not cls._coord_intersect_with_hero(coord) and not cls._coord_intersect_with_object(coord, _objects):
+                    return coord
+
         while True:
             coord = cls.generate_random_coordinates()
 
@@ -94,9 +175,21 @@ class MapFactory:
     def generate_random_coordinates(cls) -> Tuple[int, int]:
         return random.randint(1, cls.MAP_WIDTH - 2), random.randint(1, cls.MAP_HEIGHT - 2)
 
+    @staticmethod
+    def _reachable_cells(_map) -> List[Tuple[int, int]]:
+        # objects of the same level are generated one by one for the same map, so the last result is cached
+        cached_map, cells = MapFactory._reachable_cache
+
+        if cached_map is not _map:
+            ys, xs = np.nonzero(Connectivity.reachable_mask(~Connectivity.wall_mask(_map)))
+            cells = list(zip(xs.tolist(), ys.tolist()))
+            MapFactory._reachable_cache = (_map, cells)
+
+        return cells
+
     @staticmethod
     def _coord_intersect_with_hero(coord):
-        return coord == (1, 1)
+        return coord == HERO_POSITION
 
     @staticmethod
     def _coord_intersect_with_wall(coord, _map):
@@ -122,17 +215,19 @@ class MapFactory:
 
     @classmethod
     def generate_enemies(cls, _map, _existing_objects, min_count, max_count, stats, image_name, experience):
+        fixture = Fixture.shared(os.path.join(ENEMY_TEXTURE, image_name))
+
         for i in range(random.randint(min_count, max_count)):
             coord = cls.calculate_object_coordinates(_map, _existing_objects)
-            fixture = Fixture(os.path.join(ENEMY_TEXTURE, image_name))
-            yield Objects.Enemy(fixture, stats, experience, coord)
+            yield Objects.ENEMY_POOL.acquire(fixture, stats, experience, coord)
 
     @classmethod
     def _generate_allies_internal(cls, _map, _existing_objects, min_count, max_count, action, image_name, texture_path):
+        fixture = Fixture.shared(os.path.join(texture_path, image_name))
+
         for i in range(random.randint(min_count, max_count)):
             coord = cls.calculate_object_coordinates(_map, _existing_objects)
-            fixture = Fixture(os.path.join(texture_path, image_name))
-            yield Objects.Ally(fixture, action, coord)
+            yield Objects.ALLY_POOL.acquire(fixture, action, coord)
 
 
 class EndMap(MapFactory):
@@ -170,9 +265,13 @@ class EndMap(MapFactory):
 class EmptyMap(MapFactory):
     class Map:
         def __init__(self):
-            self.__map = EmptyMap.generate_map()
+            self.__map = None
 
         def get_map(self):
+            # maps are generated when the level is reached, not when the levels are loaded
+            if self.__map is None:
+                self.__map = EmptyMap.generate_map()
+
             return self.__map
 
     class Objects:
@@ -196,9 +295,13 @@ class EmptyMap(MapFactory):
 class SpecialMap(MapFactory):
     class Map:
         def __init__(self):
-            self.__map = SpecialMap.generate_map()
+            self.__map = None
 
         def get_map(self):
+            # maps are generated when the level is reached, not when the levels are loaded
+            if self.__map is None:
+                self.__map = SpecialMap.generate_map()
+
             return self.__map
 
     class Objects:
@@ -232,9 +335,13 @@ class SpecialMap(MapFactory):
 class RandomMap(MapFactory):
     class Map:
         def __init__(self):
-            self.__map = RandomMap.generate_map()
+            self.__map = None
 
         def get_map(self):
+            # maps are generated when the level is reached, not when the levels are loaded
+            if self.__map is None:
+                self.__map = RandomMap.generate_map()
+
             return self.__map
 
     class Objects:
@@ -262,29 +369,62 @@ class RandomMap(MapFactory):
             return self.__objects
 
 
+LEVEL_TAGS = {EmptyMap: "!empty_map", SpecialMap: "!special_map", RandomMap: "!random_map"}
+
+
+class LevelsLoader(yaml.SafeLoader):
+    # every level is loaded as a pair of the map factory and its config, levels are created from them later
+    pass
+
+
+class LevelsDumper(yaml.SafeDumper):
+    # writes pairs of map factories and configs back with the tags the loader reads
+    pass
+
+
+for _factory, _tag in LEVEL_TAGS.items():
+    LevelsLoader.add_constructor(
+        _tag, lambda loader, node, factory=_factory: (factory, loader.construct_mapping(node, deep=True)))
+LevelsDumper.add_representer(
+    tuple, lambda dumper, level: dumper.represent_mapping(LEVEL_TAGS[level[0]], level[1], flow_style=False))
+
+
 class LevelsProvider:
+    __configs_cache = dict()
+
     def __init__(self, levels_settings_file_path: str, settings_provider: SettingsProvider):
         self.__settings_provider = settings_provider
-        self.__levels = self.__load_levels(levels_settings_file_path)
+        self.__levels = self.__create_levels(self.load_configs(levels_settings_file_path))
 
     def get_levels(self) -> List[Level]:
         return self.__levels
 
-    def __load_levels(self, file_path) -> List[Level]:
-        with open(file_path, "r") as file:
-            yaml.add_constructor("!empty_map", lambda loader, node: self.__create_level(EmptyMap, loader, node))
-            yaml.add_constructor("!special_map", lambda loader, node: self.__create_level(SpecialMap, loader, node))
-            yaml.add_constructor("!random_map", lambda loader, node: self.__create_level(RandomMap, loader, node))
+    @classmethod
+    def load_configs(cls, file_path) -> List[Tuple[Type[MapFactory], dict]]:
+        # the file is parsed once per modification, since a new provider is created for every game
+        key = (file_path, os.path.getmtime(file_path))
+
+        if key not in cls.__configs_cache:
+            with open(file_path, "r") as file:
+                cls.__configs_cache[key] = yaml.load(file.read(), Loader=LevelsLoader)['levels']
+
+        return cls.__configs_cache[key]
+
+    @staticmethod
+    def dump_configs(configs: List[Tuple[Type[MapFactory], dict]], file_path):
+        with open(file_path, "w") as file:
+            yaml.dump({"levels": list(configs)}, file, Dumper=LevelsDumper, sort_keys=False)
 
-            levels = yaml.load(file.read())['levels']
-            levels.append(self.__create_end_level())
+    def __create_levels(self, configs) -> List[Level]:
+        levels = [self.__create_level(map_factory, config) for map_factory, config in configs]
+        levels.append(self.__create_end_level())
 
-            return levels
+        return levels
 
-    def __create_level(self, map_factory: Type[MapFactory], loader, node):
+    def __create_level(self, map_factory: Type[MapFactory], config):
         map_factory.register_settings_provider(self.__settings_provider)
 
-        return map_factory.from_yaml(loader, node)
+        return map_factory.from_config(dict(config or {}))
 
     @staticmethod
     def __create_end_level():
@@ -155,7 +155,7 @@ class SettingsProvider:
         if self.__settings_file_path != file_path or self.__settings is None:
             with open(file_path, "r") as file:
                 self.__settings_file_path = file_path
-                self.__settings = Settings(**yaml.load(file.read()))
+                self.__settings = Settings(**yaml.load(file.read(), Loader=yaml.FullLoader))
 
     def get_objects(self) -> List[ObjectSetting]:
         return self.__settings.objects
@@ -0,0 +1,125 @@
+import os
+from typing import Callable, List
+
+import numpy as np
+
+import EventHandlers
+from Enemies import EnemyMovement
+from Event import Event
+from EventHandlers import EventHandler
+from Images import Fixture
+from Logic import GameEngine
+from MultiHero import MultiHeroEngine
+from Objects import Hero, Ally
+from Service import LevelsProvider
+from Settings import SettingsProvider, ObjectStatistic
+
+SETTINGS_FILE_PATH = "objects.yml"
+LEVELS_FILE_PATH = "levels.yml"
+HERO_FIXTURE_PATH = os.path.join("texture", "Hero.png")
+
+
+def create_hero(fixture_path=HERO_FIXTURE_PATH) -> Hero:
+    hero_icon = Fixture.shared(fixture_path)
+    hero_statistic = ObjectStatistic(strength=20, endurance=20, intelligence=5, luck=5)
+
+    return Hero(hero_statistic, hero_icon)
+
+
+def create_engine(settings_provider: SettingsProvider, levels_file_path=LEVELS_FILE_PATH,
+                  sprite_size=None, moving_enemies=False, level_bank: "LevelBank" = None) -> GameEngine:
+    # levels are generated when they are loaded, so every game needs its own levels provider;
+    # with a level bank the levels are taken from it instead
+    if level_bank is not None:
+        levels_provider = level_bank.levels_provider()
+    else:
+        levels_provider = LevelsProvider(levels_file_path, settings_provider)
+    engine = GameEngine()
+    engine.sprite_size = sprite_size
+
+    if moving_enemies:
+        # the seed is drawn from the game random state, so seeded games stay reproducible
+        EnemyMovement(engine, seed=np.random.randint(2 ** 31))
+
+    # initialize map and statistic for the beginning of the game
+    event_handler = EventHandler(engine, levels_provider)
+    event_handler.update(Event(EventHandlers.RELOAD_GAME_EVENT, Ally.InteractedWithHeroEventPayload(create_hero())))
+
+    return engine
+
+
+def create_multi_hero_engine(settings_provider: SettingsProvider, heroes_count,
+                             levels_file_path=LEVELS_FILE_PATH, moving_enemies=False) -> MultiHeroEngine:
+    levels_provider = LevelsProvider(levels_file_path, settings_provider)
+
+    return MultiHeroEngine(levels_provider, [create_hero() for _ in range(heroes_count)], moving_enemies)
+
+
+class BatchedRunner:
+    # steps many headless engines with one policy; the engines are split into two halves, so while the policy
+    # evaluates observations of one half (when it is asynchronous) the other half is being stepped
+    def __init__(self, engine_factory: Callable[[], GameEngine], policy: "Policy", count: int,
+                 observation_builder: "ObservationBuilder" = None, sink=None):
+        from Policies import ObservationBuilder
+
+        # sink receives every transition with append(observation, action, reward, done)
+        self.__sink = sink
+        self.__engine_factory = engine_factory
+        self.__policy = policy
+        self.__observation_builder = observation_builder or ObservationBuilder()
+        self.__engines = [engine_factory() for _ in range(count)]
+        self.__halves = [list(range(0, count, 2)), list(range(1, count, 2))]
+        self.__pending = [None, None]
+
+    @property
+    def engines(self) -> List[GameEngine]:
+        return self.__engines
+
+    def step(self):
+        rewards = np.zeros(len(self.__engines), dtype=np.float32)
+        dones = np.zeros(len(self.__engines), dtype=bool)
+
+        for half in range(len(self.__halves)):
+            if self.__pending[half] is None:
+                self.__pending[half] = self.__submit(half)
+
+        for half, indexes in enumerate(self.__halves):
+            observations, future = self.__pending[half]
+            actions = future.result()
+
+            for index, observation, action in zip(indexes, observations, actions):
+                engine = self.__engines[index]
+
+                # observations were built before the previous step of this engine, so it might be over already
+                if not engine.game_process:
+                    self.__engines[index] = self.__engine_factory()
+                    continue
+
+                prev_score = engine.score
+                engine.move(int(action))
+                rewards[index] = engine.score - prev_score
+                dones[index] = not engine.game_process
+
+                if self.__sink is not None:
+                    self.__sink.append(observation, action, rewards[index], dones[index])
+
+            self.__pending[half] = self.__submit(half)
+
+        return rewards, dones
+
+    def run(self, steps):
+        total_rewards = np.zeros(len(self.__engines), dtype=np.float32)
+        episodes = 0
+
+        for _ in range(steps):
+            rewards, dones = self.step()
+            total_rewards += rewards
+            episodes += int(dones.sum())
+
+        return total_rewards, episodes
+
+    def __submit(self, half):
+        engines = [self.__engines[index] for index in self.__halves[half]]
+        observations = self.__observation_builder.observe(engines)
+
+        return observations, self.__policy.submit(observations)
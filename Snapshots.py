@@ -0,0 +1,233 @@
+import collections
+import queue
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from Logic import GameEngine
+
+DEFAULT_TICK_RATE = 60
+# messages kept in a snapshot, as many as the info window shows
+MESSAGES_HISTORY = 25
+
+
+class ObjectSnapshot:
+    __slots__ = ("fixture", "position")
+
+    def __init__(self, fixture, position):
+        self.fixture = fixture
+        self.position = position
+
+    def draw(self, display):
+        display.draw_object(self.fixture, self.position)
+
+
+class HeroSnapshot(ObjectSnapshot):
+    __slots__ = ("hp", "max_hp", "level", "exp", "prev_level_exp", "next_level_exp", "gold", "stats")
+
+    def __init__(self, hero):
+        super().__init__(hero.fixture, tuple(hero.position))
+        self.hp = hero.hp
+        self.max_hp = hero.max_hp
+        self.level = hero.level
+        self.exp = hero.exp
+        self.prev_level_exp = hero.prev_level_exp
+        self.next_level_exp = hero.next_level_exp
+        self.gold = hero.gold
+        self.stats = hero.stats.copy()
+
+
+class MessageLog:
+    # collects the text messages of an engine on the simulation thread, every message gets its number
+    def __init__(self, history=MESSAGES_HISTORY):
+        self.count = 0
+        self.__recent = collections.deque(maxlen=history)
+
+    @property
+    def recent(self) -> Tuple[Tuple[int, str], ...]:
+        return tuple(self.__recent)
+
+    def update(self, message):
+        if isinstance(message, str):
+            self.count += 1
+            self.__recent.append((self.count, message))
+
+
+class EngineSnapshot:
+    # everything the screen shows, copied from the engine after a tick; snapshots are never changed, so the
+    # renderer reads one while the simulation thread is already building the next
+    def __init__(self, engine: GameEngine, revision, field_of_view=None, message_log: MessageLog = None):
+        self.key = self.key_of(engine, message_log)
+        self.revision = revision
+        # maps are replaced, not changed, when levels are loaded, so the map is shared instead of copied
+        self.map = engine.map
+        self.objects = tuple(ObjectSnapshot(obj.fixture, tuple(obj.position)) for obj in engine.get_objects())
+        self.hero = HeroSnapshot(engine.hero)
+        self.level = engine.level
+        self.score = engine.score
+        self.game_process = engine.game_process
+        self.show_help = engine.show_help
+        self.sprite_size = engine.sprite_size
+        self.message_log = message_log
+        self.messages = message_log.recent if message_log is not None else ()
+        self.visible = None if field_of_view is None else field_of_view.visible.copy()
+        self.explored = None if field_of_view is None else field_of_view.explored.copy()
+
+    @staticmethod
+    def key_of(engine: GameEngine, message_log: MessageLog = None):
+        # snapshots with the same key show the same state
+        return id(engine), engine.revision, engine.sprite_size, message_log.count if message_log is not None else 0
+
+    @classmethod
+    def capture(cls, engine: GameEngine, revision, field_of_view=None, message_log: MessageLog = None,
+                previous: "EngineSnapshot" = None) -> "EngineSnapshot":
+        if previous is not None and previous.key == cls.key_of(engine, message_log):
+            return previous
+
+        return cls(engine, revision, field_of_view, message_log)
+
+    def get_objects(self):
+        return self.objects
+
+
+class SnapshotView:
+    # the renderer side: looks like an engine (and a field of view) to the screen handles, but reads the snapshot
+    # shown last. Messages are delivered to the subscribers once, even when the renderer skipped some snapshots
+    def __init__(self):
+        self.__snapshot: Optional[EngineSnapshot] = None
+        self.__subscribers = set()
+        self.__message_log = None
+        self.__delivered = 0
+
+    def show(self, snapshot: EngineSnapshot):
+        self.__snapshot = snapshot
+
+        # a restarted or loaded game has a new log, which numbers its messages from 1 again
+        if snapshot.message_log is not self.__message_log:
+            self.__message_log = snapshot.message_log
+            self.__delivered = 0
+
+        for number, message in snapshot.messages:
+            if number > self.__delivered:
+                self.__delivered = number
+                for subscriber in self.__subscribers:
+                    subscriber.update(message)
+
+    @property
+    def snapshot(self) -> Optional[EngineSnapshot]:
+        return self.__snapshot
+
+    def subscribe(self, obj):
+        self.__subscribers.add(obj)
+
+    def unsubscribe(self, obj):
+        self.__subscribers.discard(obj)
+
+    @property
+    def revision(self):
+        return self.__snapshot.revision
+
+    @property
+    def map(self):
+        return self.__snapshot.map
+
+    @property
+    def hero(self):
+        return self.__snapshot.hero
+
+    @property
+    def level(self):
+        return self.__snapshot.level
+
+    @property
+    def score(self):
+        return self.__snapshot.score
+
+    @property
+    def game_process(self):
+        return self.__snapshot.game_process
+
+    @property
+    def show_help(self):
+        return self.__snapshot.show_help
+
+    @property
+    def sprite_size(self):
+        return self.__snapshot.sprite_size
+
+    @property
+    def visible(self) -> np.ndarray:
+        return self.__snapshot.visible
+
+    @property
+    def explored(self) -> np.ndarray:
+        return self.__snapshot.explored
+
+    def get_objects(self):
+        return self.__snapshot.objects
+
+
+class SimulationThread(threading.Thread):
+    # runs the game logic at a fixed tick rate (as fast as possible with 0) and publishes a snapshot after every
+    # tick. Publishing replaces one reference, so the renderer always takes a complete snapshot and neither
+    # thread waits for the other. Commands, e.g. the keys pressed, are run on this thread before the next tick;
+    # without a step the game changes only by commands, so a tick waits for one
+    def __init__(self, step: Optional[Callable[[], None]],
+                 capture: Callable[[int, Optional[EngineSnapshot]], EngineSnapshot], tick_rate=DEFAULT_TICK_RATE):
+        super().__init__(name="simulation", daemon=True)
+        self.__step = step
+        self.__capture = capture
+        self.__period = 1 / tick_rate if tick_rate else 0.
+        self.__commands = queue.SimpleQueue()
+        self.__stopped = threading.Event()
+        self.__latest: Optional[EngineSnapshot] = None
+        self.ticks = 0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def latest(self) -> Optional[EngineSnapshot]:
+        return self.__latest
+
+    def submit(self, command: Callable[[], None]):
+        self.__commands.put(command)
+
+    def stop(self):
+        self.__stopped.set()
+        # wakes the thread waiting for a command
+        self.__commands.put(lambda: None)
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        next_tick = time.perf_counter()
+
+        try:
+            if self.__step is None:
+                self.__latest = self.__capture(self.ticks, self.__latest)
+
+            while not self.__stopped.is_set():
+                if self.__step is None:
+                    self.__commands.get()()
+                    if self.__stopped.is_set():
+                        break
+                while not self.__commands.empty():
+                    self.__commands.get()()
+
+                if self.__step is not None:
+                    self.__step()
+                self.ticks += 1
+                self.__latest = self.__capture(self.ticks, self.__latest)
+
+                if self.__period:
+                    next_tick += self.__period
+                    delay = next_tick - time.perf_counter()
+                    if delay > 0:
+                        self.__stopped.wait(delay)
+                    else:
+                        # a late tick does not make the next ones run back to back
+                        next_tick = time.perf_counter()
+        except BaseException as error:
+            # the renderer re-raises it, so a failed simulation does not leave a frozen window
+            self.error = error
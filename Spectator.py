@@ -0,0 +1,197 @@
+import argparse
+import collections
+import math
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pygame
+
+from Logic import GameEngine
+from Service import MapFactory
+from Settings import Colors, SettingsProvider
+from Simulation import create_engine, BatchedRunner, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+DEFAULT_CELL_SIZE = 2
+DEFAULT_FPS = 4
+MAP_IMAGES_CAPACITY = 256
+
+
+class LevelImages:
+    # images of whole maps with `cell_size` pixels per cell, drawn once per level and shared by the tiles of every
+    # engine playing it; maps are replaced when levels are loaded, so a map is known by its identity
+    def __init__(self, cell_size, capacity=MAP_IMAGES_CAPACITY):
+        self.__cell_size = cell_size
+        self.__capacity = capacity
+        self.__images = collections.OrderedDict()
+        # pixels of the sprites of cells, (x, y, rgb) blocks in the order of their first use
+        self.__block_indexes = dict()
+        self.__blocks = np.zeros((0, cell_size, cell_size, 3), dtype=np.uint8)
+
+    def get(self, game_map) -> pygame.Surface:
+        key = id(game_map)
+        entry = self.__images.get(key)
+
+        # the map is kept along with its image, so its id is not reused while the image is cached
+        if entry is not None and entry[0] is game_map:
+            self.__images.move_to_end(key)
+            return entry[1]
+
+        # maps are made of a few kinds of cells, so the image is assembled from their pixel blocks at once
+        size = self.__cell_size
+        indexes = np.array([[self.__block_index(cell) for cell in row] for row in game_map])
+        height, width = indexes.shape
+        pixels = self.__blocks[indexes].transpose(1, 2, 0, 3, 4).reshape(width * size, height * size, 3)
+        image = pygame.surfarray.make_surface(pixels)
+
+        self.__images[key] = (game_map, image)
+        if len(self.__images) > self.__capacity:
+            self.__images.popitem(last=False)
+
+        return image
+
+    def __block_index(self, cell):
+        index = self.__block_indexes.get(cell)
+
+        if index is None:
+            block = pygame.surfarray.array3d(cell.sprite(self.__cell_size, self.__cell_size))
+            index = self.__block_indexes[cell] = len(self.__blocks)
+            self.__blocks = np.concatenate([self.__blocks, block[np.newaxis]])
+
+        return index
+
+
+class SpectatorTile(pygame.Surface):
+    # a small view of a whole level; when the engine has changed only the cells whose objects differ from the
+    # drawn ones are restored from the level image and drawn again
+    def __init__(self, size, cell_size, level_images: LevelImages):
+        super().__init__(size)
+        self.__cell_size = cell_size
+        self.__level_images = level_images
+        self.__engine = None
+        self.__revision = None
+        self.__map = None
+        self.__game_process = True
+        self.__drawn = dict()
+
+    def update(self, engine: GameEngine) -> bool:
+        if engine is self.__engine and engine.revision == self.__revision:
+            return False
+
+        image = self.__level_images.get(engine.map)
+        if engine.map is not self.__map or engine.game_process != self.__game_process:
+            self.fill(Colors.BLACK)
+            self.blit(image, (0, 0))
+            if not engine.game_process:
+                self.fill((96, 0, 0), special_flags=pygame.BLEND_RGB_ADD)
+            self.__map = engine.map
+            self.__game_process = engine.game_process
+            self.__drawn = dict()
+
+        current = {tuple(obj.position): obj.fixture for obj in engine.get_objects()}
+        current[tuple(engine.hero.position)] = engine.hero.fixture
+        size = self.__cell_size
+
+        for cell in self.__drawn.keys() | current.keys():
+            fixture = current.get(cell)
+            if self.__drawn.get(cell) is not fixture:
+                area = pygame.Rect(cell[0] * size, cell[1] * size, size, size)
+                self.blit(image, area, area)
+                if fixture is not None:
+                    self.blit(fixture.sprite(size, size), area)
+
+        self.__drawn = current
+        self.__engine = engine
+        self.__revision = engine.revision
+
+        return True
+
+
+class SpectatorGrid:
+    # tiles of many engines in one window, drawn at most `fps` times a second and only where engines changed
+    def __init__(self, count, columns=None, cell_size=DEFAULT_CELL_SIZE, fps=DEFAULT_FPS, spacing=2):
+        self.__columns = columns or math.ceil(math.sqrt(count))
+        self.__spacing = spacing
+        self.tile_size = (MapFactory.MAP_WIDTH * cell_size, MapFactory.MAP_HEIGHT * cell_size)
+        rows = math.ceil(count / self.__columns)
+        self.size = (self.__columns * (self.tile_size[0] + spacing) + spacing,
+                     rows * (self.tile_size[1] + spacing) + spacing)
+        level_images = LevelImages(cell_size)
+        self.__tiles = [SpectatorTile(self.tile_size, cell_size, level_images) for _ in range(count)]
+        self.__interval = 1 / fps if fps else 0.
+        self.__next_draw = 0.
+
+    def tile_position(self, index):
+        row, column = divmod(index, self.__columns)
+
+        return (self.__spacing + column * (self.tile_size[0] + self.__spacing),
+                self.__spacing + row * (self.tile_size[1] + self.__spacing))
+
+    def draw(self, canvas: pygame.Surface, engines: Sequence[GameEngine], now=None) -> Optional[List[pygame.Rect]]:
+        # None when it is too early for a frame, otherwise the areas of the canvas which were drawn
+        now = time.perf_counter() if now is None else now
+        if now < self.__next_draw:
+            return None
+        self.__next_draw = now + self.__interval
+
+        return [canvas.blit(tile, self.tile_position(index))
+                for index, (tile, engine) in enumerate(zip(self.__tiles, engines)) if tile.update(engine)]
+
+
+def spectate(runner: BatchedRunner, steps, grid: SpectatorGrid):
+    pygame.display.init()
+    try:
+        display = pygame.display.set_mode(grid.size)
+        pygame.display.set_caption(f"MyRPG spectator: {len(runner.engines)} games")
+        display.fill(Colors.BLACK)
+        pygame.display.update()
+        step = 0
+
+        while step < steps:
+            runner.step()
+            step += 1
+
+            # events are handled with the frames only, so the rollouts are not slowed down between them
+            rects = grid.draw(display, runner.engines)
+            if rects is not None:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                        return step
+                pygame.display.update(rects)
+
+        return step
+    finally:
+        pygame.display.quit()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Watch many games played by a policy in one window.")
+    parser.add_argument("--engines", type=int, default=64)
+    parser.add_argument("--policy", default="greedy")
+    parser.add_argument("--steps", type=int, default=10000, help="steps of every engine")
+    parser.add_argument("--columns", type=int, help="tiles in a row, the grid is square by default")
+    parser.add_argument("--cell-size", type=int, default=DEFAULT_CELL_SIZE, help="pixels of a map cell in a tile")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="frames per second of the window")
+
+    return parser.parse_args()
+
+
+def main():
+    from Policies import load_policy
+
+    arguments = parse_arguments()
+    settings_provider = SettingsProvider(SETTINGS_FILE_PATH)
+    policy = load_policy(arguments.policy)
+    runner = BatchedRunner(lambda: create_engine(settings_provider, LEVELS_FILE_PATH), policy, arguments.engines)
+    grid = SpectatorGrid(arguments.engines, arguments.columns, arguments.cell_size, arguments.fps)
+
+    start = time.perf_counter()
+    try:
+        steps = spectate(runner, arguments.steps, grid)
+    finally:
+        policy.close()
+    print(f"{steps * arguments.engines / (time.perf_counter() - start):.0f} moves/s")
+
+
+if __name__ == "__main__":
+    main()
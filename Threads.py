@@ -0,0 +1,18 @@
+import queue
+import threading
+
+# how often a put into a full queue checks whether the thread taking from it is still alive
+POLL_INTERVAL = 0.1
+
+
+def put_while_alive(items: queue.Queue, item, thread: threading.Thread) -> bool:
+    # a failed background thread takes nothing from its full queue any more, so waiting for a free place stops
+    # with the thread; False when the item was not put
+    while thread.is_alive():
+        try:
+            items.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+
+    return False
@@ -0,0 +1,250 @@
+import argparse
+import copy
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+import yaml
+
+from Balance import BalanceReport, run_chunk, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_STEPS
+from Service import LevelsProvider, SpecialMap, RandomMap
+from Simulation import SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+TUNED_STATS = ("strength", "endurance")
+# relative change of tuned enemy stats and object counts in one mutation
+STAT_STEP = 0.15
+COUNT_STEP = 0.2
+# candidates are evaluated on growing prefixes of the same seeds and dropped after a stage when they are clearly
+# worse than the incumbent on the same games
+DEFAULT_STAGES = (0.25, 0.5, 1.)
+DEFAULT_EARLY_STOP_MARGIN = 0.01
+DEFAULT_TOLERANCE = 1e-3
+
+
+class Candidate:
+    # one point of the search: configs of the levels and the raw objects settings
+    def __init__(self, levels: list, settings: dict):
+        self.levels = levels
+        self.settings = settings
+
+    @classmethod
+    def load(cls, settings_file_path, levels_file_path) -> "Candidate":
+        with open(settings_file_path, "r") as file:
+            settings = yaml.safe_load(file)
+
+        levels = [(factory, dict(config or {})) for factory, config in LevelsProvider.load_configs(levels_file_path)]
+
+        return cls(levels, settings)
+
+    def copy(self) -> "Candidate":
+        return Candidate([(factory, dict(config)) for factory, config in self.levels], copy.deepcopy(self.settings))
+
+    def write(self, settings_file_path, levels_file_path):
+        with open(settings_file_path, "w") as file:
+            yaml.safe_dump(self.settings, file, sort_keys=False, default_flow_style=None)
+        LevelsProvider.dump_configs(self.levels, levels_file_path)
+
+    def enemies_on_floor(self, floor) -> List[str]:
+        factory, config = self.levels[floor]
+
+        if factory is RandomMap:
+            return list(self.settings["enemies"])
+
+        return [name for name in config if name in self.settings["enemies"]]
+
+
+def loss(report: BalanceReport, targets: np.ndarray) -> float:
+    # floors nobody reached count as floors nobody survived
+    survival = np.where(report.entered > 0, report.survival_rates(), 0.)[:len(targets)]
+
+    return float(np.mean((survival - targets) ** 2))
+
+
+class DifficultyTuner:
+    # stochastic hill climbing: every iteration mutates the incumbent towards the target survival of a floor
+    # it misses the most, evaluates a batch of such candidates in parallel on the same seeds and keeps the best
+    def __init__(self, targets: Sequence[float], settings_file_path=SETTINGS_FILE_PATH,
+                 levels_file_path=LEVELS_FILE_PATH, policy="greedy", games=256, seed=0, max_steps=DEFAULT_MAX_STEPS,
+                 workers=None, chunk_size=DEFAULT_CHUNK_SIZE, stages=DEFAULT_STAGES,
+                 early_stop_margin=DEFAULT_EARLY_STOP_MARGIN, random_seed=None):
+        self.__candidate = Candidate.load(settings_file_path, levels_file_path)
+
+        if len(targets) > len(self.__candidate.levels):
+            raise ValueError(f"There are {len(targets)} targets for {len(self.__candidate.levels)} floors.")
+
+        self.__targets = np.asarray(targets, dtype=np.float64)
+        self.__policy = policy
+        self.__max_steps = max_steps
+        self.__seed = seed
+        self.__workers = workers
+        self.__chunk_size = chunk_size
+        self.__boundaries = sorted({max(1, round(games * stage)) for stage in stages})
+        self.__early_stop_margin = early_stop_margin
+        self.__random = np.random.default_rng(random_seed)
+        self.__executor = None
+        self.__directory = None
+        self.__written = 0
+        self.__report: Optional[BalanceReport] = None
+        self.__losses: List[float] = []
+
+    @property
+    def candidate(self) -> Candidate:
+        return self.__candidate
+
+    @property
+    def report(self) -> Optional[BalanceReport]:
+        return self.__report
+
+    @property
+    def loss(self) -> float:
+        return self.__losses[-1] if self.__losses else float("inf")
+
+    def tune(self, iterations, batch_size, tolerance=DEFAULT_TOLERANCE, callback=None) -> Candidate:
+        with tempfile.TemporaryDirectory(prefix="tuner-") as self.__directory:
+            if self.__workers != 0:
+                self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+
+            try:
+                reports, losses, _ = self.evaluate([self.__candidate])
+                self.__report, self.__losses = reports[0], losses[0]
+
+                for iteration in range(iterations):
+                    if self.loss <= tolerance:
+                        break
+
+                    batch = [self.mutate(self.__candidate) for _ in range(batch_size)]
+                    reports, losses, finished = self.evaluate(batch, self.__losses)
+                    best = min(finished, key=lambda i: losses[i][-1], default=None)
+
+                    if best is not None and losses[best][-1] < self.loss:
+                        self.__candidate, self.__report, self.__losses = batch[best], reports[best], losses[best]
+
+                    if callback is not None:
+                        callback(iteration, self, batch_size - len(finished))
+            finally:
+                if self.__executor is not None:
+                    self.__executor.shutdown()
+                    self.__executor = None
+
+        return self.__candidate
+
+    def evaluate(self, candidates: List[Candidate], incumbent_losses=None):
+        # every candidate plays the same seeds, so the differences between them are not hidden by the luck of games
+        paths = [self.__write(candidate) for candidate in candidates]
+        reports: List[Optional[BalanceReport]] = [None] * len(candidates)
+        losses = [[] for _ in candidates]
+        alive = list(range(len(candidates)))
+        previous = 0
+
+        for stage, boundary in enumerate(self.__boundaries):
+            tasks = [(index, (*paths[index], self.__policy, self.__max_steps), start,
+                      min(start + self.__chunk_size, self.__seed + boundary))
+                     for index in alive
+                     for start in range(self.__seed + previous, self.__seed + boundary, self.__chunk_size)]
+
+            for (index, *_), chunk in zip(tasks, self.__map(tasks)):
+                reports[index] = chunk if reports[index] is None else reports[index].merge(chunk)
+
+            for index in alive:
+                losses[index].append(loss(reports[index], self.__targets))
+
+            if incumbent_losses is not None and stage < len(self.__boundaries) - 1:
+                alive = [index for index in alive
+                         if losses[index][-1] <= incumbent_losses[stage] + self.__early_stop_margin]
+            previous = boundary
+
+        return reports, losses, alive
+
+    def mutate(self, candidate: Candidate) -> Candidate:
+        errors = self.__errors()
+        candidate = candidate.copy()
+        # floors which miss their targets the most are changed more often
+        weights = np.abs(errors) + 1e-3
+        floor = int(self.__random.choice(len(errors), p=weights / weights.sum()))
+        # positive error means the floor is survived more often than it should be
+        harder = errors[floor] > 0
+        factory, config = candidate.levels[floor]
+        counts = [name for name in config if factory is SpecialMap]
+        enemies = candidate.enemies_on_floor(floor)
+
+        if counts and (not enemies or self.__random.random() < 0.7):
+            name = counts[int(self.__random.integers(len(counts)))]
+            # more enemies or fewer allies make the floor harder
+            sign = 1 if (name in candidate.settings["enemies"]) == harder else -1
+            step = max(1, round(config[name] * COUNT_STEP))
+            config[name] = max(0, int(config[name]) + sign * step)
+        elif enemies:
+            stats = candidate.settings["enemies"][enemies[int(self.__random.integers(len(enemies)))]]
+            for stat in TUNED_STATS:
+                stats[stat] = max(1, round(stats[stat] * (1 + STAT_STEP if harder else 1 - STAT_STEP)))
+
+        return candidate
+
+    def __errors(self) -> np.ndarray:
+        if self.__report is None:
+            return np.zeros(len(self.__targets))
+
+        survival = np.where(self.__report.entered > 0, self.__report.survival_rates(), 0.)
+
+        return survival[:len(self.__targets)] - self.__targets
+
+    def __write(self, candidate: Candidate):
+        # every candidate gets its own files, since workers cache parsed levels by path and modification time
+        self.__written += 1
+        settings_file_path = os.path.join(self.__directory, f"candidate-{self.__written}.objects.yml")
+        levels_file_path = os.path.join(self.__directory, f"candidate-{self.__written}.levels.yml")
+        candidate.write(settings_file_path, levels_file_path)
+
+        return settings_file_path, levels_file_path
+
+    def __map(self, tasks):
+        if self.__executor is None:
+            return [run_chunk(*task[1:]) for task in tasks]
+
+        return list(self.__executor.map(run_chunk, *zip(*[task[1:] for task in tasks])))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Search levels and enemies settings for target survival rates.")
+    parser.add_argument("targets", help="comma separated survival rates of the floors, e.g. 1,0.95,0.9,0.8")
+    parser.add_argument("--games", type=int, default=256, help="games played by every candidate")
+    parser.add_argument("--iterations", type=int, default=20, help="maximum number of search iterations")
+    parser.add_argument("--batch-size", type=int, default=8, help="candidates evaluated in parallel per iteration")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 plays in this process")
+    parser.add_argument("--policy", default="greedy", help="built-in policy name or 'module:attribute'")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS, help="moves before a game times out")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game shared by all candidates")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="stop below this loss")
+    parser.add_argument("--early-stop-margin", type=float, default=DEFAULT_EARLY_STOP_MARGIN,
+                        help="drop a candidate after a stage when its loss exceeds the incumbent one by this much")
+    parser.add_argument("--settings", default=SETTINGS_FILE_PATH, help="objects settings file to start from")
+    parser.add_argument("--levels", default=LEVELS_FILE_PATH, help="levels settings file to start from")
+    parser.add_argument("--output-levels", default="levels.tuned.yml", help="where to write the proposed levels")
+    parser.add_argument("--output-settings", default="objects.tuned.yml",
+                        help="where to write the proposed objects settings")
+
+    return parser.parse_args()
+
+
+def print_progress(iteration, tuner: DifficultyTuner, stopped):
+    survival = np.where(tuner.report.entered > 0, tuner.report.survival_rates(), 0.)
+    print(f"iteration {iteration + 1}: loss {tuner.loss:.5f}, {stopped} stopped early, "
+          f"survival {' '.join(f'{rate:.2f}' for rate in survival)}", flush=True)
+
+
+def main():
+    arguments = parse_arguments()
+    targets = [float(target) for target in arguments.targets.split(",")]
+    tuner = DifficultyTuner(targets, arguments.settings, arguments.levels, arguments.policy, arguments.games,
+                            arguments.seed, arguments.max_steps, arguments.workers)
+
+    candidate = tuner.tune(arguments.iterations, arguments.batch_size, arguments.tolerance, print_progress)
+    candidate.write(arguments.output_settings, arguments.output_levels)
+    print(f"Proposed levels are written into {arguments.output_levels}, "
+          f"enemies into {arguments.output_settings}.")
+
+
+if __name__ == "__main__":
+    main()
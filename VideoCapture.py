@@ -0,0 +1,206 @@
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+import pygame
+
+from Metrics import REGISTRY
+
+PNG = "png"
+RAW = "raw"
+RAW_FILE_NAME = "frames.rgb"
+RAW_INDEX_FILE_NAME = "video.json"
+DEFAULT_POOL_SIZE = 32
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# width, height, bit depth, color type (RGB), compression, filter and interlace methods
+PNG_HEADER = struct.Struct(">IIBBBBB")
+PNG_COMPRESS_LEVEL = 1
+
+CAPTURED_FRAMES = REGISTRY.counter("kitd_capture_frames_total", "Frames written by the episode capture.")
+DROPPED_FRAMES = REGISTRY.counter("kitd_capture_dropped_frames_total",
+                                  "Frames dropped because the capture encoder fell behind.")
+
+
+def write_png(path, rows: np.ndarray, width, height, compress_level=PNG_COMPRESS_LEVEL):
+    # rows are the RGB pixels of every row after a zero byte (no filter); zlib releases the GIL while compressing,
+    # so encoding on a thread does not slow the game down as pygame.image.save does
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+
+    with open(path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(chunk(b"IHDR", PNG_HEADER.pack(width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(rows, compress_level)))
+        file.write(chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    # the pixels of a surface are copied into one of `pool_size` preallocated buffers and encoded by a background
+    # thread, which returns the buffer to the pool; when every buffer waits for the encoder a new frame is dropped,
+    # or waits for a free buffer with block=True. Frames are written as PNG files or as one raw RGB24 file with
+    # its size in video.json, in a directory per episode
+    def __init__(self, directory, output_format=PNG, pool_size=DEFAULT_POOL_SIZE, block=False):
+        if output_format not in (PNG, RAW):
+            raise ValueError(f"Unknown capture format '{output_format}'.")
+
+        self.__directory = directory
+        self.__format = output_format
+        self.__pool_size = pool_size
+        self.__block = block
+        self.__free = queue.SimpleQueue()
+        self.__pending = queue.SimpleQueue()
+        self.__layout = None
+        self.__rows = None
+        self.__episode = None
+        self.__error = None
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__run, name="frame-capture", daemon=True)
+        self.__thread.start()
+
+    @property
+    def recording(self):
+        return self.__episode is not None
+
+    def start_episode(self, name):
+        self.end_episode()
+        self.__episode = name
+        self.__pending.put(("start", name))
+
+    def end_episode(self):
+        if self.__episode is not None:
+            self.__episode = None
+            self.__pending.put(("end", None))
+
+    def capture(self, surface: pygame.Surface) -> bool:
+        if self.__episode is None:
+            return False
+        if self.__error is not None:
+            raise self.__error
+
+        layout = self.__get_layout(surface)
+        buffer = self.__take_buffer()
+        if buffer is None:
+            self.dropped += 1
+            DROPPED_FRAMES.inc()
+            return False
+
+        # the whole pixel memory is copied as it is, the encoder picks the channels
+        pixels = surface.get_buffer()
+        np.copyto(buffer, np.frombuffer(pixels, dtype=np.uint8).reshape(buffer.shape))
+        del pixels
+        self.__pending.put(("frame", (buffer, layout)))
+
+        return True
+
+    def close(self):
+        self.end_episode()
+        self.__pending.put(("stop", None))
+        self.__thread.join()
+
+        if self.__error is not None:
+            raise self.__error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __get_layout(self, surface):
+        # width, height, bytes per pixel and the offsets of the red, green and blue bytes of a pixel
+        bytes_per_pixel = surface.get_bytesize()
+        if bytes_per_pixel not in (3, 4):
+            raise ValueError("Only 24 and 32 bit surfaces can be captured.")
+
+        offsets = tuple(shift // 8 if sys.byteorder == "little" else bytes_per_pixel - 1 - shift // 8
+                        for shift in surface.get_shifts()[:3])
+        layout = (*surface.get_size(), bytes_per_pixel, offsets, surface.get_pitch())
+
+        if self.__layout is None:
+            self.__layout = layout
+            for _ in range(self.__pool_size):
+                self.__free.put(np.empty((layout[1], layout[4]), dtype=np.uint8))
+        elif layout != self.__layout:
+            raise ValueError("Captured surfaces should have the same size and pixel format.")
+
+        return layout
+
+    def __take_buffer(self):
+        try:
+            if not self.__block:
+                return self.__free.get_nowait()
+
+            # a failed encoder never returns the buffers, so waiting stops with its error
+            while True:
+                try:
+                    return self.__free.get(timeout=0.1)
+                except queue.Empty:
+                    if self.__error is not None:
+                        raise self.__error
+        except queue.Empty:
+            return None
+
+    def __run(self):
+        directory, frames, raw_file, size = None, 0, None, None
+
+        try:
+            while True:
+                command, value = self.__pending.get()
+
+                if command == "frame":
+                    buffer, layout = value
+                    rows = self.__convert(buffer, layout)
+                    self.__free.put(buffer)
+                    size = layout[:2]
+
+                    if self.__format == PNG:
+                        write_png(os.path.join(directory, f"frame-{frames:06d}.png"), rows, *size)
+                    else:
+                        raw_file.write(rows)
+                    frames += 1
+                    CAPTURED_FRAMES.inc()
+                elif command == "start":
+                    directory, frames, size = os.path.join(self.__directory, value), 0, None
+                    os.makedirs(directory, exist_ok=True)
+                    if self.__format == RAW:
+                        raw_file = open(os.path.join(directory, RAW_FILE_NAME), "wb")
+                elif command == "end":
+                    if raw_file is not None:
+                        raw_file.close()
+                        raw_file = None
+                        self.__write_raw_index(directory, frames, size)
+                else:
+                    break
+        except Exception as error:
+            self.__error = error
+        finally:
+            if raw_file is not None:
+                raw_file.close()
+
+    def __convert(self, buffer, layout):
+        # copies the channels one by one into rows of RGB pixels, PNG rows start with a filter byte
+        width, height, bytes_per_pixel, offsets, _ = layout
+        if self.__rows is None:
+            self.__rows = np.zeros((height, 3 * width + (self.__format == PNG)), dtype=np.uint8)
+
+        pixels = buffer[:, :width * bytes_per_pixel].reshape(height, width, bytes_per_pixel)
+        rgb = self.__rows[:, -3 * width:].reshape(height, width, 3)
+        for channel, offset in enumerate(offsets):
+            rgb[:, :, channel] = pixels[:, :, offset]
+
+        return self.__rows
+
+    @staticmethod
+    def __write_raw_index(directory, frames, size):
+        # e.g. ffmpeg -f rawvideo -pixel_format rgb24 -video_size WIDTHxHEIGHT -i frames.rgb episode.mp4
+        width, height = size or (0, 0)
+        with open(os.path.join(directory, RAW_INDEX_FILE_NAME), "w") as file:
+            json.dump({"file": RAW_FILE_NAME, "pixel_format": "rgb24", "width": width, "height": height,
+                       "frames": frames}, file, indent=2)
@@ -0,0 +1,45 @@
+import timeit
+
+from Service import MapFactory, SpecialMap, LevelsProvider
+from Settings import SettingsProvider
+
+SETTINGS_FILE_PATH = "objects.yml"
+LEVELS_FILE_PATH = "levels.yml"
+REPEAT = 5
+NUMBER = 200
+
+
+def generate_level(settings_provider):
+    SpecialMap.register_settings_provider(settings_provider)
+    _map = SpecialMap.generate_map()
+    _objects = SpecialMap.create_objects({"rat": 20, "knight": 15, "bless": 5, "heal": 5, "anger": 3})
+
+    return _objects.get_objects(_map)
+
+
+def measure(function, connectivity_check):
+    MapFactory.CONNECTIVITY_CHECK = connectivity_check
+    timings = timeit.repeat(function, number=NUMBER, repeat=REPEAT)
+
+    return min(timings) / NUMBER * 1000
+
+
+def main():
+    settings_provider = SettingsProvider(SETTINGS_FILE_PATH)
+    cases = [
+        ("generate_map", MapFactory.generate_map),
+        ("generate_level", lambda: generate_level(settings_provider)),
+        ("load_levels", lambda: LevelsProvider(LEVELS_FILE_PATH, settings_provider))
+    ]
+
+    print(f"{'case':<16}{'no check, ms':>14}{'check, ms':>14}{'overhead':>10}")
+    for name, function in cases:
+        without_check = measure(function, False)
+        with_check = measure(function, True)
+        print(f"{name:<16}{without_check:>14.3f}{with_check:>14.3f}{with_check / without_check:>9.2f}x")
+
+    MapFactory.CONNECTIVITY_CHECK = True
+
+
+if __name__ == "__main__":
+    main()
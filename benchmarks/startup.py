@@ -0,0 +1,51 @@
+import os
+import statistics
+import subprocess
+import sys
+
+REPEAT = 5
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+FIRST_FRAME_SNIPPET = """
+import time
+start = time.perf_counter()
+from Main import KnightInTheDungeonGame
+with KnightInTheDungeonGame() as game:
+    game.run(max_frames=1)
+print(time.perf_counter() - start)
+"""
+
+
+def measure(snippet):
+    # every measurement runs in a fresh interpreter, so nothing is imported or cached beforehand
+    environment = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    timings = []
+
+    for _ in range(REPEAT):
+        output = subprocess.run([sys.executable, "-c", snippet], env=environment, check=True, capture_output=True,
+                                text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000)
+
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    cases = [
+        ("import Logic", IMPORT_SNIPPET.format(module="Logic")),
+        ("import Simulation", IMPORT_SNIPPET.format(module="Simulation")),
+        ("import Main", IMPORT_SNIPPET.format(module="Main")),
+        ("time to first frame", FIRST_FRAME_SNIPPET),
+    ]
+
+    print(f"{'case':<24}{'median, ms':>12}{'min, ms':>12}")
+    for name, snippet in cases:
+        median, minimum = measure(snippet)
+        print(f"{name:<24}{median:>12.1f}{minimum:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Any, List
+
+import numpy as np
+
+import EventHandlers
+from Event import Event
+from EventHandlers import EventHandler
+from Logic import GameEngine, Action
+from Objects import Ally, Enemy, Hero
+from Policies import RandomPolicy, ObservationBuilder
+from Service import MapFactory, SpecialMap, LevelsProvider
+from Settings import SettingsProvider, ObjectStatistic
+from Simulation import create_engine, create_hero, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+SEED = 12345
+DEFAULT_REPEAT = 7
+DEFAULT_TOLERANCE = 0.25
+EPISODE_STEPS = 300
+
+
+class Case:
+    # setup is not timed, run performs `number` operations with the state returned by setup
+    def __init__(self, name: str, setup: Callable[[], Any], run: Callable[[Any], None], number: int):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.number = number
+
+    def measure(self, repeat) -> dict:
+        timings = []
+
+        for _ in range(repeat):
+            random.seed(SEED)
+            np.random.seed(SEED)
+            state = self.setup()
+
+            start = time.perf_counter()
+            self.run(state)
+            timings.append((time.perf_counter() - start) / self.number * 1e6)
+
+        return {"min_us": min(timings), "median_us": statistics.median(timings)}
+
+
+def _settings_provider():
+    return SettingsProvider(SETTINGS_FILE_PATH)
+
+
+def _level_engine():
+    MapFactory.register_settings_provider(_settings_provider())
+    engine = GameEngine()
+    engine.load_map(MapFactory.generate_map())
+    engine.add_objects(SpecialMap.create_objects({"rat": 20, "knight": 15, "bless": 5}).get_objects(engine.map))
+    engine.hero = create_hero()
+
+    return engine
+
+
+def _run_moves(engine):
+    # a square walk, so the hero stays in the same area and bumps into walls and objects on the way
+    for i in range(400):
+        engine.move(Action.ALL[(i // 5) % 4])
+
+
+def _run_interact(engine):
+    for _ in range(1000):
+        engine.interact()
+
+
+def _objects_setup(count):
+    def setup():
+        settings_provider = _settings_provider()
+        SpecialMap.register_settings_provider(settings_provider)
+        _map = MapFactory.generate_map()
+
+        return [(SpecialMap.create_objects({"rat": count}), _map) for _ in range(10)]
+
+    return setup
+
+
+def _run_get_objects(levels):
+    for objects, _map in levels:
+        objects.get_objects(_map)
+
+
+def _handler_setup(event_name):
+    def setup():
+        settings_provider = _settings_provider()
+        engine = GameEngine()
+        hero = create_hero()
+        handler = EventHandler(engine, LevelsProvider(LEVELS_FILE_PATH, settings_provider))
+        handler.update(Event(EventHandlers.RELOAD_GAME_EVENT, Ally.InteractedWithHeroEventPayload(hero)))
+        hero.gold = 10 ** 9
+
+        if event_name == EventHandlers.ENEMY_INTERACTED_WITH_HERO_EVENT:
+            enemy = Enemy(None, ObjectStatistic(2, 2, 2, 1), 1, (2, 2))
+            payload = Enemy.InteractedWithHeroEventPayload(0, hero, enemy)
+        else:
+            payload = Ally.InteractedWithHeroEventPayload(hero)
+
+        return engine, hero, handler, Event(event_name, payload)
+
+    return setup
+
+
+def _run_handler(state):
+    engine, hero, handler, event = state
+
+    for _ in range(200):
+        handler.update(event)
+        # effects are stacked on every call, so the hero is restored to keep operations comparable
+        engine.hero = hero
+
+
+def _run_reload(state):
+    engine, hero, handler, event = state
+
+    for _ in range(5):
+        engine.level = 0
+        handler.update(event)
+
+
+def _level_up_setup():
+    heroes = [Hero(ObjectStatistic(20, 20, 5, 5), None) for _ in range(1000)]
+
+    for hero in heroes:
+        hero.exp = 1600
+
+    return heroes
+
+
+def _run_level_up(heroes):
+    for hero in heroes:
+        hero.level_up()
+
+
+def _run_episodes(settings_provider):
+    policy = RandomPolicy()
+    builder = ObservationBuilder()
+
+    for _ in range(5):
+        engine = create_engine(settings_provider)
+
+        for _ in range(EPISODE_STEPS):
+            if not engine.game_process:
+                break
+            engine.move(int(policy.act(builder.observe([engine]))[0]))
+
+
+def create_cases() -> List[Case]:
+    cases = [
+        Case("engine.move", _level_engine, _run_moves, 400),
+        Case("engine.interact", _level_engine, _run_interact, 1000),
+        Case("map_factory.generate_map", lambda: None, lambda _: [MapFactory.generate_map() for _ in range(50)], 50),
+    ]
+
+    for count in (10, 100, 400):
+        cases.append(Case(f"special_map.get_objects[{count}]", _objects_setup(count), _run_get_objects, 10))
+
+    for event_name in (EventHandlers.RESTORE_HP_EVENT, EventHandlers.APPLY_BLESSING_EVENT,
+                       EventHandlers.REMOVE_EFFECT_EVENT, EventHandlers.ADD_GOLD_EVENT,
+                       EventHandlers.MAKE_ME_ANGRY_EVENT, EventHandlers.ENEMY_INTERACTED_WITH_HERO_EVENT):
+        cases.append(Case(f"event_handler.update[{event_name}]", _handler_setup(event_name), _run_handler, 200))
+
+    cases.append(Case(f"event_handler.update[{EventHandlers.RELOAD_GAME_EVENT}]",
+                      _handler_setup(EventHandlers.RELOAD_GAME_EVENT), _run_reload, 5))
+    cases.append(Case("hero.level_up", _level_up_setup, _run_level_up, 1000))
+    cases.append(Case("headless_episode", _settings_provider, _run_episodes, 5))
+
+    return cases
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline["cases"]:
+            continue
+
+        expected = baseline["cases"][name]["median_us"]
+        if result["median_us"] > expected * (1 + tolerance):
+            regressions.append(f"{name}: {result['median_us']:.2f} us, baseline {expected:.2f} us "
+                               f"(+{(result['median_us'] / expected - 1) * 100:.0f}%)")
+
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the simulation hot paths.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="measurements per case")
+    parser.add_argument("--filter", default="", help="run only cases which contain this substring")
+    parser.add_argument("--save", help="write results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="compare results with the JSON baseline from this path")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown of the median before a case is reported as a regression")
+
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    results = dict()
+
+    print(f"{'case':<48}{'median, us':>14}{'min, us':>14}{'ops/s':>14}")
+    for case in create_cases():
+        if arguments.filter not in case.name:
+            continue
+
+        result = case.measure(arguments.repeat)
+        results[case.name] = result
+        print(f"{case.name:<48}{result['median_us']:>14.2f}{result['min_us']:>14.2f}"
+              f"{1e6 / result['median_us']:>14.1f}")
+
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "cases": results},
+                      file, indent=2, sort_keys=True)
+
+    if arguments.compare:
+        with open(arguments.compare, "r") as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+
+import pygame
+import pytest
+
+from Assets import SpriteDiskCache
+
+
+@pytest.fixture(scope="module")
+def display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.quit()
+
+
+class TestSpriteDiskCache:
+
+    def test_stored_sprite_is_loaded_back(self, display, tmp_path):
+        texture, sprite = self.__create_texture(tmp_path)
+        SpriteDiskCache(str(tmp_path / "cache")).store(texture, 4, 3, sprite)
+
+        loaded = SpriteDiskCache(str(tmp_path / "cache")).load(texture, 4, 3)
+
+        assert loaded is not None and loaded.get_size() == (4, 3)
+        assert pygame.image.tobytes(loaded, "RGB") == pygame.image.tobytes(sprite, "RGB")
+        assert SpriteDiskCache(str(tmp_path / "cache")).load(texture, 8, 6) is None, "Other sizes are not cached"
+
+    def test_changed_texture_is_a_miss_and_replaces_stale_file(self, display, tmp_path):
+        texture, sprite = self.__create_texture(tmp_path)
+        cache = SpriteDiskCache(str(tmp_path / "cache"))
+        cache.store(texture, 4, 3, sprite)
+
+        stat = os.stat(texture)
+        os.utime(texture, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        assert cache.load(texture, 4, 3) is None
+        cache.store(texture, 4, 3, sprite)
+        assert len(os.listdir(tmp_path / "cache")) == 1, "The sprite of the old texture should be deleted"
+
+    def test_wrong_size_file_is_rejected(self, display, tmp_path):
+        texture, sprite = self.__create_texture(tmp_path)
+        cache = SpriteDiskCache(str(tmp_path / "cache"))
+        cache.store(texture, 4, 3, sprite)
+        (cache_file,) = os.listdir(tmp_path / "cache")
+        with open(tmp_path / "cache" / cache_file, "r+b") as file:
+            file.truncate(10)
+
+        assert cache.load(texture, 4, 3) is None
+
+    def test_least_recently_used_files_are_deleted(self, display, tmp_path):
+        texture, sprite = self.__create_texture(tmp_path)
+        cache = SpriteDiskCache(str(tmp_path / "cache"), max_bytes=88)
+
+        for size in (2, 3, 4):
+            cache.store(texture, size, size, pygame.transform.scale(sprite, (size, size)))
+        cache.load(texture, 2, 2)
+        cache.store(texture, 1, 1, pygame.transform.scale(sprite, (1, 1)))
+
+        assert cache.load(texture, 3, 3) is None
+        assert cache.load(texture, 2, 2) is not None and cache.load(texture, 4, 4) is not None
+
+    @staticmethod
+    def __create_texture(tmp_path):
+        sprite = pygame.Surface((4, 3))
+        sprite.fill((200, 10, 40))
+        sprite.set_at((1, 2), (0, 255, 0))
+        texture = str(tmp_path / "texture.png")
+        pygame.image.save(sprite, texture)
+
+        return texture, sprite
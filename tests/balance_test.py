@@ -0,0 +1,33 @@
+import numpy as np
+
+from Balance import BalanceSimulator, BalanceReport, simulate
+
+
+class TestBalance:
+
+    def test_same_seeds_give_same_report(self):
+        first = BalanceSimulator(policy="greedy", max_steps=300).run(range(4))
+        second = BalanceSimulator(policy="greedy", max_steps=300).run(range(4))
+
+        assert self.__equal(first, second), "Seeded games should be reproducible"
+
+    def test_every_game_ends_once(self):
+        report = BalanceSimulator(policy="greedy", max_steps=300).run(range(6))
+
+        assert report.games == 6
+        assert report.cleared + report.timeouts + report.deaths.sum() == report.games
+        assert report.entered[0] == report.games, "Every game starts on the first floor"
+        assert np.all(np.diff(report.entered) <= 0), "A floor cannot be entered more often than the previous one"
+
+    def test_streamed_reports_are_merged(self):
+        reports = [report.games for report in simulate(10, workers=0, chunk_size=4, max_steps=100)]
+        whole = BalanceSimulator(max_steps=100).run(range(10))
+        last = list(simulate(10, workers=0, chunk_size=4, max_steps=100))[-1]
+
+        assert reports == [4, 8, 10]
+        assert self.__equal(last, whole), "Merged chunks should equal one report of all games"
+
+    @staticmethod
+    def __equal(first: BalanceReport, second: BalanceReport):
+        return (first.games, first.steps) == (second.games, second.steps) and \
+            all(np.array_equal(getattr(first, name), getattr(second, name)) for name in BalanceReport.ARRAYS)
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+from Dataset import TrajectoryWriter, TrajectoryDataset
+
+
+class TestDataset:
+    def test_written_transitions_are_read_back(self, tmp_path):
+        with TrajectoryWriter(str(tmp_path), observation_size=3, shard_size=8, chunk_size=4) as writer:
+            for i in range(19):
+                writer.append([i, i + 1, i + 2], i % 4, -0.02 * i, i % 5 == 4)
+
+        dataset = TrajectoryDataset(str(tmp_path))
+
+        assert len(dataset) == 19, "All appended transitions should be in the dataset"
+        for i in (0, 7, 8, 18, -1):
+            observation, action, reward, done = dataset[i]
+            i %= 19
+            assert list(observation) == [i, i + 1, i + 2], f"Observation of transition {i} is corrupted"
+            assert action == i % 4
+            assert np.isclose(reward, -0.02 * i)
+            assert done == (i % 5 == 4)
+
+    def test_sample_returns_batches(self, tmp_path):
+        with TrajectoryWriter(str(tmp_path), observation_size=2, shard_size=4, chunk_size=2) as writer:
+            for i in range(10):
+                writer.append([i, i], 1, 0., False)
+
+        observations, actions, rewards, dones = TrajectoryDataset(str(tmp_path)).sample(6, np.random.default_rng(0))
+
+        assert observations.shape == (6, 2)
+        assert actions.shape == rewards.shape == dones.shape == (6,)
+        assert (observations[:, 0] == observations[:, 1]).all()
+
+    def test_failed_writer_thread_stops_appends(self, tmp_path):
+        directory = tmp_path / "dataset"
+        writer = TrajectoryWriter(str(directory), observation_size=1, shard_size=2, chunk_size=2, max_pending_chunks=1)
+        # shards can not be created in place of a file, so the writer thread fails on the first chunk
+        directory.rmdir()
+        directory.write_bytes(b"")
+        errors = []
+
+        def append():
+            try:
+                for i in range(100):
+                    writer.append([i], 0, 0., False)
+                writer.close()
+            except OSError as error:
+                errors.append(error)
+
+        appending = threading.Thread(target=append, daemon=True)
+        appending.start()
+        appending.join(5)
+
+        assert not appending.is_alive(), "Appending should not wait for the failed thread"
+        assert len(errors) == 1
+        with pytest.raises(OSError):
+            for i in range(2):
+                writer.append([i], 0, 0., False)
+
+    def test_append_after_close_fails(self, tmp_path):
+        writer = TrajectoryWriter(str(tmp_path), observation_size=1, shard_size=2, chunk_size=2)
+        writer.close()
+
+        with pytest.raises(ValueError):
+            for i in range(2):
+                writer.append([i], 0, 0., False)
+        writer.close()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from DistanceFields import DistanceFields, DistanceField, STAIRS, CHEST, ENEMY, UNREACHABLE
+from EventHandlers import RELOAD_GAME_EVENT, ADD_GOLD_EVENT
+from Logic import GameEngine
+from Objects import Ally, Enemy
+from Service import MapFactory
+from Settings import ObjectStatistic
+
+
+class TestDistanceFields:
+    __grid = [
+        "#########",
+        "#       #",
+        "# ##### #",
+        "#     # #",
+        "##### # #",
+        "#   # # #",
+        "#########",
+    ]
+
+    def test_distances_to_stairs(self):
+        engine, _ = self.__create_engine()
+        fields = DistanceFields(engine)
+
+        assert fields.distance(STAIRS, (1, 3)) == 0, "Distance from the stairs to itself should be zero"
+        assert fields.distance(STAIRS, (1, 1)) == 2
+        assert fields.distance(STAIRS, (7, 5)) == 12
+        assert fields.distance(STAIRS, (1, 5)) == UNREACHABLE, "Isolated cells should be unreachable"
+        assert fields.distance(STAIRS, (0, 0)) == UNREACHABLE, "Walls should be unreachable"
+
+    def test_nearest_of_multiple_sources(self):
+        engine, _ = self.__create_engine()
+        fields = DistanceFields(engine)
+
+        assert fields.distance(CHEST, (4, 1)) == 1
+        assert fields.distance(CHEST, (7, 1)) == 0
+
+    def test_deleted_object_updates_field_incrementally(self):
+        engine, objects = self.__create_engine()
+        fields = DistanceFields(engine)
+        field = fields.field(CHEST)
+
+        engine.delete_object(objects["near_chest"])
+
+        assert fields.field(CHEST) is field, "Field should be updated instead of being recreated"
+        assert fields.distance(CHEST, (1, 1)) == 6
+        expected = DistanceField(fields.floor, [objects["far_chest"]]).distances
+        assert np.array_equal(field.distances, expected), "Incremental update differs from full recalculation"
+
+        engine.delete_object(objects["far_chest"])
+        assert (field.distances == UNREACHABLE).all(), "Field without sources should be unreachable everywhere"
+
+    def test_fields_are_recalculated_for_new_level(self):
+        engine, objects = self.__create_engine()
+        fields = DistanceFields(engine)
+
+        assert fields.distance(ENEMY, (3, 5)) == 0
+
+        engine.delete_objects()
+        engine.load_map(self.__create_map())
+        engine.add_object(Enemy(None, ObjectStatistic(1, 1, 1, 1), 1, (7, 3)))
+
+        assert fields.distance(ENEMY, (7, 1)) == 2
+
+    def __create_engine(self):
+        engine = GameEngine()
+        engine.load_map(self.__create_map())
+        objects = {
+            "stairs": Ally(None, RELOAD_GAME_EVENT, (1, 3)),
+            "near_chest": Ally(None, ADD_GOLD_EVENT, (3, 1)),
+            "far_chest": Ally(None, ADD_GOLD_EVENT, (7, 1)),
+            "enemy": Enemy(None, ObjectStatistic(1, 1, 1, 1), 1, (3, 5)),
+        }
+        engine.add_objects(objects.values())
+
+        return engine, objects
+
+    def __create_map(self):
+        return [[MapFactory.TILES[0 if char == "#" else 1] for char in row] for row in self.__grid]
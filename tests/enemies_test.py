@@ -0,0 +1,64 @@
+from Enemies import EnemyMovement
+from EventHandlers import EventHandler
+from Logic import GameEngine, Action
+from Objects import Ally, Enemy
+from Service import MapFactory
+from Settings import ObjectStatistic
+from Simulation import create_hero
+
+
+class TestEnemyMovement:
+    __grid = [
+        "###########",
+        "#         #",
+        "#  ## ##  #",
+        "#         #",
+        "#  ## ##  #",
+        "#         #",
+        "###########",
+    ]
+
+    def test_enemies_are_views_of_store(self):
+        engine, enemies, movement = self.__create_engine([(9, 5), (5, 1)])
+        store = movement.store
+
+        enemies[0].hp = 3
+        store.positions[1] = (6, 1)
+
+        assert store.hp[0] == 3, "Writing into the view should change the store"
+        assert enemies[1].position == (6, 1), "Reading the view should read the store"
+        assert enemies[0].strength == 4 and enemies[0].xp == 10
+
+    def test_enemies_never_enter_walls_or_objects(self):
+        engine, enemies, movement = self.__create_engine([(3, 1), (8, 3), (2, 5)], aggro_radius=0)
+        engine.add_object(Ally(None, "nothing", (4, 1)))
+        walls = {(x, y) for y, row in enumerate(self.__grid) for x, char in enumerate(row) if char == "#"}
+
+        for _ in range(200):
+            movement.tick([(1, 1)])
+            positions = [enemy.position for enemy in enemies]
+
+            assert not walls & set(positions)
+            assert (4, 1) not in positions
+            assert len(set(positions)) == len(positions), "Enemies should not share a cell"
+
+    def test_enemy_chases_and_attacks_hero(self):
+        engine, enemies, movement = self.__create_engine([(4, 3)])
+
+        # the hero walks into the wall, so only the enemy moves
+        for _ in range(8):
+            engine.move(Action.UP)
+
+        assert enemies[0] not in engine.get_objects(), "The enemy should reach the hero and fight"
+        assert engine.hero.exp == 10
+        assert engine.hero.position == [1, 1]
+
+    def __create_engine(self, positions, aggro_radius=5):
+        engine = GameEngine()
+        engine.hero = create_hero()
+        EventHandler(engine, None)
+        engine.load_map([[MapFactory.TILES[0 if char == "#" else 1] for char in row] for row in self.__grid])
+        enemies = [Enemy(None, ObjectStatistic(4, 1, 1, 1), 10, position) for position in positions]
+        engine.add_objects(enemies)
+
+        return engine, enemies, EnemyMovement(engine, aggro_radius=aggro_radius, seed=0)
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+from EventLog import EventLogWriter, EventRecorder, read_events
+from Logic import Action
+from Objects import Enemy
+from Replay import seed_everything
+from Settings import SettingsProvider, ObjectStatistic
+from Simulation import create_engine, SETTINGS_FILE_PATH
+
+
+class TestEventLog:
+
+    def test_records_are_read_back_from_rotated_files(self, tmp_path):
+        with EventLogWriter(str(tmp_path), max_file_bytes=16384, compress_level=0) as writer:
+            for i in range(5000):
+                writer.write({"tick": i, "event": "add_gold", "gold": i * 10})
+
+        assert len(os.listdir(tmp_path)) > 1, "Files should be rotated by size"
+        assert [record["tick"] for record in read_events(str(tmp_path))] == list(range(5000))
+
+    def test_full_queue_drops_records(self, tmp_path):
+        writer = EventLogWriter(str(tmp_path), max_pending=1)
+        for i in range(2000):
+            writer.write({"tick": i})
+        writer.close()
+
+        written = list(read_events(str(tmp_path)))
+        assert len(written) + writer.dropped == 2000
+        assert [record["tick"] for record in written] == sorted(record["tick"] for record in written)
+
+    def test_close_after_failed_writer_thread(self, tmp_path):
+        directory = tmp_path / "events"
+        writer = EventLogWriter(str(directory), max_pending=1)
+        # files can not be created in place of a file, so the writer thread fails on the first record
+        directory.rmdir()
+        directory.write_bytes(b"")
+        writer.write({"tick": 0})
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            writer.write({"tick": 1})
+        errors = []
+
+        def close():
+            try:
+                writer.close()
+            except OSError as error:
+                errors.append(error)
+
+        closing = threading.Thread(target=close, daemon=True)
+        closing.start()
+        closing.join(5)
+
+        assert not closing.is_alive(), "Closing should not wait for the failed thread"
+        assert len(errors) == 1
+
+    def test_fight_is_recorded_with_its_results(self, tmp_path):
+        seed_everything(4)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        x, y = engine.hero.position
+        engine.add_object(Enemy(None, ObjectStatistic(2, 2, 2, 2), 10, (x + 1, y)))
+        hp, exp = engine.hero.hp, engine.hero.exp
+
+        with EventLogWriter(str(tmp_path)) as writer:
+            EventRecorder(engine, writer, game=3)
+            engine.move(Action.RIGHT)
+
+        (record,) = read_events(str(tmp_path))
+        assert record["event"] == "enemy_interacted_with_hero"
+        assert record["game"] == 3 and record["tick"] == 1 and record["level"] == engine.level
+        assert record["hp"] == engine.hero.hp - hp == -record["damage"]
+        assert record["xp"] == engine.hero.exp - exp
+        assert record["hero"]["hp"] == engine.hero.hp and record["messages"]
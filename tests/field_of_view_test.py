@@ -0,0 +1,59 @@
+import numpy as np
+
+from FieldOfView import FieldOfView, shadowcast
+from Logic import GameEngine, Action
+from Service import MapFactory, Connectivity
+from Simulation import create_hero
+
+
+class TestFieldOfView:
+    __grid = [
+        "###########",
+        "#    #    #",
+        "#    #    #",
+        "#         #",
+        "#    #    #",
+        "###########",
+    ]
+
+    def test_walls_block_the_view(self):
+        engine, field_of_view = self.__create_engine()
+        visible = field_of_view.visible
+
+        assert visible[1, 1] and visible[4, 4], "Cells of the same room should be visible"
+        assert visible[1, 5], "The wall which blocks the view should be visible"
+        assert not visible[1, 7] and not visible[2, 9], "Cells behind the wall should not be visible"
+
+    def test_explored_cells_are_kept(self):
+        engine, field_of_view = self.__create_engine()
+
+        for action in [Action.DOWN, Action.DOWN] + [Action.RIGHT] * 6:
+            engine.move(action)
+        for _ in range(6):
+            engine.move(Action.LEFT)
+
+        assert field_of_view.explored[1, 8] and not field_of_view.visible[1, 8]
+        assert field_of_view.visible.sum() == \
+            len(shadowcast(Connectivity.wall_mask(engine.map), engine.hero.position, field_of_view.radius))
+
+    def test_views_are_cached_per_level(self):
+        engine, field_of_view = self.__create_engine()
+        other = FieldOfView(engine)
+        visible = field_of_view.visible.copy()
+
+        engine.move(Action.RIGHT)
+        engine.move(Action.LEFT)
+
+        assert np.array_equal(field_of_view.visible, visible)
+        assert np.array_equal(other.visible, visible)
+        assert field_of_view.observation_mask().shape == (2 * field_of_view.radius + 1,) * 2
+
+        engine.load_map(engine.map)
+        assert field_of_view.explored.sum() == visible.sum(), "A loaded level should start unexplored"
+
+    def __create_engine(self):
+        engine = GameEngine()
+        engine.hero = create_hero()
+        engine.load_map([[MapFactory.TILES[0 if char == "#" else 1] for char in row] for row in self.__grid])
+
+        return engine, FieldOfView(engine)
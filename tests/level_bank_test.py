@@ -0,0 +1,37 @@
+import numpy as np
+
+from DistanceFields import object_kind, STAIRS
+from Images import SpecialFixtures
+from LevelBank import build, LevelBank
+from Replay import seed_everything
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH
+
+
+class TestLevelBank:
+
+    def test_bank_does_not_depend_on_workers(self, tmp_path):
+        inline = build(str(tmp_path / "inline.bank"), records_per_entry=6, workers=0, chunk_size=4)
+        pooled = build(str(tmp_path / "pooled.bank"), records_per_entry=6, workers=2, chunk_size=4)
+
+        for entry in range(inline.entries):
+            assert np.array_equal(inline.records(entry), pooled.records(entry))
+        assert not np.array_equal(inline.records(2)["tiles"][0], inline.records(2)["tiles"][1]), \
+            "Records should be different levels"
+
+    def test_engine_plays_levels_of_bank(self, tmp_path):
+        bank = build(str(tmp_path / "levels.bank"), records_per_entry=4, workers=0)
+        bank = LevelBank(bank.path)
+        seed_everything(3)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH), level_bank=bank)
+        stairs = next(obj for obj in engine.get_objects() if object_kind(obj) == STAIRS)
+
+        engine.hero.position = [stairs.position[0] - 1, stairs.position[1]]
+        engine.move_right()
+
+        assert engine.level == 1
+        tiles = np.array([[SpecialFixtures.ALL.index(cell) for cell in row] for row in engine.map])
+        assert any(np.array_equal(tiles, record) for record in bank.records(1)["tiles"])
+        assert sorted(map(object_kind, engine.get_objects())) in \
+            [sorted(map(object_kind, bank.level_objects(1, index))) for index in range(4)]
+
@@ -0,0 +1,94 @@
+import os
+
+import pygame
+import pytest
+
+import Main
+from Main import KnightInTheDungeonGame
+from Policies import RandomPolicy
+from Replay import seed_everything
+from ScreenEngine import InfoWindow
+from VideoCapture import FrameCapture
+
+
+@pytest.fixture
+def game_class(tmp_path, monkeypatch):
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+    monkeypatch.setattr(KnightInTheDungeonGame, "ASSET_CACHE_DIRECTORY", str(tmp_path / "sprites"))
+    monkeypatch.setattr(KnightInTheDungeonGame, "KEYBOARD_CONTROL", False)
+    seed_everything(3)
+
+    return KnightInTheDungeonGame
+
+
+class NotifyingPolicy(RandomPolicy):
+    # random moves, every step is announced to the info window through the engine
+    def __init__(self):
+        super().__init__(0)
+        self.info_window = None
+        self.steps = 0
+
+    def act(self, observations):
+        self.steps += 1
+        self.info_window.engine.notify(f"step {self.steps}")
+
+        return super().act(observations)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    policy = NotifyingPolicy()
+    original_create_drawer = Main.create_drawer
+
+    def create_drawer(sprite_size):
+        drawer, profiler_overlay = original_create_drawer(sprite_size)
+        handle = drawer
+        while not isinstance(handle, InfoWindow):
+            handle = handle.successor
+        policy.info_window = handle
+
+        return drawer, profiler_overlay
+
+    monkeypatch.setattr(Main, "create_drawer", create_drawer)
+
+    return policy
+
+
+@pytest.fixture
+def drawn_frames(monkeypatch):
+    frames = []
+    monkeypatch.setattr(pygame.display, "update", lambda *args: frames.append(args))
+
+    return frames
+
+
+class TestKnightInTheDungeonGame:
+
+    def test_frame_skip_steps_between_drawn_frames(self, game_class, policy, drawn_frames):
+        with game_class(policy, frame_skip=3) as game:
+            game.run(max_frames=4)
+
+        # the action of the next step is asked for right after a move
+        assert len(drawn_frames) == 4 and policy.steps == 4 * 3 + 1
+        assert list(policy.info_window.data) == [f"> step {step}" for step in range(1, policy.steps + 1)], \
+            "The info window should get the messages of the steps which were not drawn"
+
+    def test_render_fps_steps_until_the_next_frame(self, game_class, policy, drawn_frames):
+        with game_class(policy, render_fps=20) as game:
+            game.run(max_frames=3)
+
+        assert len(drawn_frames) == 3 and policy.steps > 3 + 1
+
+    def test_frame_skip_below_one_is_rejected(self):
+        with pytest.raises(ValueError):
+            KnightInTheDungeonGame(frame_skip=0)
+
+    @pytest.mark.parametrize("captured", [False, True])
+    def test_threaded_autoplay_is_drawn(self, game_class, tmp_path, captured):
+        capture = FrameCapture(str(tmp_path / "frames"), block=True) if captured else None
+
+        with game_class(RandomPolicy(0), tick_rate=0, capture=capture) as game:
+            game.run(max_frames=5)
+
+        if captured:
+            assert os.listdir(tmp_path / "frames" / "game-00000"), "The drawn frames should be captured"
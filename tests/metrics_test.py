@@ -0,0 +1,39 @@
+import json
+
+from Metrics import MetricsRegistry, MetricsExporter
+
+
+class TestMetrics:
+    def test_labeled_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "Events.", "event")
+        counter.inc("add_gold")
+        counter.inc("add_gold")
+        counter.inc("restore_hp", 3)
+
+        assert counter.value("add_gold") == 2
+        assert counter.value("restore_hp") == 3
+        assert counter.value("missing") == 0
+        assert 'events_total{event="add_gold"} 2' in registry.to_prometheus()
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("objects", "Objects.", (10, 1, 5))
+
+        for value in (0, 3, 5, 7, 100):
+            histogram.observe(value)
+
+        assert histogram.cumulative_counts() == [1, 3, 4, 5], "Buckets should be sorted and cumulative"
+        assert histogram.sum == 115
+        text = registry.to_prometheus()
+        assert 'objects_bucket{le="+Inf"} 5' in text
+        assert "objects_count 5" in text
+
+    def test_exporter_writes_json(self, tmp_path):
+        registry = MetricsRegistry()
+        registry.counter("steps_total", "Steps.").inc(amount=7)
+        path = tmp_path / "metrics.json"
+
+        MetricsExporter(registry, str(path), output_format=MetricsExporter.JSON).dump()
+
+        assert json.loads(path.read_text()) == {"steps_total": 7}
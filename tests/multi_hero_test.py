@@ -0,0 +1,84 @@
+import pytest
+
+from DistanceFields import object_kind, STAIRS
+from EventHandlers import ADD_GOLD_EVENT
+from Images import FixtureType
+from Logic import Action
+from Objects import Ally
+from Replay import seed_everything
+from Settings import SettingsProvider
+from Simulation import create_multi_hero_engine, SETTINGS_FILE_PATH
+
+
+class TestMultiHeroEngine:
+
+    def test_heroes_share_level_but_not_stats(self):
+        multi_hero_engine = self.__create(3)
+        first, second, third = multi_hero_engine.engines
+
+        assert first.map is second.map is third.map, "The level should be generated once"
+        assert first.get_objects() is third.get_objects()
+        assert first.hero is not second.hero and first.hero.stats is not second.hero.stats
+
+    def test_object_is_used_by_first_hero_only(self):
+        multi_hero_engine = self.__create(2)
+        stairs = self.__find(multi_hero_engine, STAIRS)
+        chest = Ally(None, ADD_GOLD_EVENT, (stairs.position[0], stairs.position[1]))
+        multi_hero_engine.engines[1].add_object(chest)
+        multi_hero_engine.engines[1].delete_object(stairs)
+        action = self.__step_onto(multi_hero_engine, chest, [0, 1])
+
+        rewards, dones = multi_hero_engine.step([action, action])
+
+        assert chest not in multi_hero_engine.engines[0].get_objects()
+        assert rewards[1] == pytest.approx(-0.02), "The second hero should find nothing"
+        assert rewards[0] != rewards[1]
+
+    def test_next_level_is_loaded_when_all_heroes_descended(self):
+        multi_hero_engine = self.__create(2)
+        stairs = self.__find(multi_hero_engine, STAIRS)
+        action = self.__step_onto(multi_hero_engine, stairs, [0])
+
+        multi_hero_engine.step([action, Action.LEFT])
+
+        assert multi_hero_engine.level == 0, "The second hero is still on the level"
+        assert list(multi_hero_engine.active) == [False, True]
+        assert stairs in multi_hero_engine.engines[1].get_objects(), "The stairs should stay for the other heroes"
+
+        action = self.__step_onto(multi_hero_engine, stairs, [1])
+        multi_hero_engine.step([Action.LEFT, action])
+
+        assert multi_hero_engine.level == 1
+        assert all(engine.level == 1 and engine.hero.position == [1, 1] for engine in multi_hero_engine.engines)
+
+    def test_heroes_descend_on_the_same_tick(self):
+        multi_hero_engine = self.__create(3)
+        stairs = self.__find(multi_hero_engine, STAIRS)
+        action = self.__step_onto(multi_hero_engine, stairs, [0, 1])
+
+        multi_hero_engine.step([action, action, Action.LEFT])
+
+        assert list(multi_hero_engine.active) == [False, False, True], "Both heroes should take the stairs"
+        assert stairs in multi_hero_engine.engines[2].get_objects()
+
+    @staticmethod
+    def __create(heroes_count):
+        seed_everything(2021)
+
+        return create_multi_hero_engine(SettingsProvider(SETTINGS_FILE_PATH), heroes_count, "levels.yml")
+
+    @staticmethod
+    def __find(multi_hero_engine, kind):
+        return next(obj for obj in multi_hero_engine.engines[0].get_objects() if object_kind(obj) == kind)
+
+    @staticmethod
+    def __step_onto(multi_hero_engine, obj, indexes):
+        x, y = obj.position
+        game_map = multi_hero_engine.engines[0].map
+
+        for action, (dx, dy) in zip(Action.ALL, Action.SHIFTS):
+            if game_map[y - dy][x - dx].fixture_type != FixtureType.WALL:
+                for index in indexes:
+                    multi_hero_engine.engines[index].hero.position = [x - dx, y - dy]
+
+                return action
@@ -1,5 +1,8 @@
-from Objects import Hero, Berserk, Blessing, Weakness, Anger
-from Settings import ObjectStatistic
+from Event import Event
+from EventHandlers import RELOAD_GAME_EVENT
+from Objects import Hero, Berserk, Blessing, Weakness, Anger, Enemy, Ally, ObjectPool
+from Settings import ObjectStatistic, SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH
 
 
 class TestObjects:
@@ -164,3 +167,31 @@ class TestObjects:
         assert hero.next_level_exp == desired_properties[
             'next_level_exp'], "Next level experience value of hero object is different from expected one"
         assert hero.gold == desired_properties['gold'], "Gold value of hero object is different from expected one"
+
+
+class TestObjectPool:
+
+    def test_released_objects_are_initialized_again(self):
+        pool = ObjectPool(Enemy)
+        enemy = pool.acquire("rat", ObjectStatistic(4, 1, 1, 1), 10, (3, 3))
+        enemy.hp = 1
+        enemy.bind(object(), 0)
+
+        pool.release([enemy, enemy, Ally("chest", "add_gold", (1, 2))])
+        reused = pool.acquire("knight", ObjectStatistic(8, 2, 1, 1), 20, (5, 5))
+
+        assert reused is enemy and len(pool) == 0, "An object released twice should be handed out once"
+        assert reused._store is None and reused.position == (5, 5)
+        assert reused.hp == reused.max_hp and reused.xp == 20 and reused.fixture == "knight"
+
+    def test_reloaded_levels_reuse_objects_and_fixtures(self):
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        for _ in range(2):
+            engine.notify(Event(RELOAD_GAME_EVENT, Ally.InteractedWithHeroEventPayload(engine.hero)))
+        previous = {id(obj) for obj in engine.get_objects()}
+
+        engine.notify(Event(RELOAD_GAME_EVENT, Ally.InteractedWithHeroEventPayload(engine.hero)))
+        objects = engine.get_objects()
+
+        assert previous & {id(obj) for obj in objects}, "Objects of the left level should be reused"
+        assert len({id(obj.fixture) for obj in objects}) == len({obj.fixture.path for obj in objects})
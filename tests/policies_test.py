@@ -0,0 +1,67 @@
+import gc
+import weakref
+
+import numpy as np
+
+from EventHandlers import RELOAD_GAME_EVENT
+from Logic import GameEngine, Action
+from Objects import Ally, Hero
+from Policies import ObservationBuilder, GreedyPolicy, ScriptedPolicy, STAIRS_DISTANCES, HERO_X, HERO_Y
+from Service import MapFactory
+from Settings import ObjectStatistic
+
+
+class TestPolicies:
+    __grid = [
+        "######",
+        "#    #",
+        "# ## #",
+        "#    #",
+        "######",
+    ]
+
+    def test_observation_contains_distances_from_neighbour_cells(self):
+        observations = ObservationBuilder().observe([self.__create_engine(), self.__create_engine()])
+
+        assert observations.shape[0] == 2, "Every engine should get its own observation row"
+        assert observations[0, HERO_X] == 1 and observations[0, HERO_Y] == 1
+        assert observations[0, STAIRS_DISTANCES][Action.RIGHT] == 2
+        assert observations[0, STAIRS_DISTANCES][Action.DOWN] == 4
+
+    def test_greedy_policy_walks_towards_stairs(self):
+        engine = self.__create_engine()
+        builder = ObservationBuilder()
+        policy = GreedyPolicy(epsilon=0.)
+
+        for _ in range(3):
+            engine.move(int(policy.act(builder.observe([engine]))[0]))
+
+        assert engine.hero.position == [4, 1], "Hero should reach the stairs in three steps"
+        assert not engine.get_objects(), "Stairs should be taken by the hero"
+
+    def test_scripted_policy_repeats_actions(self):
+        policy = ScriptedPolicy([Action.UP, Action.LEFT])
+        observations = np.zeros((3, 1))
+
+        assert list(policy.act(observations)) == [Action.UP] * 3
+        assert list(policy.act(observations)) == [Action.LEFT] * 3
+        assert list(policy.act(observations)) == [Action.UP] * 3
+
+    def test_builder_does_not_keep_engines_alive(self):
+        builder = ObservationBuilder()
+        engines = [self.__create_engine() for _ in range(3)]
+        builder.observe(engines)
+        references = [weakref.ref(engine) for engine in engines]
+
+        del engines
+        gc.collect()
+
+        assert all(reference() is None for reference in references), "Cached fields should not keep engines alive"
+
+    def __create_engine(self):
+        engine = GameEngine()
+        engine.load_map([[MapFactory.TILES[0 if char == "#" else 1] for char in row] for row in self.__grid])
+        engine.hero = Hero(ObjectStatistic(20, 20, 5, 5), None)
+        engine.add_object(Ally(None, RELOAD_GAME_EVENT, (4, 1)))
+
+        return engine
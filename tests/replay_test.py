@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from Replay import EpisodeRecorder, Recording, Replayer, ReplayMismatchError, ReplayFormatError, seed_everything
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH
+
+
+class TestReplay:
+    __seed = 2020
+
+    def test_replay_reproduces_recorded_episode(self, tmp_path):
+        path = tmp_path / "episode.kitdr"
+        engine = self.__record(str(path))
+
+        replayed = Replayer(Recording.load(str(path)), self.__settings_provider()).run()
+
+        assert replayed.score == engine.score, "Replayed score differs from the recorded one"
+        assert replayed.level == engine.level, "Replayed floor differs from the recorded one"
+        assert replayed.hero.position == engine.hero.position
+        assert replayed.hero.gold == engine.hero.gold
+
+    def test_recording_is_compact(self, tmp_path):
+        path = tmp_path / "episode.kitdr"
+        self.__record(str(path))
+        recording = Recording.load(str(path))
+
+        assert len(recording.actions) == 250, "Every move should be stored as one byte"
+        assert [checkpoint[0] for checkpoint in recording.checkpoints] == [50, 100, 150, 200, 250]
+
+    def test_changed_checkpoint_is_detected(self, tmp_path):
+        path = tmp_path / "episode.kitdr"
+        self.__record(str(path))
+        recording = Recording.load(str(path))
+        step, score, *stats = recording.checkpoints[1]
+        recording.checkpoints[1] = (step, score + 1, *stats)
+
+        with pytest.raises(ReplayMismatchError):
+            Replayer(recording, self.__settings_provider()).run()
+
+    def test_not_a_replay_file(self, tmp_path):
+        path = tmp_path / "episode.kitdr"
+        path.write_bytes(b"0" * 64)
+
+        with pytest.raises(ReplayFormatError):
+            Recording.load(str(path))
+
+    def __record(self, path):
+        seed_everything(self.__seed)
+        engine = create_engine(self.__settings_provider())
+        recorder = EpisodeRecorder(engine, self.__seed, checkpoint_interval=50)
+        actions = random.Random(1).choices(range(4), k=250)
+
+        for action in actions:
+            recorder.move(action)
+        recorder.save(path)
+
+        return engine
+
+    @staticmethod
+    def __settings_provider():
+        return SettingsProvider(SETTINGS_FILE_PATH)
@@ -0,0 +1,61 @@
+import pytest
+
+from Objects import Blessing, Weakness
+from Policies import GreedyPolicy, ObservationBuilder
+from Replay import seed_everything, take_checkpoint
+from SaveGame import dumps, loads, SaveFormatError, VERSION
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+
+
+class TestSaveGame:
+    def test_loaded_game_continues_like_the_saved_one(self):
+        settings_provider = SettingsProvider(SETTINGS_FILE_PATH)
+        seed_everything(7)
+        engine = create_engine(settings_provider, LEVELS_FILE_PATH)
+
+        policy, observation_builder = GreedyPolicy(seed=0), ObservationBuilder()
+        actions, expected = [], []
+
+        for step in range(400):
+            if step == 50:
+                data = dumps(engine)
+            action = int(policy.act(observation_builder.observe([engine]))[0])
+            engine.move(action)
+            if step >= 50:
+                actions.append(action)
+                expected.append(take_checkpoint(engine, 0))
+
+        # the random generators are restored too, so the loaded game plays the same levels and fights
+        loaded = loads(data, settings_provider)
+        actual = []
+        for action in actions:
+            loaded.move(action)
+            actual.append(take_checkpoint(loaded, 0))
+
+        assert actual == expected
+        assert loaded.level > 1
+        assert loaded.map == engine.map, "The levels generated after loading should be the same"
+
+    def test_effect_stack_is_restored(self):
+        settings_provider = SettingsProvider(SETTINGS_FILE_PATH)
+        engine = create_engine(settings_provider, LEVELS_FILE_PATH)
+        engine.hero = Weakness(Blessing(engine.hero))
+        engine.hero.strength += 3
+
+        hero = loads(dumps(engine), settings_provider).hero
+
+        assert type(hero) is Weakness and type(hero.base) is Blessing
+        assert hero.strength == engine.hero.strength
+        assert hero.base.strength == engine.hero.base.strength
+        assert hero.base.base.strength == engine.hero.base.base.strength
+
+    def test_other_versions_are_rejected(self):
+        settings_provider = SettingsProvider(SETTINGS_FILE_PATH)
+        data = bytearray(dumps(create_engine(settings_provider, LEVELS_FILE_PATH)))
+        data[8:10] = (VERSION + 1).to_bytes(2, "little")
+
+        with pytest.raises(SaveFormatError):
+            loads(bytes(data), settings_provider)
+        with pytest.raises(SaveFormatError):
+            loads(b"garbage", settings_provider)
@@ -0,0 +1,85 @@
+import collections
+import os
+from contextlib import nullcontext
+
+import pygame
+import pytest
+
+from ScreenEngine import create_drawer
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH
+
+
+@pytest.fixture(scope="module")
+def display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.font.init()
+    yield pygame.display.set_mode((800, 600))
+    pygame.quit()
+
+
+class CountingProfiler:
+    enabled = True
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def stage(self, name):
+        self.counts[name] += 1
+
+        return nullcontext()
+
+
+class TestCompositor:
+
+    def test_layers_are_rendered_only_when_dirty(self, display):
+        engine, drawer, profiler = self.__create()
+
+        drawer.draw(display)
+        drawer.draw(display)
+        engine.move_right()
+        drawer.draw(display)
+
+        assert self.__renders(profiler, "game_surface") == 2, "Unchanged map should not be rendered again"
+        assert self.__renders(profiler, "progress_bar") == 2
+        # the map, the mini map, the progress bar and the info window are composited on every frame
+        assert self.__renders(profiler, "compositing") == 4 * 3
+
+    def test_hidden_layers_are_skipped(self, display):
+        engine, drawer, profiler = self.__create()
+
+        drawer.draw(display)
+        assert self.__renders(profiler, "help_window") == 0
+        assert self.__renders(profiler, "game_over_window") == 0
+
+        engine.show_help = True
+        drawer.draw(display)
+        engine.game_process = False
+        drawer.draw(display)
+
+        assert self.__renders(profiler, "help_window") == 1, "Static layer should be rendered once"
+        assert self.__renders(profiler, "game_over_window") == 1
+
+    def test_layer_is_drawn_before_compositing(self, display):
+        engine, drawer, profiler = self.__create()
+        drawer.draw(display)
+        engine.game_process = False
+        drawer.draw(display)
+
+        # the game over layer is blended over the screen in the same frame its state changed
+        assert display.get_at((150 + 250, 140 + 2)) == pygame.Color(255, 0, 0)
+
+    @staticmethod
+    def __create():
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH), sprite_size=60)
+        drawer, _ = create_drawer(60)
+        profiler = CountingProfiler()
+        drawer.connect_engine(engine)
+        drawer.connect_profiler(profiler)
+
+        return engine, drawer, profiler
+
+    @staticmethod
+    def __renders(profiler, stage):
+        return profiler.counts[stage]
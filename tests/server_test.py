@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from Logic import Action
+from Server import GameServer
+from Settings import SettingsProvider
+from Simulation import SETTINGS_FILE_PATH
+
+
+class TestGameServer:
+
+    def test_moves_return_only_changed_state(self):
+        async def scenario(server):
+            opened = await server.handle({"op": "open"})
+            session = opened["session"]
+            moves = [await server.handle({"op": "move", "session": session, "action": action})
+                     for action in (Action.LEFT, Action.RIGHT)]
+
+            return opened, moves
+
+        opened, (into_wall, step) = self.__run(scenario)
+
+        assert opened["state"]["position"] == [1, 1]
+        assert set(into_wall["delta"]) == {"score"}, "Only the score should change after a move into the wall"
+        assert step["delta"]["position"] == [2, 1]
+
+    def test_sessions_over_tcp_and_eviction(self):
+        async def scenario(server):
+            tcp_server = await server.start(port=0)
+            reader, writer = await asyncio.open_connection(*tcp_server.sockets[0].getsockname()[:2])
+            responses = []
+
+            for request in ({"op": "open"}, {"op": "open"}, {"op": "move", "session": "missing", "action": 0}):
+                writer.write(json.dumps(request).encode() + b"\n")
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+
+            evicted = server.evict_idle(now=float("inf"))
+            return responses, evicted, len(server.sessions)
+
+        (first, second, missing), evicted, remaining = self.__run(scenario, max_sessions=1)
+
+        assert "session" in first
+        assert second == {"error": "Too many sessions."}
+        assert "error" in missing
+        assert evicted == 1 and remaining == 0
+
+    def test_fields_of_wrong_types_are_rejected(self):
+        async def scenario(server):
+            tcp_server = await server.start(port=0)
+            reader, writer = await asyncio.open_connection(*tcp_server.sockets[0].getsockname()[:2])
+            responses = []
+
+            async def send(request):
+                writer.write(json.dumps(request).encode() + b"\n")
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+
+            await send({"op": "open"})
+            session = responses[0]["session"]
+            for request in ({"op": "move", "session": ["x"], "action": 0}, {"op": "move", "session": {}},
+                            {"op": "move", "session": session, "action": 1.0},
+                            {"op": "move", "session": session, "action": True},
+                            {"op": "move", "session": session, "action": "1"},
+                            {"op": "move", "session": session, "action": Action.RIGHT}):
+                await send(request)
+            writer.close()
+
+            return responses[1:]
+
+        *rejected, accepted = self.__run(scenario)
+
+        assert all(set(response) == {"error"} for response in rejected)
+        assert accepted["delta"]["position"] == [2, 1], "The connection should keep working after the errors"
+
+    @staticmethod
+    def __run(scenario, **kwargs):
+        async def run():
+            server = GameServer(SettingsProvider(SETTINGS_FILE_PATH), **kwargs)
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+
+        return asyncio.run(run())
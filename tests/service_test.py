@@ -0,0 +1,54 @@
+import numpy as np
+
+from Images import FixtureType
+from Objects import Ally
+from Service import Connectivity, MapFactory, HERO_POSITION
+
+
+class TestConnectivity:
+    __grid = [
+        "#######",
+        "#  #  #",
+        "#  #  #",
+        "####  #",
+        "# #####",
+        "#######",
+    ]
+
+    def test_label_components_separates_regions(self):
+        labels = Connectivity.label_components(self.__floor())
+
+        assert labels[0, 0] == Connectivity.UNLABELED, "Walls should not be labeled"
+        assert labels[1, 1] == labels[2, 2], "Cells of the same region should share the label"
+        assert labels[1, 4] == labels[3, 5], "Cells of the same region should share the label"
+        assert len({labels[1, 1], labels[1, 4], labels[4, 1]}) == 3, "Separate regions should get different labels"
+
+    def test_reachable_mask_contains_only_component_of_start(self):
+        reachable = Connectivity.reachable_mask(self.__floor(), (1, 1))
+
+        assert reachable.sum() == 4, "Only the top left room should be reachable"
+        assert not reachable[4, 1], "Isolated cell should not be reachable"
+
+    def test_reachable_mask_of_wall_is_empty(self):
+        assert not Connectivity.reachable_mask(self.__floor(), (0, 0)).any()
+
+    def test_generated_map_is_fully_reachable(self):
+        for _ in range(20):
+            floor = ~Connectivity.wall_mask(MapFactory.generate_map())
+
+            assert floor[HERO_POSITION[1], HERO_POSITION[0]], "Hero position should be a floor"
+            assert (Connectivity.reachable_mask(floor) == floor).all(), "Every floor cell should be reachable"
+
+    def test_objects_are_placed_in_hero_component(self):
+        _map = [[MapFactory.TILES[0 if char == "#" else 1] for char in row] for row in self.__grid]
+        _objects = []
+
+        for _ in range(3):
+            coord = MapFactory.calculate_object_coordinates(_map, _objects)
+            _objects.append(Ally(None, None, coord))
+
+            assert coord in [(2, 1), (1, 2), (2, 2)], f"Object was placed outside of hero component: {coord}"
+            assert _map[coord[1]][coord[0]].fixture_type != FixtureType.WALL
+
+    def __floor(self):
+        return np.array([[char != "#" for char in row] for row in self.__grid])
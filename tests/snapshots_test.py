@@ -0,0 +1,105 @@
+import threading
+
+from Logic import Action
+from Replay import seed_everything
+from Settings import SettingsProvider
+from Simulation import create_engine, SETTINGS_FILE_PATH
+from Snapshots import EngineSnapshot, MessageLog, SimulationThread, SnapshotView
+
+
+class TestSnapshots:
+
+    def test_snapshot_is_not_changed_by_the_game(self):
+        seed_everything(5)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        snapshot = EngineSnapshot.capture(engine, 1)
+        position = snapshot.hero.position
+        objects = [(obj.fixture, obj.position) for obj in snapshot.objects]
+
+        assert EngineSnapshot.capture(engine, 2, previous=snapshot) is snapshot, "Nothing changed since the capture"
+        for action in [Action.RIGHT, Action.DOWN] * 4:
+            engine.move(action)
+
+        assert snapshot.hero.position == position
+        assert [(obj.fixture, obj.position) for obj in snapshot.objects] == objects
+        assert EngineSnapshot.capture(engine, 2, previous=snapshot) is not snapshot
+
+    def test_commands_run_on_simulation_thread(self):
+        seed_everything(5)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        threads = []
+        published = threading.Event()
+
+        def capture(revision, previous):
+            snapshot = EngineSnapshot.capture(engine, revision, previous=previous)
+            if threads:
+                published.set()
+            return snapshot
+
+        simulation = SimulationThread(lambda: None, capture, tick_rate=0)
+        simulation.submit(lambda: threads.append(threading.current_thread()))
+        simulation.start()
+        assert published.wait(5)
+        simulation.stop()
+
+        assert threads == [simulation]
+        assert simulation.error is None and simulation.ticks > 0
+
+    def test_messages_are_shown_once(self):
+        log = MessageLog()
+        view = SnapshotView()
+        received = []
+        view.subscribe(type("Receiver", (), {"update": lambda _, message: received.append(message)})())
+        seed_everything(5)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        engine.subscribe(log)
+
+        for message in ("first", "second"):
+            engine.notify(message)
+        view.show(EngineSnapshot(engine, 1, message_log=log))
+        # the renderer skips the snapshot with the third message
+        for message in ("third", "fourth"):
+            engine.notify(message)
+        snapshot = EngineSnapshot(engine, 3, message_log=log)
+        view.show(snapshot)
+        view.show(snapshot)
+
+        assert received == ["first", "second", "third", "fourth"]
+
+    def test_messages_of_a_new_log_are_shown(self):
+        view = SnapshotView()
+        received = []
+        view.subscribe(type("Receiver", (), {"update": lambda _, message: received.append(message)})())
+        seed_everything(5)
+
+        # restarting or loading a game creates a new engine with a new log
+        for messages in (("first", "second"), ("restarted",)):
+            engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+            log = MessageLog()
+            engine.subscribe(log)
+            for message in messages:
+                engine.notify(message)
+            view.show(EngineSnapshot(engine, 1, message_log=log))
+
+        assert received == ["first", "second", "restarted"]
+
+    def test_thread_without_step_waits_for_commands(self):
+        seed_everything(5)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        moved = threading.Event()
+
+        def capture(revision, previous):
+            snapshot = EngineSnapshot.capture(engine, revision, previous=previous)
+            if revision:
+                moved.set()
+            return snapshot
+
+        simulation = SimulationThread(None, capture, tick_rate=0)
+        simulation.start()
+        assert not moved.wait(0.2) and simulation.latest is not None, "Only the first snapshot is captured"
+        simulation.submit(lambda: engine.move(Action.RIGHT))
+        assert moved.wait(5)
+        simulation.stop()
+
+        assert not simulation.is_alive() and simulation.error is None
+        assert simulation.ticks == 1 and simulation.latest.hero.position == (2, 1)
@@ -0,0 +1,58 @@
+import os
+
+import pygame
+import pytest
+
+from Logic import Action
+from Replay import seed_everything
+from Settings import SettingsProvider
+from Simulation import create_engine, create_multi_hero_engine, SETTINGS_FILE_PATH
+from Spectator import LevelImages, SpectatorGrid, SpectatorTile
+
+
+@pytest.fixture(scope="module")
+def display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.quit()
+
+
+class TestSpectator:
+
+    def test_changed_cells_match_full_redraw(self, display):
+        seed_everything(2)
+        engine = create_engine(SettingsProvider(SETTINGS_FILE_PATH))
+        level_images = LevelImages(3)
+        tile = SpectatorTile((123, 123), 3, level_images)
+        tile.update(engine)
+
+        for action in [Action.RIGHT, Action.DOWN, Action.DOWN, Action.LEFT]:
+            engine.move(action)
+        assert tile.update(engine), "The moved hero should be redrawn"
+        assert not tile.update(engine), "Nothing changed since the last update"
+
+        fresh = SpectatorTile((123, 123), 3, level_images)
+        fresh.update(engine)
+        assert pygame.image.tobytes(tile, "RGB") == pygame.image.tobytes(fresh, "RGB")
+
+    def test_level_images_are_shared(self, display):
+        seed_everything(2)
+        engines = create_multi_hero_engine(SettingsProvider(SETTINGS_FILE_PATH), 2).engines
+        level_images = LevelImages(2)
+        image = level_images.get(engines[0].map)
+
+        assert level_images.get(engines[1].map) is image
+        assert image.get_size() == (2 * len(engines[0].map[0]), 2 * len(engines[0].map))
+        assert level_images.get([row[:] for row in engines[0].map]) is not image
+
+    def test_grid_is_throttled(self, display):
+        seed_everything(2)
+        engines = [create_engine(SettingsProvider(SETTINGS_FILE_PATH)) for _ in range(5)]
+        grid = SpectatorGrid(5, fps=4)
+        canvas = pygame.Surface(grid.size)
+
+        assert len(grid.draw(canvas, engines, now=10.)) == 5
+        engines[3].move(Action.RIGHT)
+        assert grid.draw(canvas, engines, now=10.1) is None, "Frames should not be drawn more often than 4 per second"
+        assert grid.draw(canvas, engines, now=10.3) == [pygame.Rect(grid.tile_position(3), grid.tile_size)]
@@ -0,0 +1,26 @@
+from Service import LevelsProvider
+from Simulation import SETTINGS_FILE_PATH, LEVELS_FILE_PATH
+from Tuner import Candidate, DifficultyTuner
+
+
+class TestTuner:
+
+    def test_candidate_is_written_back_unchanged(self, tmp_path):
+        candidate = Candidate.load(SETTINGS_FILE_PATH, LEVELS_FILE_PATH)
+        settings_file_path, levels_file_path = str(tmp_path / "objects.yml"), str(tmp_path / "levels.yml")
+
+        candidate.write(settings_file_path, levels_file_path)
+        loaded = Candidate.load(settings_file_path, levels_file_path)
+
+        assert loaded.settings == candidate.settings
+        assert loaded.levels == candidate.levels
+        assert LevelsProvider.load_configs(levels_file_path) == LevelsProvider.load_configs(LEVELS_FILE_PATH)
+
+    def test_tuning_never_makes_incumbent_worse(self):
+        tuner = DifficultyTuner([1, 1, 0.5], games=4, max_steps=150, workers=0, chunk_size=2, random_seed=1)
+        losses = []
+
+        tuner.tune(3, 2, callback=lambda iteration, current, stopped: losses.append(current.loss))
+
+        assert len(losses) == 3
+        assert losses == sorted(losses, reverse=True), "The incumbent should be replaced only by better candidates"
@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+import pygame
+
+from VideoCapture import FrameCapture, RAW, RAW_FILE_NAME, RAW_INDEX_FILE_NAME
+
+
+class TestFrameCapture:
+
+    def test_frames_are_written_as_png(self, tmp_path):
+        surface = pygame.Surface((40, 30), depth=32)
+
+        with FrameCapture(str(tmp_path)) as capture:
+            assert not capture.capture(surface), "Frames outside of episodes should not be captured"
+            capture.start_episode("episode")
+            for color in ((255, 0, 0), (10, 200, 30)):
+                surface.fill(color)
+                assert capture.capture(surface)
+
+        frames = sorted(os.listdir(tmp_path / "episode"))
+        assert len(frames) == 2
+        image = pygame.image.load(str(tmp_path / "episode" / frames[1]))
+        assert image.get_size() == (40, 30) and tuple(image.get_at((5, 7)))[:3] == (10, 200, 30)
+
+    def test_raw_frames_keep_pixels(self, tmp_path):
+        surface = pygame.Surface((17, 9), depth=24)
+        pixels = np.random.default_rng(0).integers(0, 256, (17, 9, 3), dtype=np.uint8)
+        pygame.surfarray.blit_array(surface, pixels)
+
+        with FrameCapture(str(tmp_path), RAW, block=True) as capture:
+            capture.start_episode("first")
+            for _ in range(3):
+                capture.capture(surface)
+            capture.start_episode("second")
+            capture.capture(surface)
+
+        with open(tmp_path / "first" / RAW_INDEX_FILE_NAME) as file:
+            index = json.load(file)
+        frames = np.fromfile(tmp_path / "first" / RAW_FILE_NAME, dtype=np.uint8).reshape(-1, 9, 17, 3)
+        assert (index["width"], index["height"], index["frames"]) == (17, 9, 3)
+        assert len(frames) == 3 and (frames[2] == pixels.swapaxes(0, 1)).all()
+        assert os.path.getsize(tmp_path / "second" / RAW_FILE_NAME) == 17 * 9 * 3
+
+    def test_frames_are_dropped_when_encoder_falls_behind(self, tmp_path):
+        surface = pygame.Surface((320, 240), depth=32)
+
+        with FrameCapture(str(tmp_path), pool_size=1) as capture:
+            capture.start_episode("episode")
+            captured = sum(capture.capture(surface) for _ in range(50))
+
+        assert capture.dropped > 0 and captured + capture.dropped == 50
+        assert len(os.listdir(tmp_path / "episode")) == captured